@@ -0,0 +1,159 @@
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+from .cache import get_dataset_version
+from .database import table_available
+
+
+# ============================================
+# Typeahead prefix index
+# ============================================
+# Distinct cities, school names, formation names and master mentions, kept
+# in memory and reloaded on a new dataset version. Each value is indexed
+# under every word suffix of its folded form, so "henri" completes
+# "Lycée Henri-IV". Values are numbered by popularity (formation count),
+# which makes "best matches" the smallest value numbers of a key range.
+
+AUTOCOMPLETE_LIMIT = 10
+# Prefixes matching more index keys than this have their best values
+# precomputed; narrower ones are answered by scanning their key range.
+PRECOMPUTED_RANGE = 64
+# Sorts after every folded key starting with a given prefix
+_KEY_END = "\U0010ffff"
+
+
+def fold(value: str) -> str:
+    """Lowercase, accents removed, words separated by single spaces."""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(re.findall(r"\w+", stripped.lower()))
+
+
+def _best(ids: List[int], lo: int, hi: int) -> List[int]:
+    return sorted(set(ids[lo:hi]))[:AUTOCOMPLETE_LIMIT]
+
+
+class _PrefixIndex:
+    """One field: values by popularity and their sorted word-suffix keys."""
+
+    def __init__(self, counts: Dict[str, int]):
+        # Spellings of one folded value are merged; the most common one is shown
+        grouped: Dict[str, Counter] = defaultdict(Counter)
+        for value, count in counts.items():
+            folded = fold(value)
+            if folded:
+                grouped[folded][value.strip()] += count
+        ranked = sorted(
+            ((sum(c.values()), c.most_common(1)[0][0], folded) for folded, c in grouped.items()),
+            key=lambda v: (-v[0], v[1]),
+        )
+        self.values: List[Tuple[str, int]] = [(display, total) for total, display, _ in ranked]
+
+        entries = []
+        for n, (_, _, folded) in enumerate(ranked):
+            words = folded.split(" ")
+            for start in range(len(words)):
+                entries.append((" ".join(words[start:]), n))
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.ids = [n for _, n in entries]
+
+        self.top: Dict[str, List[int]] = {}
+        # (prefix length, key range sharing that prefix)
+        stack = [(0, 0, len(self.keys))]
+        while stack:
+            depth, lo, hi = stack.pop()
+            i = lo
+            while i < hi:
+                if len(self.keys[i]) <= depth:
+                    i += 1
+                    continue
+                prefix = self.keys[i][:depth + 1]
+                j = bisect_right(self.keys, prefix + _KEY_END, i, hi)
+                if j - i > PRECOMPUTED_RANGE:
+                    self.top[prefix] = _best(self.ids, i, j)
+                    stack.append((depth + 1, i, j))
+                i = j
+
+    def complete(self, prefix: str, limit: int) -> List[dict]:
+        ids = self.top.get(prefix)
+        if ids is None:
+            lo = bisect_left(self.keys, prefix)
+            hi = bisect_right(self.keys, prefix + _KEY_END, lo)
+            ids = _best(self.ids, lo, hi)
+        return [{"value": self.values[n][0], "count": self.values[n][1]} for n in ids[:limit]]
+
+
+def _field_counts(db: Session) -> Dict[str, Dict[str, int]]:
+    """{field: {value: number of formations}}."""
+    formation = models.Formation
+    location = models.SchoolLocation
+    school = models.School
+    cities = db.query(location.city, func.count(formation.id))\
+        .outerjoin(formation, formation.locationId == location.id)\
+        .filter(location.city != None)\
+        .group_by(location.city)\
+        .all()
+    schools = db.query(school.name, func.count(formation.id))\
+        .outerjoin(formation, formation.schoolUai == school.uai)\
+        .filter(school.name != None)\
+        .group_by(school.name)\
+        .all()
+    names = db.query(formation.name, func.count(formation.id))\
+        .filter(formation.name != None)\
+        .group_by(formation.name)\
+        .all()
+    mentions = []
+    if table_available(db, "MonMasterFormation"):
+        master = models.MonMasterFormation
+        mentions = db.query(master.mention, func.count(master.id))\
+            .filter(master.mention != None)\
+            .group_by(master.mention)\
+            .all()
+    return {
+        "city": dict(cities),
+        "school": dict(schools),
+        "formation": dict(names),
+        "mention": dict(mentions),
+    }
+
+
+AUTOCOMPLETE_FIELDS = ("city", "school", "formation", "mention")
+
+
+class Autocomplete:
+    def __init__(self):
+        self.version: Optional[str] = None
+        self._indexes: Dict[str, _PrefixIndex] = {field: _PrefixIndex({}) for field in AUTOCOMPLETE_FIELDS}
+        self._lock = threading.Lock()
+
+    def load(self, db: Session) -> None:
+        version = get_dataset_version(db)
+        indexes = {field: _PrefixIndex(counts) for field, counts in _field_counts(db).items()}
+        with self._lock:
+            self._indexes = indexes
+            self.version = version
+
+    def _loaded(self, db: Session) -> Dict[str, _PrefixIndex]:
+        if self.version != get_dataset_version(db):
+            self.load(db)
+        return self._indexes
+
+    def complete(self, db: Session, field: str, prefix: str, limit: int = AUTOCOMPLETE_LIMIT) -> List[dict]:
+        """Most popular values of `field` with a word starting with `prefix`
+        (case and accents ignored)."""
+        folded = fold(prefix)
+        if not folded:
+            return []
+        return self._loaded(db)[field].complete(folded, limit)
+
+
+autocomplete = Autocomplete()
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+
+# ============================================
+# Dataset version
+# ============================================
+# ingestion/post_ingest.py writes a new DatasetMeta 'version' after every
+# ingestion run. Caches include it in their keys, so re-ingesting invalidates
+# them without a restart. Re-read at most every few seconds.
+
+VERSION_CHECK_SECONDS = 5.0
+
+_version_lock = threading.Lock()
+_version = {"value": None, "checked_at": 0.0}
+
+
+def peek_dataset_version() -> Optional[str]:
+    """The last version read if it is still fresh, without a database round trip."""
+    with _version_lock:
+        if _version["value"] is not None and time.monotonic() - _version["checked_at"] < VERSION_CHECK_SECONDS:
+            return _version["value"]
+    return None
+
+
+def get_dataset_version(db: Session) -> str:
+    now = time.monotonic()
+    with _version_lock:
+        if _version["value"] is not None and now - _version["checked_at"] < VERSION_CHECK_SECONDS:
+            return _version["value"]
+
+    has_table = db.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'DatasetMeta'")
+    ).first()
+    row = None
+    if has_table:
+        row = db.execute(text("SELECT value FROM DatasetMeta WHERE key = 'version'")).first()
+
+    with _version_lock:
+        _version["value"] = row[0] if row else "unversioned"
+        _version["checked_at"] = now
+        return _version["value"]
+
+
+# ============================================
+# TTL + LRU cache
+# ============================================
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe dict with a max size (least recently used entries are
+    evicted first) and a per-entry time to live. Counts hits and misses."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+# ============================================
+# Reference data
+# ============================================
+# Lookup lists (categories, filières, secteurs, departments...) only change
+# when the data is re-ingested. Cache them per dataset version and warm them
+# at startup (backend/main.py lifespan).
+
+reference_cache = TTLCache(maxsize=256, ttl=24 * 3600)
+
+_reference_loaders: Dict[str, Callable] = {}
+
+
+def reference_data(name: str):
+    """Decorator for `fn(db)` lookups: serve the result from reference_cache.
+    The result is shared between requests and must not be mutated."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(db: Session):
+            key = (name, get_dataset_version(db))
+            value = reference_cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = fn(db)
+                reference_cache.set(key, value)
+            return value
+
+        _reference_loaders[name] = wrapper
+        return wrapper
+    return decorator
+
+
+def warm_reference_cache(db: Session) -> None:
+    for name, loader in _reference_loaders.items():
+        try:
+            loader(db)
+        except SQLAlchemyError as e:
+            # e.g. MonMaster tables not ingested yet
+            db.rollback()
+            print(f"WARNING: could not warm reference data '{name}': {e.__class__.__name__}")
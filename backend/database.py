@@ -1,23 +1,222 @@
-from sqlalchemy import create_engine
+from contextlib import asynccontextmanager
+from functools import partial
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import anyio
 import os
 
+from .cache import get_dataset_version
+from ingestion.geo import haversine_km
+
 # Pointing to the existing ingestion database
 # Relative path: from backend/ to ingestion/prisma/dev.db
-DB_PATH = os.path.join(os.path.dirname(__file__), "..", "ingestion", "prisma", "dev.db")
+DB_PATH = os.environ.get(
+    "ORIENTATION_DB_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "ingestion", "prisma", "dev.db"),
+)
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.abspath(DB_PATH)}"
+ASYNC_SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{os.path.abspath(DB_PATH)}"
+
+# ============================================
+# Connection profile
+# ============================================
+# "dev" keeps the plain single-engine setup. "production" tunes every
+# connection with PRAGMAs and splits readers from the (rare) writers:
+#   - read routers go through a read-only URI (mode=ro), so they never take
+#     a write lock and can't block behind user favorite writes,
+#   - routers/users.py uses a separate writable engine in WAL mode.
+DB_PROFILE = os.environ.get("ORIENTATION_DB_PROFILE", "dev")
+
+# immutable=1 skips all locking and change detection on the read engine.
+# Only safe when nothing writes to the file while the API runs (e.g. users
+# are stored elsewhere); re-ingesting requires a restart.
+DB_IMMUTABLE = os.environ.get("ORIENTATION_DB_IMMUTABLE", "0") == "1"
+
+PRODUCTION_PRAGMAS = {
+    "mmap_size": int(os.environ.get("ORIENTATION_DB_MMAP_SIZE", 256 * 1024 * 1024)),
+    # Negative value = size in KiB (64 MB page cache per connection)
+    "cache_size": int(os.environ.get("ORIENTATION_DB_CACHE_SIZE", -64000)),
+    "temp_store": "MEMORY",
+    "busy_timeout": int(os.environ.get("ORIENTATION_DB_BUSY_TIMEOUT_MS", 5000)),
+}
+
+# Only meaningful on the writable connection
+WRITER_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+}
+
+
+# Connections kept open per engine (40 = anyio's default thread pool size).
+# SQLite connections are cheap, so bursts past it open extra ones instead of
+# queueing on the pool: every concurrent request holds a session until its
+# response is sent, and SQLAlchemy's default 5 + 10 timed out requests at a
+# few dozen concurrent clients.
+POOL_ARGS = {
+    "pool_size": int(os.environ.get("ORIENTATION_DB_POOL_SIZE", 40)),
+    "max_overflow": -1,
+}
+
+
+# "async" runs endpoint queries on aiosqlite connections (off the anyio
+# thread pool); "sync" runs them on the thread pool like plain `def`
+# endpoints. "sync" is the default: it had the lower p50/p99 in
+# scripts/bench/db_modes.py at 200 clients (numbers in the README).
+DB_MODE = os.environ.get("ORIENTATION_DB_MODE", "sync")
+
+
+def _read_only_url(driver: str = "sqlite") -> str:
+    params = "mode=ro&immutable=1" if DB_IMMUTABLE else "mode=ro"
+    return f"{driver}:///file:{os.path.abspath(DB_PATH)}?{params}&uri=true"
+
+
+def _apply_pragmas(engine, pragmas: dict):
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def _sql_haversine_km(lat1, lon1, lat2, lon2):
+    if lat1 is None or lon1 is None or lat2 is None or lon2 is None:
+        return None
+    return haversine_km(lat1, lon1, lat2, lon2)
+
+
+def _register_functions(engine):
+    """SQL functions the routers use: haversine_km(lat1, lon1, lat2, lon2)
+    orders geospatial searches in the database."""
+    @event.listens_for(engine, "connect")
+    def register_sql_functions(dbapi_connection, connection_record):
+        dbapi_connection.create_function("haversine_km", 4, _sql_haversine_km, deterministic=True)
+
+
+if DB_PROFILE == "production":
+    engine = create_engine(_read_only_url(), connect_args={"check_same_thread": False}, **POOL_ARGS)
+    _apply_pragmas(engine, PRODUCTION_PRAGMAS)
+
+    write_engine = create_engine(
+        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, **POOL_ARGS
+    )
+    _apply_pragmas(write_engine, {**WRITER_PRAGMAS, **PRODUCTION_PRAGMAS})
+
+    async_engine = create_async_engine(_read_only_url("sqlite+aiosqlite"), **POOL_ARGS)
+    _apply_pragmas(async_engine.sync_engine, PRODUCTION_PRAGMAS)
+
+    async_write_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, **POOL_ARGS)
+    _apply_pragmas(async_write_engine.sync_engine, {**WRITER_PRAGMAS, **PRODUCTION_PRAGMAS})
+else:
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, **POOL_ARGS
+    )
+    write_engine = engine
+
+    async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, **POOL_ARGS)
+    async_write_engine = async_engine
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=write_engine)
+for _engine in {engine, write_engine, async_engine.sync_engine, async_write_engine.sync_engine}:
+    _register_functions(_engine)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncWriteSessionLocal = async_sessionmaker(async_write_engine, autoflush=False, expire_on_commit=False)
 
 class Base(DeclarativeBase):
     pass
 
+def init_db():
+    """Open a writable connection once so WAL mode is persisted in the file
+    before read-only connections attach (they cannot switch journal mode)."""
+    if DB_PROFILE == "production":
+        with write_engine.connect():
+            pass
+
+def get_schema_version() -> int:
+    """Migration level recorded by ingestion/migrations.py (PRAGMA user_version)."""
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+# Derived tables (see ingestion/migrations.py and ingestion/post_ingest.py).
+# post_ingest.py bumps the dataset version after running migrations, so a
+# table created by a new migration shows up with the next version.
+_tables_available = {"version": None, "names": {}}
+
+def table_available(db, name: str) -> bool:
+    """True once the migration creating `name` has run. Checked once per dataset version."""
+    version = get_dataset_version(db)
+    if _tables_available["version"] != version:
+        _tables_available.update(version=version, names={})
+    names = _tables_available["names"]
+    if name not in names:
+        names[name] = db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": name}
+        ).first() is not None
+    return names[name]
+
+async def dispose_async_engines():
+    await async_engine.dispose()
+    if async_write_engine is not async_engine:
+        await async_write_engine.dispose()
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+def get_write_db():
+    """Session bound to the writable engine. Only routers/users.py needs it."""
+    db = WriteSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class ThreadPoolSession:
+    """Sync-mode stand-in for AsyncSession.
+
+    Exposes the same `run_sync(fn, *args)` entry point the routers use, but
+    runs `fn` with a regular Session on the anyio thread pool.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await anyio.to_thread.run_sync(partial(fn, self.session, *args, **kwargs))
+
+
+@asynccontextmanager
+async def _async_session(async_factory, sync_factory):
+    if DB_MODE == "sync":
+        db = sync_factory()
+        try:
+            yield ThreadPoolSession(db)
+        finally:
+            db.close()
+    else:
+        async with async_factory() as db:
+            yield db
+
+async def get_async_db():
+    """Async counterpart of get_db. Routers call `await db.run_sync(fn, ...)`
+    where `fn(session, ...)` holds the regular ORM query code.
+
+    Under aiosqlite only the driver I/O leaves the event loop: `fn` itself
+    (ORM hydration, dict building, sorting) runs on it and blocks every other
+    request meanwhile. Handlers with heavy Python post-processing are plain
+    `def` endpoints on get_db / get_write_db instead, run on the thread pool.
+    """
+    async with _async_session(AsyncSessionLocal, SessionLocal) as db:
+        yield db
+
+async def get_async_write_db():
+    """Async counterpart of get_write_db."""
+    async with _async_session(AsyncWriteSessionLocal, WriteSessionLocal) as db:
+        yield db
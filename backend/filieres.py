@@ -0,0 +1,77 @@
+import threading
+from collections import defaultdict
+from typing import Dict, FrozenSet, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from . import models
+from .cache import get_dataset_version
+from ingestion.matching import fallback_parcoursup_types
+
+
+# ============================================
+# CPGE filière resolution
+# ============================================
+# CpgeMapping is small and only changes when ingestion/ingest_mappings.py
+# runs, which bumps the dataset version. Keep it in memory and reload on a
+# new version instead of querying it for every filiere_bis value.
+
+class FiliereResolver:
+    """In-memory CpgeMapping plus the CPGE types present in FormationCpgeType."""
+
+    def __init__(self):
+        self.version: Optional[str] = None
+        self._global: Dict[str, List[str]] = {}
+        self._overrides: Dict[tuple, List[str]] = {}
+        self._linked: FrozenSet[str] = frozenset()
+        self._lock = threading.Lock()
+
+    def load(self, db: Session) -> None:
+        version = get_dataset_version(db)
+        global_mappings = defaultdict(list)
+        overrides = defaultdict(list)
+        for m in db.query(models.CpgeMapping).all():
+            if m.schoolUai is None:
+                global_mappings[m.etudiantType].append(m.parcoursupFiliere)
+            else:
+                overrides[(m.etudiantType, m.schoolUai)].append(m.parcoursupFiliere)
+
+        linked = frozenset()
+        has_links = db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'FormationCpgeType'")
+        ).first()
+        if has_links:
+            linked = frozenset(
+                r[0] for r in db.query(models.FormationCpgeType.cpgeType).distinct().all()
+            )
+
+        with self._lock:
+            self._global = dict(global_mappings)
+            self._overrides = dict(overrides)
+            self._linked = linked
+            self.version = version
+
+    def _ensure_loaded(self, db: Session) -> None:
+        if self.version != get_dataset_version(db):
+            self.load(db)
+
+    def parcoursup_types(self, db: Session, cpge_type: str, school_uai: Optional[str] = None) -> List[str]:
+        """Map a scraper CPGE type to Parcoursup formation names."""
+        self._ensure_loaded(db)
+        # 1. School-specific overrides
+        if school_uai and (cpge_type, school_uai) in self._overrides:
+            return list(self._overrides[(cpge_type, school_uai)])
+        # 2. Global mappings
+        if cpge_type in self._global:
+            return list(self._global[cpge_type])
+        # 3. Hardcoded fallback
+        return fallback_parcoursup_types(cpge_type)
+
+    def is_linked(self, db: Session, cpge_type: str) -> bool:
+        """True when FormationCpgeType holds the formations of `cpge_type`."""
+        self._ensure_loaded(db)
+        return cpge_type in self._linked
+
+
+filiere_resolver = FiliereResolver()
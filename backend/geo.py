@@ -0,0 +1,52 @@
+import math
+from typing import Tuple
+
+from sqlalchemy import column, literal_column, text
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import table_available
+# Shared with ingestion/post_ingest.py (SchoolCluster grid, distances)
+from ingestion.geo import (
+    CLUSTER_CELL_OFFSET, CLUSTER_MAX_ZOOM, CLUSTER_MIN_ZOOM, EARTH_RADIUS_KM, haversine_km, mercator_cell
+)
+
+
+# ============================================
+# Geospatial helpers (SchoolLocationGeo R*Tree, see ingestion/post_ingest.py)
+# ============================================
+
+KM_PER_DEGREE_LAT = 111.32
+
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(min_lat, min_lon, max_lat, max_lon) enclosing the circle."""
+    d_lat = radius_km / KM_PER_DEGREE_LAT
+    # Longitude degrees shrink with latitude; clamp near the poles
+    d_lon = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return (
+        max(lat - d_lat, -90.0),
+        max(lon - d_lon, -180.0),
+        min(lat + d_lat, 90.0),
+        min(lon + d_lon, 180.0),
+    )
+
+
+def location_box_filter(db: Session, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> list:
+    """Conditions on SchoolLocation for locations inside the box. The R*Tree
+    narrows the candidates when it exists; the coordinate range re-checks
+    them (the R*Tree stores 32-bit floats and rounds boxes outwards)."""
+    location = models.SchoolLocation
+    conditions = [
+        location.latitude.between(min_lat, max_lat),
+        location.longitude.between(min_lon, max_lon),
+    ]
+    if table_available(db, "SchoolLocationGeo"):
+        geo = text("""
+            SELECT id FROM SchoolLocationGeo
+            WHERE minLat <= :max_lat AND maxLat >= :min_lat
+              AND minLon <= :max_lon AND maxLon >= :min_lon
+        """).bindparams(min_lat=min_lat, min_lon=min_lon, max_lat=max_lat, max_lon=max_lon)\
+            .columns(column("id"))
+        conditions.append(literal_column("SchoolLocation.rowid").in_(geo))
+    return conditions
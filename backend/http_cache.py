@@ -0,0 +1,124 @@
+import hashlib
+from typing import Dict, Optional
+
+import anyio
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .cache import TTLCache, get_dataset_version, peek_dataset_version
+from .compression import choose_encoding
+from .database import SessionLocal
+
+
+# ============================================
+# HTTP caching (ETag + Cache-Control)
+# ============================================
+# Responses only change when the data is re-ingested, so an ETag built from
+# the dataset version, the request URL and the content encoding is a valid
+# strong validator. A matching If-None-Match is answered with 304 before the
+# endpoint runs.
+
+class CachePolicy:
+    def __init__(self, cache_control: str, etag: bool = True, store_body: bool = False):
+        self.cache_control = cache_control
+        # Off for data that changes between ingestions (user profiles)
+        self.etag = etag
+        # Keep the final (compressed) body in response_cache, keyed on the ETag
+        self.store_body = store_body and etag
+
+
+# Lookup lists: fine to keep for a day, revalidated with the ETag afterwards
+REFERENCE_POLICY = CachePolicy("public, max-age=86400", store_body=True)
+# Search results and details: short freshness, then cheap 304 revalidation
+DATA_POLICY = CachePolicy("public, max-age=300")
+# Large payloads requested with few distinct URLs (paniers/by-type)
+LARGE_DATA_POLICY = CachePolicy("public, max-age=300", store_body=True)
+PRIVATE_POLICY = CachePolicy("private, no-store", etag=False)
+NO_STORE_POLICY = CachePolicy("no-store", etag=False)
+
+# ETag -> (body, headers) of store_body responses, already compressed
+response_cache = TTLCache(maxsize=512, ttl=6 * 3600)
+
+# Headers replayed from response_cache
+_STORED_HEADERS = ("content-type", "content-encoding", "vary")
+
+
+def _load_dataset_version() -> str:
+    with SessionLocal() as db:
+        return get_dataset_version(db)
+
+
+def _request_etag(version: str, request: Request, encoding: Optional[str]) -> str:
+    key = f"{version}|{request.url.path}|{sorted(request.query_params.multi_items())}|{encoding}"
+    return '"' + hashlib.sha1(key.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/"x" matches "x"."""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class HTTPCacheMiddleware(BaseHTTPMiddleware):
+    """Adds ETag and Cache-Control to GET responses and answers conditional
+    requests with 304. `policies` maps path prefixes (usually a router
+    prefix) to a CachePolicy; the longest matching prefix wins."""
+
+    def __init__(self, app, policies: Dict[str, CachePolicy], default: CachePolicy = DATA_POLICY):
+        super().__init__(app)
+        self.policies = sorted(policies.items(), key=lambda item: len(item[0]), reverse=True)
+        self.default = default
+
+    def policy_for(self, path: str) -> CachePolicy:
+        for prefix, policy in self.policies:
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                return policy
+        return self.default
+
+    async def dispatch(self, request: Request, call_next):
+        if request.method not in ("GET", "HEAD"):
+            return await call_next(request)
+
+        policy = self.policy_for(request.url.path)
+        etag: Optional[str] = None
+        store_body = False
+        if policy.etag:
+            version = peek_dataset_version()
+            if version is None:
+                version = await anyio.to_thread.run_sync(_load_dataset_version)
+            encoding = choose_encoding(request.headers.get("accept-encoding"))
+            etag = _request_etag(version, request, encoding)
+            headers = {"ETag": etag, "Cache-Control": policy.cache_control}
+
+            if_none_match = request.headers.get("if-none-match")
+            if if_none_match and _etag_matches(if_none_match, etag):
+                # Skips CompressionMiddleware: repeat the Vary of the 200, the
+                # ETag depends on the encoding
+                return Response(status_code=304, headers={**headers, "Vary": "Accept-Encoding"})
+
+            store_body = policy.store_body and request.method == "GET"
+            if store_body:
+                stored = response_cache.get(etag)
+                if stored is not None:
+                    body, stored_headers = stored
+                    return Response(body, headers={**stored_headers, **headers})
+
+        response = await call_next(request)
+        if response.status_code != 200:
+            response.headers.setdefault("Cache-Control", "no-store")
+            return response
+
+        response.headers.setdefault("Cache-Control", policy.cache_control)
+        if etag:
+            response.headers["ETag"] = etag
+        if store_body:
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            response_cache.set(etag, (body, {
+                name: response.headers[name] for name in _STORED_HEADERS if name in response.headers
+            }))
+            return Response(body, status_code=200, headers=dict(response.headers))
+        return response
@@ -1,17 +1,64 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import search, licences, users, masters
+from fastapi.responses import ORJSONResponse
+from .routers import search, licences, users, masters, stats, global_search, autocomplete
+from .database import SessionLocal, init_db, dispose_async_engines, get_schema_version
+from .cache import reference_cache, warm_reference_cache
+from .filieres import filiere_resolver
+from .specialties import specialty_matrix
+from .scoring import scoring_engine
+from .autocomplete import autocomplete as autocomplete_index
+from .compression import CompressionMiddleware
+from .http_cache import (
+    HTTPCacheMiddleware, LARGE_DATA_POLICY, NO_STORE_POLICY, PRIVATE_POLICY, REFERENCE_POLICY, response_cache
+)
+from ingestion.migrations import LATEST_VERSION
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    init_db()
+    schema_version = get_schema_version()
+    if schema_version < LATEST_VERSION:
+        print(f"WARNING: database schema is at version {schema_version}, expected {LATEST_VERSION}. "
+              "Run `python ingestion/post_ingest.py` (indexes and search tables are missing).")
+    with SessionLocal() as db:
+        filiere_resolver.load(db)
+        specialty_matrix.load(db)
+        scoring_engine.load(db)
+        autocomplete_index.load(db)
+        warm_reference_cache(db)
     print("Registered Routes:")
     for route in app.routes:
         print(f" - {route.path} [{route.name}]")
     yield
+    await dispose_async_engines()
+
+app = FastAPI(title="Orientation API", lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Middleware order, outermost first: CORS -> HTTP cache -> compression -> app.
+# (add_middleware puts the last added middleware outermost.)
+app.add_middleware(CompressionMiddleware)
 
-app = FastAPI(title="Orientation API", lifespan=lifespan)
+# ETag / Cache-Control per router (everything else: DATA_POLICY).
+# Added before CORS so that 304 responses still get CORS headers.
+app.add_middleware(
+    HTTPCacheMiddleware,
+    policies={
+        "/formations/categories": REFERENCE_POLICY,
+        "/formations/filters/cpge-filieres": REFERENCE_POLICY,
+        "/formations/paniers/types": REFERENCE_POLICY,
+        "/formations/paniers/by-type": LARGE_DATA_POLICY,
+        search.specialty_router.prefix: REFERENCE_POLICY,
+        "/masters/secteurs": REFERENCE_POLICY,
+        "/licences/types": REFERENCE_POLICY,
+        "/licences/departments": REFERENCE_POLICY,
+        users.router.prefix: PRIVATE_POLICY,
+        "/health": NO_STORE_POLICY,
+        "/cache/stats": NO_STORE_POLICY,
+    },
+)
 
 # Configure CORS for React frontend
 origins = [
@@ -33,7 +80,19 @@ app.include_router(search.specialty_router)
 app.include_router(licences.router)
 app.include_router(users.router)
 app.include_router(masters.router)
+app.include_router(stats.router)
+app.include_router(global_search.router)
+app.include_router(autocomplete.router)
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Hit/miss counters of the in-process caches."""
+    return {
+        "reference": reference_cache.stats(),
+        "formation_count": search.formation_count_cache.stats(),
+        "response": response_cache.stats(),
+    }
@@ -1,4 +1,6 @@
+import orjson
 from sqlalchemy import Column, String, Float, Integer, ForeignKey, Table, Boolean
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -10,6 +12,24 @@ panier_master_formation = Table(
     Column("masterFormationId", String, ForeignKey("MasterFormation.id"), primary_key=True),
 )
 
+class JSONText(TypeDecorator):
+    """JSON stored in a TEXT column, parsed once when the row is loaded."""
+    impl = String
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        return orjson.dumps(value).decode("utf-8")
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            return None
+
 class School(Base):
     __tablename__ = "School"
 
@@ -60,8 +80,8 @@ class Formation(Base):
     lastCalledRank = Column(Integer, nullable=True)
     genderParity = Column(Float, nullable=True)
     
-    # Stored as JSON string in DB, handled as needed
-    mentionDistribution = Column(String, nullable=True)
+    # Stored as JSON string in DB, loaded as a dict
+    mentionDistribution = Column(JSONText, nullable=True)
 
     location = relationship("SchoolLocation", back_populates="formations")
     school = relationship("School", back_populates="formations")
@@ -101,6 +121,126 @@ class PanierSchoolStats(Base):
     panier = relationship("Panier", back_populates="school_stats")
     school = relationship("School", back_populates="panier_stats")
 
+class PanierLeaderboard(Base):
+    """PanierSchoolStats with the matching Parcoursup formation resolved at
+    ingest (ingestion/post_ingest.py, migration 5)."""
+    __tablename__ = "PanierLeaderboard"
+
+    statsId = Column(String, ForeignKey("PanierSchoolStats.id"), primary_key=True)
+    panierId = Column(String, ForeignKey("Panier.id"))
+    cpgeType = Column(String)
+    schoolUai = Column(String, ForeignKey("School.uai"))
+    position = Column(Integer)
+
+    tauxIntegrationPct = Column(Float, nullable=True)
+    moyenneBac = Column(Float, nullable=True)
+    moyenneMultiAnsPct = Column(Float, nullable=True)
+    rangMultiAns = Column(String, nullable=True)
+    rankMultiAns = Column(Integer, nullable=True)
+    rankMultiAnsTotal = Column(Integer, nullable=True)
+    parcoursup = Column(Boolean, nullable=True)
+
+    admissionRate = Column(Float, nullable=True)
+    parcoursupLink = Column(String, nullable=True)
+    parcoursupName = Column(String, nullable=True)
+    excluded = Column(Boolean, default=False)
+
+    panier = relationship("Panier")
+    school = relationship("School")
+
+class FormationMention(Base):
+    """Typed copy of Formation.mentionDistribution (ingestion/post_ingest.py, migration 7)."""
+    __tablename__ = "FormationMention"
+
+    formationId = Column(String, ForeignKey("Formation.id"), primary_key=True)
+    felicitationsPct = Column(Float, nullable=True)
+    tbPct = Column(Float, nullable=True)
+    bPct = Column(Float, nullable=True)
+    abPct = Column(Float, nullable=True)
+    sansMentionPct = Column(Float, nullable=True)
+
+class SchoolCluster(Base):
+    """Map grid cell of SchoolLocations at one zoom level (ingestion/post_ingest.py, migration 9)."""
+    __tablename__ = "SchoolCluster"
+
+    zoom = Column(Integer, primary_key=True)
+    cellX = Column(Integer, primary_key=True)
+    cellY = Column(Integer, primary_key=True)
+    locationCount = Column(Integer)
+    formationCount = Column(Integer)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    # Set when the cell holds a single location
+    locationId = Column(String, ForeignKey("SchoolLocation.id"), nullable=True)
+    # {category: {count, minAdmissionRate, medianAdmissionRate}}
+    stats = Column(JSONText, nullable=True)
+
+class StatsCube(Base):
+    """Formation aggregates per (geography, category, selectivity); '*' marks a
+    rolled-up dimension (ingestion/post_ingest.py, migration 10)."""
+    __tablename__ = "StatsCube"
+
+    region = Column(String, primary_key=True)
+    academy = Column(String, primary_key=True)
+    departmentCode = Column(String, primary_key=True)
+    departmentName = Column(String, nullable=True)
+    category = Column(String, primary_key=True)
+    selectivity = Column(String, primary_key=True)
+    formationCount = Column(Integer)
+    capacitySum = Column(Integer)
+    candidatesSum = Column(Integer)
+    admissionProposalsSum = Column(Integer)
+    genderParityAvg = Column(Float, nullable=True)
+    admissionRateAvg = Column(Float, nullable=True)
+    admissionRateMin = Column(Float, nullable=True)
+    admissionRateP25 = Column(Float, nullable=True)
+    admissionRateMedian = Column(Float, nullable=True)
+    admissionRateP75 = Column(Float, nullable=True)
+    admissionRateMax = Column(Float, nullable=True)
+
+class LicenceSecteur(Base):
+    """Master secteurs disciplinaires matching a licence type (ingestion/post_ingest.py, migration 13).
+    A licence type matching none has a single row with secteurDisciplinaire ''."""
+    __tablename__ = "LicenceSecteur"
+
+    licenceType = Column(String, primary_key=True)
+    secteurDisciplinaire = Column(String, primary_key=True)
+    secteurId = Column(String, nullable=True)
+
+class LicenceMasterPathway(Base):
+    """Eligible masters of a licence type's secteurs, rank 1 = lowest admission
+    rate (ingestion/post_ingest.py, migration 13)."""
+    __tablename__ = "LicenceMasterPathway"
+
+    licenceType = Column(String, primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    monMasterFormationId = Column(String, ForeignKey("MonMasterFormation.id"))
+    region = Column(String, nullable=True)
+    alternance = Column(Boolean, nullable=True)
+
+class FormationLicenceType(Base):
+    """Licence formations matching a licence type (ingestion/post_ingest.py, migration 12)."""
+    __tablename__ = "FormationLicenceType"
+
+    licenceType = Column(String, primary_key=True)
+    formationId = Column(String, ForeignKey("Formation.id"), primary_key=True)
+
+class FormationSimilar(Base):
+    """Nearest formations by feature vector, rank 1 first (ingestion/post_ingest.py, migration 11)."""
+    __tablename__ = "FormationSimilar"
+
+    formationId = Column(String, ForeignKey("Formation.id"), primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    similarId = Column(String, ForeignKey("Formation.id"))
+    distance = Column(Float)
+
+class FormationCpgeType(Base):
+    """Formations matching a CPGE type (ingestion/post_ingest.py, migration 6)."""
+    __tablename__ = "FormationCpgeType"
+
+    cpgeType = Column(String, primary_key=True)
+    formationId = Column(String, ForeignKey("Formation.id"), primary_key=True)
+
 class CpgeMapping(Base):
     __tablename__ = "CpgeMapping"
 
@@ -140,29 +280,8 @@ class MonMasterFormation(Base):
     pctMemeEtablissement = Column(Float, nullable=True)
     pctMemeAcademie = Column(Float, nullable=True)
 
-    secteur_formations = relationship("MasterSecteurFormation", back_populates="mon_master_formation")
-
-
-class MasterSecteur(Base):
-    __tablename__ = "MasterSecteur"
-
-    id = Column(String, primary_key=True)
-    secteurDisciplinaire = Column(String)
-    secteurId = Column(String)
-    tier = Column(String)  # "top3", "top5", "top10"
-
-    formations = relationship("MasterSecteurFormation", back_populates="master_secteur")
-
-
-class MasterSecteurFormation(Base):
-    __tablename__ = "MasterSecteurFormation"
-
-    masterSecteurId = Column(String, ForeignKey("MasterSecteur.id"), primary_key=True)
-    monMasterFormationId = Column(String, ForeignKey("MonMasterFormation.id"), primary_key=True)
-    rank = Column(Integer)
-
-    master_secteur = relationship("MasterSecteur", back_populates="formations")
-    mon_master_formation = relationship("MonMasterFormation", back_populates="secteur_formations")
+    # Rank within the secteur, 1 = most selective (ingestion/post_ingest.py, migration 14)
+    secteurRank = Column(Integer, nullable=True)
 
 
 # ============================================
@@ -0,0 +1,71 @@
+import base64
+import json
+from typing import Any, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+
+# ============================================
+# Keyset (cursor) pagination
+# ============================================
+# A cursor is the sort key of the last row of a page, e.g. (admissionRate, id),
+# encoded as url-safe base64 JSON. The next page filters on "key > cursor"
+# instead of OFFSET, so page N costs the same as page 1.
+
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List[Any]]:
+    """Return the decoded key, or None for an empty cursor (first page)."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def after_key(rate_column, id_column, last_rate: Optional[float], last_id: str):
+    """Rows strictly after (last_rate, last_id) in `rate ASC NULLS LAST, id ASC` order."""
+    if last_rate is None:
+        return and_(rate_column.is_(None), id_column > last_id)
+    return or_(
+        rate_column > last_rate,
+        and_(rate_column == last_rate, id_column > last_id),
+        rate_column.is_(None),
+    )
+
+
+def keyset_order(rate_column, id_column):
+    return [rate_column.is_(None), rate_column.asc(), id_column.asc()]
+
+
+def next_cursor(rows: list, limit: int, key) -> Optional[str]:
+    """`rows` was fetched with limit + 1: an extra row means there is a next page.
+    Trims `rows` in place to `limit`."""
+    if len(rows) <= limit:
+        return None
+    del rows[limit:]
+    return encode_cursor(*key(rows[-1]))
+
+
+# ============================================
+# Batch lookups
+# ============================================
+# POST /…/batch endpoints fetch every requested id in one IN query and
+# answer in request order.
+
+def batch_result(ids: list, found: dict, convert) -> dict:
+    """Items in request order (duplicates kept), None and listed in `missing`
+    for unknown ids."""
+    return {
+        "items": [convert(found[i]) if i in found else None for i in ids],
+        "missing": list(dict.fromkeys(i for i in ids if i not in found)),
+    }
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..autocomplete import AUTOCOMPLETE_LIMIT, autocomplete
+from ..database import get_async_db
+
+router = APIRouter(
+    prefix="/autocomplete",
+    tags=["autocomplete"]
+)
+
+
+@router.get("")
+async def get_autocomplete(
+    field: str = Query(..., pattern="^(city|school|formation|mention)$"),
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(AUTOCOMPLETE_LIMIT, ge=1, le=AUTOCOMPLETE_LIMIT),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Typeahead suggestions: the `limit` values of `field` with a word
+    starting with `prefix` (case and accents ignored), most formations first.
+
+    Returns [{"value": ..., "count": number of formations}]. `city` and
+    `school` values can be passed as-is to the /formations/ filters.
+    """
+    return await db.run_sync(autocomplete.complete, field, prefix, limit)
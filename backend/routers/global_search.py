@@ -0,0 +1,113 @@
+import re
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from ..database import get_async_db, table_available
+from .search import fts_prefix_query
+from ingestion.search_layout import SEARCH_ENTITY_BLOCKS, SEARCH_ROWID_BLOCK
+
+router = APIRouter(
+    prefix="/search",
+    tags=["search"]
+)
+
+
+# GlobalSearch entityType -> response group
+SEARCH_GROUPS = {
+    "formation": "formations",
+    "school": "schools",
+    "master": "masters",
+}
+
+# bm25 over every match of a short prefix ("pa"*) dominates the latency;
+# when the last word is shorter than SEARCH_SHORT_PREFIX and matches more
+# than SEARCH_RANK_CANDIDATES rows, only the most popular ones are ranked.
+# Longer words are scored over their full match set.
+SEARCH_SHORT_PREFIX = 3
+SEARCH_RANK_CANDIDATES = 1000
+
+# bm25 column weights, in GlobalSearch column order:
+# entityType, entityId, label, popularity (unindexed), name, detail, place, keywords
+SEARCH_WEIGHTS = "0, 0, 0, 0, 10.0, 4.0, 2.0, 1.0"
+
+MATCH_IN_BLOCK = "GlobalSearch MATCH :match AND rowid BETWEEN :low AND :high"
+
+# Only rowid and bm25 are computed per match (index reads); the stored
+# columns are read back for the `limit` best rows. Lower bm25 = more
+# relevant, ties go to the more popular (lower) rowid.
+RANKED_SQL = f"""
+    SELECT g.entityId, g.label, g.name, g.detail, g.place, r.score
+    FROM (
+        SELECT rowid, bm25(GlobalSearch, {SEARCH_WEIGHTS}) AS score
+        FROM GlobalSearch
+        WHERE {MATCH_IN_BLOCK}
+        ORDER BY score, rowid
+        LIMIT :limit
+    ) r
+    JOIN GlobalSearch g ON g.rowid = r.rowid
+    ORDER BY r.score, r.rowid
+"""
+
+
+def _search_group(db: Session, match: str, entity_type: str, limit: int, short_prefix: bool) -> dict:
+    low = SEARCH_ENTITY_BLOCKS[entity_type] * SEARCH_ROWID_BLOCK
+    params = {"match": match, "low": low, "high": low + SEARCH_ROWID_BLOCK - 1}
+    total = db.execute(text(f"SELECT COUNT(*) FROM GlobalSearch WHERE {MATCH_IN_BLOCK}"), params).scalar()
+    if short_prefix and total > SEARCH_RANK_CANDIDATES:
+        params["high"] = db.execute(
+            text(f"SELECT rowid FROM GlobalSearch WHERE {MATCH_IN_BLOCK} ORDER BY rowid LIMIT 1 OFFSET :offset"),
+            dict(params, offset=SEARCH_RANK_CANDIDATES - 1),
+        ).scalar()
+
+    rows = db.execute(text(RANKED_SQL), dict(params, limit=limit)).all() if total else []
+    return {
+        "total": total,
+        "items": [
+            {
+                "id": entity_id,
+                "name": name,
+                "label": label,
+                "detail": detail,
+                "place": place,
+                # bm25 is negative, closer to 0 = less relevant
+                "score": round(-score, 3),
+            } for entity_id, label, name, detail, place, score in rows
+        ],
+    }
+
+
+def _global_search(db: Session, q: str, types: List[str], limit: int):
+    if not table_available(db, "GlobalSearch"):
+        raise HTTPException(status_code=400, detail="Search needs the GlobalSearch table (run ingestion/post_ingest.py)")
+
+    match = fts_prefix_query(q)
+    # Words are split as in fts_prefix_query; the last one is still being typed
+    words = re.findall(r"\w+", q)
+    short_prefix = bool(words) and len(words[-1]) < SEARCH_SHORT_PREFIX
+    result = {"query": q}
+    for entity_type in types:
+        result[SEARCH_GROUPS[entity_type]] = _search_group(db, match, entity_type, limit, short_prefix) if match \
+            else {"total": 0, "items": []}
+    return result
+
+
+@router.get("")
+async def global_search(
+    q: str = Query(..., min_length=2, description="Free text; every word is matched as a prefix, accents and case ignored"),
+    types: Optional[str] = Query(None, description="Comma-separated: formation, school, master (default all)"),
+    limit: int = Query(5, ge=1, le=50, description="Results per entity type"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Search formations, schools and master programmes at once.
+
+    Returns {"query", "formations", "schools", "masters"}, each group being
+    {"total": matches, "items": best `limit` matches, most relevant first}.
+    Full records are available from the batch endpoints of each router.
+    """
+    requested = [t.strip() for t in (types or "").split(",") if t.strip()] or list(SEARCH_GROUPS)
+    unknown = [t for t in requested if t not in SEARCH_GROUPS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown type(s): {', '.join(unknown)}")
+    return await db.run_sync(_global_search, q, [t for t in SEARCH_GROUPS if t in requested], limit)
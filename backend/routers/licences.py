@@ -1,85 +1,114 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
 from typing import List, Optional
 from .. import models, schemas
-from ..database import get_db
+from ..cache import reference_data
+from ..database import get_async_db, get_db, table_available
+from ..pagination import after_key, decode_cursor, keyset_order, next_cursor
+from ..specialties import specialty_matrix
+from ingestion.matching import licence_keywords, master_secteur_keywords
 
 router = APIRouter(
     prefix="/licences",
     tags=["licences"]
 )
 
-@router.get("/types", response_model=List[str])
-def get_licence_types(db: Session = Depends(get_db)):
-    """Return distinct Licence formation types from SpecialtyAdmissionStats."""
+@reference_data("licences.types")
+def _get_licence_types(db: Session):
     results = db.query(models.SpecialtyAdmissionStats.cpgeCategory)\
         .filter(models.SpecialtyAdmissionStats.cpgeCategory.like("Licence%"))\
         .distinct().all()
     return sorted([r[0] for r in results if r[0]])
 
-@router.get("/formations")
-def get_licence_formations(
-    licence_type: Optional[str] = Query(None, description="The Licence type to filter by"),
-    department: Optional[str] = Query(None, description="Optional department code filter"),
-    db: Session = Depends(get_db)
+@router.get("/types", response_model=List[str])
+async def get_licence_types(db: AsyncSession = Depends(get_async_db)):
+    """Return distinct Licence formation types from SpecialtyAdmissionStats."""
+    return await db.run_sync(_get_licence_types)
+
+# sort= orders; NULLs last, id keeps pages stable
+LICENCE_SORTS = {
+    "admission_rate": lambda f: [f.admissionRate.is_(None), f.admissionRate.asc(), f.id],
+    "-admission_rate": lambda f: [f.admissionRate.is_(None), f.admissionRate.desc(), f.id],
+    "capacity": lambda f: [f.capacity.is_(None), f.capacity.asc(), f.id],
+    "-capacity": lambda f: [f.capacity.is_(None), f.capacity.desc(), f.id],
+    "name": lambda f: [f.name, f.id],
+}
+
+def _licence_keyword_filter(licence_type: str):
+    """Runtime keyword matching, for licence types without FormationLicenceType rows."""
+    keywords = licence_keywords(licence_type)
+    if not keywords:
+        return None
+    # Any keyword matches
+    return or_(*[models.Formation.filiereFormationDetaillee.ilike(f"%{kw}%") for kw in keywords])
+
+@reference_data("licences.linked_types")
+def _linked_licence_types(db: Session):
+    """Licence types with formations in FormationLicenceType."""
+    if not table_available(db, "FormationLicenceType"):
+        return frozenset()
+    return frozenset(
+        r[0] for r in db.query(models.FormationLicenceType.licenceType).distinct().all()
+    )
+
+def _get_licence_formations(
+    db: Session,
+    licence_type: Optional[str],
+    department: Optional[str],
+    limit: int,
+    cursor: Optional[str],
+    sort: Optional[str] = None,
+    page: Optional[int] = None,
 ):
-    """Return Licence formations filtered by type using keyword matching.
-    
-    The licence_type (e.g. 'Licence Mathématiques') is broken into keywords
-    and matched against Formation.filiereFormationDetaillee using ILIKE.
-    """
+    if cursor is not None and sort not in (None, "admission_rate"):
+        raise HTTPException(status_code=400, detail=f"sort={sort} can't be combined with cursor pagination")
+    if cursor is not None and page is not None:
+        raise HTTPException(status_code=400, detail="page can't be combined with cursor pagination")
+
     # Build query for Licence formations
     query = db.query(models.Formation)\
         .options(
             joinedload(models.Formation.school).joinedload(models.School.locations)
         )\
         .filter(models.Formation.category == "Licence")
-    
-    # Keyword-based filtering on licence type
+
     if licence_type:
-        # Some licence types need explicit keyword overrides because their names
-        # don't match the filiereFormationDetaillee naming convention
-        KEYWORD_OVERRIDES = {
-            "Licence Langues et littératures françaises": ["Lettres"],
-            "Licence Sciences économiques": ["Economie", "économique"],
-            "Licence Pluri Lettres - Langues - Sciences humaines": ["Lettres"],
-            "Licence Pluri Sciences": ["Sciences"],
-            "Licence Pluri Sciences humaines et sociales": ["Sciences", "sociales"],
-            "Licence Pluri Sciences de la vie, de la santé, de la terre et de l univers": ["Sciences", "vie"],
-            "Licence Sciences de l éducation": ["éducation"],
-            "Licence Archéologie, Ethno, Préhistoire, Anthropologie": ["Archéologie"],
-            "Licence Electronique, Génie électrique, EEA": ["Electronique"],
-            "Licence Mécanique, Génie mécanique, Ingénierie mécanique": ["Mécanique"],
-            "Licence Sciences de l univers, de la terre, de l espace": ["Terre"],
-        }
-        
-        if licence_type in KEYWORD_OVERRIDES:
-            # Use override keywords with OR logic (any keyword matches)
-            conditions = [
-                models.Formation.filiereFormationDetaillee.ilike(f"%{kw}%")
-                for kw in KEYWORD_OVERRIDES[licence_type]
-            ]
-            query = query.filter(or_(*conditions))
+        if licence_type in _linked_licence_types(db):
+            # Keyword matching resolved at ingest; one row per (type, formation)
+            query = query.join(
+                models.FormationLicenceType,
+                models.FormationLicenceType.formationId == models.Formation.id,
+            ).filter(models.FormationLicenceType.licenceType == licence_type)
         else:
-            # Extract subject: "Licence Mathématiques" -> "Mathématiques"
-            subject = licence_type.replace("Licence ", "", 1).strip()
-            # Split into words, remove French stop words
-            stop_words = {"et", "de", "la", "le", "les", "du", "des", "l", "d", "en"}
-            keywords = [w for w in subject.split() if w.lower() not in stop_words and len(w) > 1]
-            if keywords:
-                # Use first keyword for broader matching
-                query = query.filter(
-                    models.Formation.filiereFormationDetaillee.ilike(f"%{keywords[0]}%")
-                )
-    
-    # Filter by department if specified
+            condition = _licence_keyword_filter(licence_type)
+            if condition is not None:
+                query = query.filter(condition)
+
+    # Filter by department if specified. EXISTS instead of a join: a school
+    # with several locations in the department would repeat the formation
     if department:
-        query = query.join(models.Formation.school).join(models.School.locations)\
-            .filter(models.SchoolLocation.departmentCode == department)
-    
-    formations = query.limit(50).all()
+        query = query.filter(models.Formation.school.has(
+            models.School.locations.any(models.SchoolLocation.departmentCode == department)
+        ))
+
+    page_cursor = None
+    total = None
+    if cursor is not None:
+        # Same order as sort=admission_rate (NULLs last), resumed after the cursor
+        last = decode_cursor(cursor, 2)
+        if last is not None:
+            query = query.filter(after_key(models.Formation.admissionRate, models.Formation.id, *last))
+        query = query.order_by(*keyset_order(models.Formation.admissionRate, models.Formation.id))
+        formations = query.limit(limit + 1).all()
+        page_cursor = next_cursor(formations, limit, lambda f: (f.admissionRate, f.id))
+    else:
+        page = page or 1
+        total = query.count()
+        query = query.order_by(*LICENCE_SORTS[sort or "admission_rate"](models.Formation))
+        formations = query.offset((page - 1) * limit).limit(limit).all()
     
     result = []
     for f in formations:
@@ -94,7 +123,7 @@ def get_licence_formations(
             "capacity": f.capacity,
             "selectivity": f.selectivity,
             "parcoursupLink": f.parcoursupLink,
-            "mentionDistribution": f.mentionDistribution,  # JSON string with mention percentages
+            "mentionDistribution": f.mentionDistribution,  # mention percentages, parsed on load
             "school": {
                 "uai": school.uai if school else None,
                 "name": school.name if school else None,
@@ -103,40 +132,70 @@ def get_licence_formations(
             } if school else None
         })
     
+    if cursor is not None:
+        return {"items": result, "size": limit, "next_cursor": page_cursor}
+    return {"items": result, "total": total, "page": page, "size": limit}
+
+# CPU-bound: plain def on the thread pool (see get_async_db)
+@router.get("/formations", response_model=schemas.PaginatedLicenceFormations, response_model_exclude_unset=True)
+def get_licence_formations(
+    licence_type: Optional[str] = Query(None, description="The Licence type to filter by"),
+    department: Optional[str] = Query(None, description="Optional department code filter"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Keyset pagination: pass an empty value for the first page, then the returned next_cursor"),
+    sort: Optional[str] = Query(None, pattern="^(admission_rate|-admission_rate|capacity|-capacity|name)$", description="Result order ('-' for descending)"),
+    page: Optional[int] = Query(None, ge=1, description="Page number (default 1), not combinable with cursor"),
+    db: Session = Depends(get_db)
+):
+    """Return Licence formations of a licence type.
+
+    Formations are linked to licence types at ingest (FormationLicenceType);
+    types without links fall back to keyword matching on
+    Formation.filiereFormationDetaillee. Each formation is returned once.
+
+    Returns {"items", "total", "page", "size"} pages. With `cursor`, returns
+    {"items", "size", "next_cursor"} keyset pages ordered by
+    (admissionRate, id) instead, without the total.
+    """
+    return _get_licence_formations(db, licence_type, department, limit, cursor, sort, page)
+
+# CPU-bound: plain def on the thread pool (see get_async_db)
+@router.get("/formations/legacy", response_model=List[schemas.LicenceFormation], response_model_exclude_unset=True, deprecated=True)
+def get_licence_formations_legacy(
+    licence_type: Optional[str] = Query(None, description="The Licence type to filter by"),
+    department: Optional[str] = Query(None, description="Optional department code filter"),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
+    """Deprecated: the first page of /licences/formations as a plain list."""
+    return _get_licence_formations(db, licence_type, department, limit, None)["items"]
+
+def _get_licence_admission_rates(db: Session, specialty1: str, specialty2: str):
+    result = {}
+    for category, stats in specialty_matrix.pair(db, specialty1, specialty2).items():
+        # Same match as the former cpgeCategory LIKE 'Licence%'
+        if category and category.lower().startswith("licence"):
+            result[category] = {
+                "admissionRatePct": stats["admissionRatePct"],
+                "candidats": stats["candidats"],
+            }
+
     return result
 
 @router.get("/admission-rates")
-def get_licence_admission_rates(
+async def get_licence_admission_rates(
     specialty1: str = Query(..., description="First specialty ID"),
     specialty2: str = Query(..., description="Second specialty ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get admission rates for all Licence types given a specialty pair.
     Returns a dict mapping licence type to admission rate percentage.
     """
-    # Ensure consistent ordering (spec1 < spec2)
-    if specialty1 > specialty2:
-        specialty1, specialty2 = specialty2, specialty1
-    
-    stats = db.query(models.SpecialtyAdmissionStats)\
-        .filter(models.SpecialtyAdmissionStats.specialty1Id == specialty1)\
-        .filter(models.SpecialtyAdmissionStats.specialty2Id == specialty2)\
-        .filter(models.SpecialtyAdmissionStats.cpgeCategory.like("Licence%"))\
-        .all()
-    
-    result = {}
-    for stat in stats:
-        result[stat.cpgeCategory] = {
-            "admissionRatePct": round(stat.admissionRatePct, 1) if stat.admissionRatePct else None,
-            "candidats": stat.candidats,
-        }
-    
-    return result
+    return await db.run_sync(_get_licence_admission_rates, specialty1, specialty2)
 
-@router.get("/departments")
-def get_licence_departments(db: Session = Depends(get_db)):
-    """Get all departments that have Licence formations."""
+@reference_data("licences.departments")
+def _get_licence_departments(db: Session):
     # Simple query: get all distinct departments from schools that have Licence formations
     results = db.query(
         models.SchoolLocation.departmentCode,
@@ -150,44 +209,22 @@ def get_licence_departments(db: Session = Depends(get_db)):
     
     return [{"code": r[0], "name": r[1]} for r in sorted(results, key=lambda x: x[0] or "")]
 
+@router.get("/departments")
+async def get_licence_departments(db: AsyncSession = Depends(get_async_db)):
+    """Get all departments that have Licence formations."""
+    return await db.run_sync(_get_licence_departments)
 
-@router.get("/{licence_type}/top-masters")
-def get_top_masters_for_licence(
-    licence_type: str,
-    db: Session = Depends(get_db)
-):
-    """
-    Given a Licence type (e.g., 'Licence Mathématiques'), find the matching
-    Master Secteur(s) and return the Top highly-selective Master formations.
-    """
-    # 1. Broad keyword mapping from Licence to Master Secteur
-    # Explicit overrides for tricky names
-    MAPPING_OVERRIDES = {
-        "Licence Sciences économiques": ["économie", "économétrie"],
-        "Licence Droit": ["juridiques", "droit européen"],
-        "Licence Histoire de l'art et archéologie": ["histoire de l'art", "archéologie"],
-        "Licence Langues, littératures et civilisations étrangères et régionales": ["langues, littératures et civilisations"],
-        "Licence STAPS": ["activités physiques et sportives"],
-        "Licence Sciences de la vie, de la santé, de la terre et de l univers": ["sciences de la vie", "sciences de la terre"],
-        "Licence Administration économique et sociale": ["administration économique et sociale", "management", "gestion"],
-        "Licence Mathématiques et informatique appliquées aux sciences humaines et sociales": ["mathématiques", "informatique", "sciences humaines"],
-        "Licence Physique, chimie": ["physique", "chimie"],
-        "Licence Sciences pour l'ingénieur": ["ingénieur", "mécanique", "électronique"],
-        "Licence Sciences sanitaires et sociales": ["santé", "sciences sociales"],
-        "Licence Sciences sociales": ["sociologie", "sciences sociales"],
-        "Licence Sciences de la vie": ["sciences de la vie", "biologie"],
-        "Licence Sciences de la Terre": ["sciences de la terre", "géosciences"],
-    }
-
-    keywords = []
-    if licence_type in MAPPING_OVERRIDES:
-        keywords = MAPPING_OVERRIDES[licence_type]
-    else:
-        # Extract keywords dynamically
-        subject = licence_type.replace("Licence ", "", 1).replace("Double ", "", 1).strip()
-        stop_words = {"et", "de", "la", "le", "les", "du", "des", "l", "d", "en", "aux", "pour", "ou"}
-        keywords = [w for w in subject.split() if w.lower() not in stop_words and len(w) > 3]
 
+# Rank buckets of the response: 1-3, 4-9, 10-15, then everything after
+TOP_MASTER_BUCKETS = [("top3", 3), ("top9", 9), ("top15", 15)]
+
+def _top_masters_runtime(
+    db: Session, licence_type: str, n: int, region: Optional[str], alternance: Optional[bool]
+) -> List[models.MonMasterFormation]:
+    """Keyword matching on secteurDisciplinaire, for licence types not
+    resolved at ingest."""
+    # 1. Broad keyword mapping from Licence to Master Secteur
+    keywords = master_secteur_keywords(licence_type)
     if not keywords:
         return []
 
@@ -197,18 +234,62 @@ def get_top_masters_for_licence(
         for kw in keywords
     ]
     
-    # 3. Query the absolute top 15 formations across matching disciplines
+    # 3. Query the top formations across matching disciplines
     # Applying the same criteria used for rankings: capacite >= 20, candidats > 50
-    formations = db.query(models.MonMasterFormation)\
+    query = db.query(models.MonMasterFormation)\
         .filter(or_(*conditions))\
         .filter(models.MonMasterFormation.capacite >= 20)\
         .filter(models.MonMasterFormation.candidats > 50)\
-        .filter(models.MonMasterFormation.admissionRate != None)\
-        .order_by(models.MonMasterFormation.admissionRate.asc())\
-        .limit(15)\
+        .filter(models.MonMasterFormation.admissionRate != None)
+    if region is not None:
+        query = query.filter(models.MonMasterFormation.region == region)
+    if alternance is not None:
+        query = query.filter(models.MonMasterFormation.alternance == alternance)
+    return query.order_by(models.MonMasterFormation.admissionRate.asc(), models.MonMasterFormation.id)\
+        .limit(n)\
         .all()
 
+@reference_data("licences.resolved_master_types")
+def _resolved_master_licence_types(db: Session):
+    """Licence types resolved at ingest, including those matching no secteur."""
+    if not table_available(db, "LicenceMasterPathway"):
+        return frozenset()
+    return frozenset(
+        r[0] for r in db.query(models.LicenceSecteur.licenceType).distinct().all()
+    )
+
+def _top_masters_precomputed(
+    db: Session, licence_type: str, n: int, region: Optional[str], alternance: Optional[bool]
+) -> Optional[List[models.MonMasterFormation]]:
+    """Ranked masters from LicenceMasterPathway, None when the licence type
+    wasn't resolved at ingest."""
+    if licence_type not in _resolved_master_licence_types(db):
+        return None
+
+    pathway = models.LicenceMasterPathway
+    query = db.query(models.MonMasterFormation)\
+        .join(pathway, pathway.monMasterFormationId == models.MonMasterFormation.id)\
+        .filter(pathway.licenceType == licence_type)
+    if region is not None:
+        query = query.filter(pathway.region == region)
+    if alternance is not None:
+        query = query.filter(pathway.alternance == alternance)
+    return query.order_by(pathway.rank).limit(n).all()
+
+def _get_top_masters_for_licence(
+    db: Session,
+    licence_type: str,
+    n: int = 15,
+    region: Optional[str] = None,
+    alternance: Optional[bool] = None,
+):
+    formations = _top_masters_precomputed(db, licence_type, n, region, alternance)
+    if formations is None:
+        formations = _top_masters_runtime(db, licence_type, n, region, alternance)
+
     result = {"top3": [], "top9": [], "top15": []}
+    if n > TOP_MASTER_BUCKETS[-1][1]:
+        result["more"] = []
     
     for i, formation in enumerate(formations):
         data = {
@@ -229,12 +310,25 @@ def get_top_masters_for_licence(
             "secteurDisciplinaire": formation.secteurDisciplinaire,
         }
         
-        # Bucket by rank (1-3, 4-9, 10-15)
-        if i < 3:
-            result["top3"].append(data)
-        elif i < 9:
-            result["top9"].append(data)
-        else:
-            result["top15"].append(data)
+        # Bucket by rank (1-3, 4-9, 10-15, 16+)
+        bucket = next((name for name, last in TOP_MASTER_BUCKETS if i < last), "more")
+        result[bucket].append(data)
 
     return result
+
+# CPU-bound: plain def on the thread pool (see get_async_db)
+@router.get("/{licence_type}/top-masters")
+def get_top_masters_for_licence(
+    licence_type: str,
+    n: int = Query(15, ge=1, le=100, description="Number of masters to return; ranks after 15 go to 'more'"),
+    region: Optional[str] = Query(None, description="Only masters in this region"),
+    alternance: Optional[bool] = Query(None, description="Only work-study (true) or non work-study (false) masters"),
+    db: Session = Depends(get_db)
+):
+    """
+    Given a Licence type (e.g., 'Licence Mathématiques'), find the matching
+    Master Secteur(s) and return the Top highly-selective Master formations.
+    The licence -> secteur mapping and the ranking are precomputed at ingest
+    (LicenceMasterPathway).
+    """
+    return _get_top_masters_for_licence(db, licence_type, n, region, alternance)
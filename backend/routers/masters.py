@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from .. import models
-from ..database import get_db
+from .. import models, schemas
+from ..cache import reference_data
+from ..database import get_async_db
+from ..pagination import after_key, batch_result, decode_cursor, keyset_order, next_cursor
 
 router = APIRouter(
     prefix="/masters",
@@ -10,14 +13,13 @@ router = APIRouter(
 )
 
 
-@router.get("/secteurs")
-def get_secteurs(db: Session = Depends(get_db)):
-    """Return all distinct secteurs disciplinaires that have ranked formations."""
+@reference_data("masters.secteurs")
+def _get_secteurs(db: Session):
     results = db.query(
-        models.MasterSecteur.secteurId,
-        models.MasterSecteur.secteurDisciplinaire,
+        models.MonMasterFormation.secteurId,
+        models.MonMasterFormation.secteurDisciplinaire,
     ).filter(
-        models.MasterSecteur.tier == "top3"
+        models.MonMasterFormation.secteurRank != None
     ).distinct().all()
 
     return sorted([
@@ -26,84 +28,93 @@ def get_secteurs(db: Session = Depends(get_db)):
     ], key=lambda x: x["name"])
 
 
-@router.get("/secteur/{secteur_id}")
-def get_secteur_formations(
-    secteur_id: str,
-    tier: str = Query("top10", description="Tier filter: top3, top5, top10"),
-    db: Session = Depends(get_db)
-):
-    """Return ranked master formations for a secteur disciplinaire and tier.
-    
-    Returns formations sorted by rank (most selective first) with
-    establishment details and admission stats.
-    """
-    master_secteur_id = f"{secteur_id}-{tier}"
+@router.get("/secteurs")
+async def get_secteurs(db: AsyncSession = Depends(get_async_db)):
+    """Return all distinct secteurs disciplinaires that have ranked formations."""
+    return await db.run_sync(_get_secteurs)
 
-    # Fetch the secteur
-    secteur = db.query(models.MasterSecteur).filter(
-        models.MasterSecteur.id == master_secteur_id
-    ).first()
 
-    if not secteur:
+# Former fixed tiers, still accepted by /secteur/{id}
+SECTEUR_TIERS = {"top3": 3, "top5": 5, "top10": 10}
+
+
+def _get_secteur_formations(
+    db: Session, secteur_id: str, n: int, region: Optional[str], alternance: Optional[bool]
+):
+    formation = models.MonMasterFormation
+    name = db.query(formation.secteurDisciplinaire)\
+        .filter(formation.secteurId == secteur_id)\
+        .filter(formation.secteurRank == 1)\
+        .scalar()
+    if name is None:
         return {"secteur": None, "formations": []}
 
-    # Fetch ranked formations
-    rankings = db.query(
-        models.MasterSecteurFormation,
-        models.MonMasterFormation,
-    ).join(
-        models.MonMasterFormation,
-        models.MasterSecteurFormation.monMasterFormationId == models.MonMasterFormation.id
-    ).filter(
-        models.MasterSecteurFormation.masterSecteurId == master_secteur_id
-    ).order_by(
-        models.MasterSecteurFormation.rank
-    ).all()
+    query = db.query(formation)\
+        .filter(formation.secteurId == secteur_id)\
+        .filter(formation.secteurRank != None)
+    if region is not None:
+        query = query.filter(formation.region == region)
+    if alternance is not None:
+        query = query.filter(formation.alternance == alternance)
+    rankings = query.order_by(formation.secteurRank).limit(n).all()
 
     formations = []
-    for ranking, formation in rankings:
+    for position, f in enumerate(rankings, start=1):
         formations.append({
-            "rank": ranking.rank,
-            "id": formation.id,
-            "mention": formation.mention,
-            "parcours": formation.parcours,
-            "etablissement": formation.etablissementNom,
-            "etablissementId": formation.etablissementId,
-            "ville": formation.ville,
-            "academie": formation.academie,
-            "region": formation.region,
-            "admissionRate": formation.admissionRate,
-            "capacite": formation.capacite,
-            "candidats": formation.candidats,
-            "acceptes": formation.acceptes,
-            "rangDernierAppelePP": formation.rangDernierAppelePP,
-            "pctFemmes": formation.pctFemmes,
-            "alternance": formation.alternance,
+            # Position in this (possibly filtered) list; secteurRank is the
+            # rank among all formations of the secteur
+            "rank": position,
+            "secteurRank": f.secteurRank,
+            "id": f.id,
+            "mention": f.mention,
+            "parcours": f.parcours,
+            "etablissement": f.etablissementNom,
+            "etablissementId": f.etablissementId,
+            "ville": f.ville,
+            "academie": f.academie,
+            "region": f.region,
+            "admissionRate": f.admissionRate,
+            "capacite": f.capacite,
+            "candidats": f.candidats,
+            "acceptes": f.acceptes,
+            "rangDernierAppelePP": f.rangDernierAppelePP,
+            "pctFemmes": f.pctFemmes,
+            "alternance": f.alternance,
         })
 
     return {
         "secteur": {
-            "id": secteur.secteurId,
-            "name": secteur.secteurDisciplinaire,
-            "tier": secteur.tier,
+            "id": secteur_id,
+            "name": name,
+            "tier": f"top{n}",
         },
         "formations": formations,
     }
 
 
-@router.get("/formation/{formation_id}")
-def get_master_formation(
-    formation_id: str,
-    db: Session = Depends(get_db)
+@router.get("/secteur/{secteur_id}")
+async def get_secteur_formations(
+    secteur_id: str,
+    n: Optional[int] = Query(None, ge=1, le=100, description="Number of formations (default 10)"),
+    tier: Optional[str] = Query(None, description="Legacy alias of n: top3, top5, top10"),
+    region: Optional[str] = Query(None, description="Filter by region"),
+    alternance: Optional[bool] = Query(None, description="Filter by alternance"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Return detailed information for a specific master formation."""
-    formation = db.query(models.MonMasterFormation).filter(
-        models.MonMasterFormation.id == formation_id
-    ).first()
+    """Return the `n` most selective master formations of a secteur disciplinaire.
 
-    if not formation:
-        return None
+    Returns formations sorted by rank (most selective first) with
+    establishment details and admission stats. With `region` or
+    `alternance`, the top `n` among the matching formations.
+    """
+    if n is None:
+        if tier is not None and tier not in SECTEUR_TIERS:
+            raise HTTPException(status_code=400, detail=f"Unknown tier: {tier} (use n=)")
+        n = SECTEUR_TIERS[tier or "top10"]
+    return await db.run_sync(_get_secteur_formations, secteur_id, n, region, alternance)
 
+
+def _master_formation_dict(formation: models.MonMasterFormation) -> dict:
     return {
         "id": formation.id,
         "mention": formation.mention,
@@ -131,16 +142,51 @@ def get_master_formation(
     }
 
 
-@router.get("/search")
-def search_master_formations(
-    mention: Optional[str] = Query(None, description="Search by mention name"),
-    secteur_id: Optional[str] = Query(None, description="Filter by secteur disciplinaire ID"),
-    region: Optional[str] = Query(None, description="Filter by region"),
-    alternance: Optional[bool] = Query(None, description="Filter by alternance"),
-    limit: int = Query(50, ge=1, le=200),
-    db: Session = Depends(get_db)
+def _get_master_formation(db: Session, formation_id: str):
+    formation = db.query(models.MonMasterFormation).filter(
+        models.MonMasterFormation.id == formation_id
+    ).first()
+
+    if not formation:
+        return None
+
+    return _master_formation_dict(formation)
+
+
+@router.get("/formation/{formation_id}")
+async def get_master_formation(
+    formation_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Return detailed information for a specific master formation."""
+    return await db.run_sync(_get_master_formation, formation_id)
+
+
+def _get_master_formations_batch(db: Session, ids: List[str]):
+    formations = db.query(models.MonMasterFormation).filter(
+        models.MonMasterFormation.id.in_(set(ids))
+    ).all() if ids else []
+    return batch_result(ids, {f.id: f for f in formations}, _master_formation_dict)
+
+
+@router.post("/formations/batch")
+async def get_master_formations_batch(
+    body: schemas.BatchRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Return several master formations in request order (null for unknown ids)."""
+    return await db.run_sync(_get_master_formations_batch, body.ids)
+
+
+def _search_master_formations(
+    db: Session,
+    mention: Optional[str],
+    secteur_id: Optional[str],
+    region: Optional[str],
+    alternance: Optional[bool],
+    limit: int,
+    cursor: Optional[str],
 ):
-    """Search master formations with filters."""
     query = db.query(models.MonMasterFormation)
 
     if mention:
@@ -163,14 +209,20 @@ def search_master_formations(
             models.MonMasterFormation.alternance == alternance
         )
 
-    # Sort by admission rate (most selective first), nulls last
-    query = query.order_by(
-        models.MonMasterFormation.admissionRate.asc().nullslast()
-    )
+    # Keyset pages: admission rate (most selective first), nulls last, id as
+    # tie-breaker; an absent or empty cursor is the first page
+    last = decode_cursor(cursor, 2)
+    if last is not None:
+        query = query.filter(after_key(
+            models.MonMasterFormation.admissionRate, models.MonMasterFormation.id, *last
+        ))
+    query = query.order_by(*keyset_order(
+        models.MonMasterFormation.admissionRate, models.MonMasterFormation.id
+    ))
+    formations = query.limit(limit + 1).all()
+    page_cursor = next_cursor(formations, limit, lambda f: (f.admissionRate, f.id))
 
-    formations = query.limit(limit).all()
-
-    return [{
+    items = [{
         "id": f.id,
         "mention": f.mention,
         "parcours": f.parcours,
@@ -184,3 +236,37 @@ def search_master_formations(
         "alternance": f.alternance,
         "secteurDisciplinaire": f.secteurDisciplinaire,
     } for f in formations]
+
+    return {"items": items, "next_cursor": page_cursor}
+
+
+@router.get("/search", response_model=schemas.MasterFormationPage, response_model_exclude_unset=True)
+async def search_master_formations(
+    mention: Optional[str] = Query(None, description="Search by mention name"),
+    secteur_id: Optional[str] = Query(None, description="Filter by secteur disciplinaire ID"),
+    region: Optional[str] = Query(None, description="Filter by region"),
+    alternance: Optional[bool] = Query(None, description="Filter by alternance"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Keyset pagination: omit for the first page, then pass the returned next_cursor"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Search master formations with filters.
+
+    Returns {"items": [...], "next_cursor": ...} pages of `limit` items;
+    pass `next_cursor` back as `cursor` for the next page.
+    """
+    return await db.run_sync(_search_master_formations, mention, secteur_id, region, alternance, limit, cursor)
+
+
+@router.get("/search/legacy", response_model=List[schemas.MasterFormationSummary], deprecated=True)
+async def search_master_formations_legacy(
+    mention: Optional[str] = Query(None, description="Search by mention name"),
+    secteur_id: Optional[str] = Query(None, description="Filter by secteur disciplinaire ID"),
+    region: Optional[str] = Query(None, description="Filter by region"),
+    alternance: Optional[bool] = Query(None, description="Filter by alternance"),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Deprecated: the first page of /masters/search as a plain list."""
+    page = await db.run_sync(_search_master_formations, mention, secteur_id, region, alternance, limit, None)
+    return page["items"]
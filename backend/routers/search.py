@@ -1,9 +1,18 @@
+import re
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import or_
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import Float, String, func, literal_column, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, load_only, noload, selectinload
 from typing import List, Optional
 from .. import models, schemas
-from ..database import get_db
+from ..cache import TTLCache, get_dataset_version, reference_data
+from ..database import get_async_db, get_db, table_available
+from ..filieres import filiere_resolver
+from ..geo import (
+    CLUSTER_CELL_OFFSET, CLUSTER_MAX_ZOOM, CLUSTER_MIN_ZOOM, bounding_box, location_box_filter, mercator_cell
+)
+from ..pagination import after_key, batch_result, decode_cursor, keyset_order, next_cursor
+from ..specialties import specialty_matrix
 
 router = APIRouter(
     prefix="/formations",
@@ -12,48 +21,72 @@ router = APIRouter(
 
 def get_parcoursup_types(cpge_type: str, db: Session, school_uai: Optional[str] = None) -> List[str]:
     """
-    Map scraper CPGE types to Parcoursup formation names using CpgeMapping table.
+    Map scraper CPGE types to Parcoursup formation names using CpgeMapping table
+    (kept in memory by filiere_resolver).
     """
-    # 1. Check for school-specific overrides
-    if school_uai:
-        overrides = db.query(models.CpgeMapping.parcoursupFiliere)\
-            .filter(models.CpgeMapping.etudiantType == cpge_type)\
-            .filter(models.CpgeMapping.schoolUai == school_uai)\
-            .all()
-        if overrides:
-            return [o[0] for o in overrides]
+    return filiere_resolver.parcoursup_types(db, cpge_type, school_uai)
 
-    # 2. Check for global mappings
-    global_mappings = db.query(models.CpgeMapping.parcoursupFiliere)\
-        .filter(models.CpgeMapping.etudiantType == cpge_type)\
-        .filter(models.CpgeMapping.schoolUai == None)\
-        .all()
-    if global_mappings:
-        return [g[0] for g in global_mappings]
-    
-    # 3. Fallback to hardcoded logic if no mapping exists
-    t = cpge_type.upper()
-    if "LETTRES" in t or "B/L" in t or "A/L" in t or "LSH" in t:
-        return ["Lettres", "B/L", "A/L"]
-    
-    if "ECG" in t:
-        return ["ECG"]
-    
-    if "BCPST" in t:
-        return ["BCPST"]
-        
-    return [cpge_type]
+# ============================================
+# Full-text search (FormationSearch FTS5 table)
+# ============================================
 
-@router.get("/categories", response_model=List[str])
-def get_categories(db: Session = Depends(get_db)):
+def formation_search_available(db: Session) -> bool:
+    return table_available(db, "FormationSearch")
+
+def fts_prefix_query(value: str) -> Optional[str]:
+    """'Saint-Ét' -> '"Saint"* AND "Ét"*'. Every word must match as a token prefix;
+    accents and case are folded by the unicode61 tokenizer."""
+    words = re.findall(r"\w+", value)
+    if not words:
+        return None
+    return " AND ".join(f'"{w}"*' for w in words)
+
+def build_formation_match(
+    city: Optional[str] = None,
+    school_name: Optional[str] = None,
+    filieres: Optional[List[str]] = None,
+) -> Optional[str]:
+    """Combine text filters into one FTS5 MATCH expression (None when there is nothing to match)."""
+    clauses = []
+    city_query = fts_prefix_query(city) if city else None
+    if city_query:
+        clauses.append(f"city : ({city_query})")
+    school_query = fts_prefix_query(school_name) if school_name else None
+    if school_query:
+        clauses.append(f"school : ({school_query})")
+    if filieres:
+        phrases = []
+        for f in sorted(set(filieres)):
+            words = re.findall(r"\w+", f)
+            if words:
+                # Phrase with a prefix on the last word, like the old '%MP%' matching 'MPSI'
+                phrases.append('"' + " ".join(words) + '"*')
+        if phrases:
+            clauses.append(f"filiereBis : ({' OR '.join(phrases)})")
+    if not clauses:
+        return None
+    return " AND ".join(clauses)
+
+def formation_search_subquery(match: str):
+    """(formationId, score) rows for a MATCH expression; lower score = more relevant (bm25)."""
+    return text(
+        "SELECT formationId, bm25(FormationSearch) AS score "
+        "FROM FormationSearch WHERE FormationSearch MATCH :match"
+    ).bindparams(match=match).columns(formationId=String, score=Float).subquery("fts")
+
+@reference_data("formations.categories")
+def _get_categories(db: Session):
     # Efficiently get distinct categories
     categories = db.query(models.Formation.category).distinct().all()
     # Flatten the list of tuples
     return sorted([c[0] for c in categories if c[0]])
 
-@router.get("/filters/cpge-filieres", response_model=List[str])
-def get_cpge_filieres(db: Session = Depends(get_db)):
-    """Return distinct 'filiereFormationDetailleeBis' for CPGE category"""
+@router.get("/categories", response_model=List[str])
+async def get_categories(db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(_get_categories)
+
+@reference_data("formations.cpge_filieres")
+def _get_cpge_filieres(db: Session):
     results = db.query(models.Formation.filiereFormationDetailleeBis)\
         .filter(models.Formation.category.ilike("%CPGE%"))\
         .filter(models.Formation.filiereFormationDetailleeBis != None)\
@@ -61,15 +94,152 @@ def get_cpge_filieres(db: Session = Depends(get_db)):
     
     return sorted([r[0] for r in results if r[0]])
 
-@router.get("/paniers/types", response_model=List[str])
-def get_panier_types(db: Session = Depends(get_db)):
-    """Return distinct 'cpgeType' from Panier table"""
+@router.get("/filters/cpge-filieres", response_model=List[str])
+async def get_cpge_filieres(db: AsyncSession = Depends(get_async_db)):
+    """Return distinct 'filiereFormationDetailleeBis' for CPGE category"""
+    return await db.run_sync(_get_cpge_filieres)
+
+@reference_data("formations.panier_types")
+def _get_panier_types(db: Session):
     results = db.query(models.Panier.cpgeType).distinct().all()
     return sorted([r[0] for r in results if r[0]])
 
-@router.get("/paniers/by-type")
-def get_paniers_by_type(cpge_type: str = Query(..., description="The CPGE type filter (e.g. 'B/L - Lettres et sciences sociales', 'ECG')"), db: Session = Depends(get_db)):
-    """Return paniers for a specific CPGE type with related data"""
+@router.get("/paniers/types", response_model=List[str])
+async def get_panier_types(db: AsyncSession = Depends(get_async_db)):
+    """Return distinct 'cpgeType' from Panier table"""
+    return await db.run_sync(_get_panier_types)
+
+def _school_dict(school: Optional[models.School]):
+    if not school:
+        return None
+    return {
+        "uai": school.uai,
+        "name": school.name,
+        "status": school.status,
+        "locations": [
+            {
+                "id": loc.id,
+                "city": loc.city,
+                "departmentCode": loc.departmentCode,
+                "departmentName": loc.departmentName,
+                "region": loc.region,
+                "academy": loc.academy,
+                "latitude": loc.latitude,
+                "longitude": loc.longitude
+            } for loc in school.locations
+        ]
+    }
+
+# Leaderboard sort orders: NULLs always last, then original position
+PANIER_SORTS = {
+    "integration": lambda lb: [lb.tauxIntegrationPct.is_(None), lb.tauxIntegrationPct.desc()],
+    "multi_year": lambda lb: [lb.moyenneMultiAnsPct.is_(None), lb.moyenneMultiAnsPct.desc()],
+    "multi_year_rank": lambda lb: [lb.rankMultiAns.is_(None), lb.rankMultiAns.asc()],
+    "admission_rate": lambda lb: [lb.admissionRate.asc()],
+}
+
+def _get_paniers_leaderboard(
+    db: Session,
+    cpge_type: str,
+    sort: Optional[str],
+    top: Optional[int],
+    page: int,
+    limit: Optional[int],
+):
+    """Serve /paniers/by-type from the PanierLeaderboard table: the admission
+    rate matching and exclusions were resolved at ingest."""
+    lb = models.PanierLeaderboard
+    visible = [lb.cpgeType == cpge_type, lb.excluded == False, lb.admissionRate.isnot(None)]
+
+    # Paniers in their original order, paginated when `limit` is set
+    panier_query = db.query(lb.panierId)\
+        .filter(*visible)\
+        .group_by(lb.panierId)\
+        .order_by(func.min(lb.position))
+    total = None
+    if limit is not None:
+        total = panier_query.count()
+        panier_query = panier_query.offset((page - 1) * limit).limit(limit)
+    panier_ids = [r[0] for r in panier_query.all()]
+
+    result = []
+    if panier_ids:
+        # Rank stats inside each panier, keep the first `top`
+        order = PANIER_SORTS[sort](lb) if sort else []
+        rank = func.row_number().over(partition_by=lb.panierId, order_by=[*order, lb.position]).label("rank")
+        ranked = db.query(lb.statsId, rank)\
+            .filter(*visible, lb.panierId.in_(panier_ids))\
+            .subquery()
+        stats_query = db.query(lb)\
+            .join(ranked, ranked.c.statsId == lb.statsId)\
+            .options(joinedload(lb.school).joinedload(models.School.locations))\
+            .order_by(ranked.c.rank)
+        if top is not None:
+            stats_query = stats_query.filter(ranked.c.rank <= top)
+
+        stats_by_panier = {panier_id: [] for panier_id in panier_ids}
+        for s in stats_query.all():
+            stats_by_panier[s.panierId].append(s)
+
+        paniers = {
+            p.id: p for p in db.query(models.Panier)
+            .options(selectinload(models.Panier.master_formations))
+            .filter(models.Panier.id.in_(panier_ids))
+            .all()
+        }
+        for panier_id in panier_ids:
+            p = paniers[panier_id]
+            result.append({
+                "id": p.id,
+                "name": p.name,
+                "cpgeType": p.cpgeType,
+                "url": p.url,
+                "master_formations": [{"id": mf.id, "name": mf.name} for mf in p.master_formations],
+                "school_stats": [
+                    {
+                        "id": s.statsId,
+                        "panierId": s.panierId,
+                        "schoolUai": s.schoolUai,
+                        "tauxIntegrationPct": s.tauxIntegrationPct,
+                        "moyenneBac": s.moyenneBac,
+                        "moyenneMultiAnsPct": s.moyenneMultiAnsPct,
+                        "rangMultiAns": s.rangMultiAns,
+                        "rankMultiAns": s.rankMultiAns,
+                        "rankMultiAnsTotal": s.rankMultiAnsTotal,
+                        "parcoursup": s.parcoursup,
+                        "admissionRate": s.admissionRate,
+                        "parcoursupLink": s.parcoursupLink,
+                        "parcoursupName": s.parcoursupName,
+                        "school": _school_dict(s.school)
+                    } for s in stats_by_panier[panier_id]
+                ]
+            })
+
+    if limit is None:
+        return _all_paniers(result)
+    return {"items": result, "total": total, "page": page, "size": limit}
+
+def _all_paniers(paniers: list):
+    """Every panier on a single page (no `limit`)."""
+    return {"items": paniers, "total": len(paniers), "page": 1, "size": len(paniers)}
+
+def _get_paniers_by_type(
+    db: Session,
+    cpge_type: str,
+    sort: Optional[str] = None,
+    top: Optional[int] = None,
+    page: int = 1,
+    limit: Optional[int] = None,
+):
+    if table_available(db, "PanierLeaderboard"):
+        return _get_paniers_leaderboard(db, cpge_type, sort, top, page, limit)
+    if sort or top or limit:
+        raise HTTPException(
+            status_code=400,
+            detail="sort, top and limit need the PanierLeaderboard table (run ingestion/post_ingest.py)"
+        )
+
+    # Fallback: resolve admission rates per request
     paniers = db.query(models.Panier)\
         .options(
             joinedload(models.Panier.master_formations),
@@ -154,25 +324,7 @@ def get_paniers_by_type(cpge_type: str = Query(..., description="The CPGE type f
             "school_stats": []
         }
         for s in p.school_stats:
-            school_data = None
-            if s.school:
-                school_data = {
-                    "uai": s.school.uai,
-                    "name": s.school.name,
-                    "status": s.school.status,
-                    "locations": [
-                        {
-                            "id": loc.id,
-                            "city": loc.city,
-                            "departmentCode": loc.departmentCode,
-                            "departmentName": loc.departmentName,
-                            "region": loc.region,
-                            "academy": loc.academy,
-                            "latitude": loc.latitude,
-                            "longitude": loc.longitude
-                        } for loc in s.school.locations
-                    ]
-                }
+            school_data = _school_dict(s.school)
             
             admission_info = rates_map.get(s.schoolUai, {})
             admission_rate = admission_info.get("admissionRate")
@@ -206,55 +358,313 @@ def get_paniers_by_type(cpge_type: str = Query(..., description="The CPGE type f
         if panier_dict["school_stats"]:
             result.append(panier_dict)
     
-    return result
+    return _all_paniers(result)
 
-@router.get("/", response_model=schemas.PaginatedFormations)
-def search_formations(
-    city: Optional[str] = Query(None, min_length=2),
+# CPU-bound: plain def on the thread pool (see get_async_db)
+@router.get("/paniers/by-type", response_model=schemas.PaginatedPaniers, response_model_exclude_unset=True)
+def get_paniers_by_type(
+    cpge_type: str = Query(..., description="The CPGE type filter (e.g. 'B/L - Lettres et sciences sociales', 'ECG')"),
+    sort: Optional[str] = Query(None, pattern="^(integration|multi_year|multi_year_rank|admission_rate)$", description="Order schools inside each panier"),
+    top: Optional[int] = Query(None, ge=1, description="Keep only the first N schools of each panier"),
+    page: int = 1,
+    limit: Optional[int] = Query(None, ge=1, le=100, description="Paniers per page (default: all paniers on one page)"),
+    db: Session = Depends(get_db)
+):
+    """Return paniers for a specific CPGE type with related data, as
+    {items, total, page, size}"""
+    return _get_paniers_by_type(db, cpge_type, sort, top, page, limit)
+
+# CPU-bound: plain def on the thread pool (see get_async_db)
+@router.get("/paniers/by-type/legacy", response_model=List[schemas.PanierByType], response_model_exclude_unset=True, deprecated=True)
+def get_paniers_by_type_legacy(
+    cpge_type: str = Query(..., description="The CPGE type filter (e.g. 'B/L - Lettres et sciences sociales', 'ECG')"),
+    sort: Optional[str] = Query(None, pattern="^(integration|multi_year|multi_year_rank|admission_rate)$", description="Order schools inside each panier"),
+    top: Optional[int] = Query(None, ge=1, description="Keep only the first N schools of each panier"),
+    db: Session = Depends(get_db)
+):
+    """Deprecated: every panier of /paniers/by-type as a plain list."""
+    return _get_paniers_by_type(db, cpge_type, sort, top)["items"]
+
+# Count cache for /formations/: most traffic is paging through the same filter
+# combinations, so the (often expensive) joined COUNT runs once per combination
+# and dataset version.
+formation_count_cache = TTLCache(maxsize=4096, ttl=6 * 3600)
+
+# count=estimate: counts are exact below this many rows, estimated above
+COUNT_ESTIMATE_THRESHOLD = 2000
+
+def _filter_formations(
+    db: Session,
+    query,
+    city: Optional[str] = None,
     department: Optional[str] = None,
     category: Optional[str] = None,
-    school_name: Optional[str] = Query(None, min_length=2),
+    school_name: Optional[str] = None,
     min_admission_rate: Optional[float] = None,
-    filiere_bis: Optional[List[str]] = Query(None),
-    page: int = 1,
-    limit: int = 20,
-    db: Session = Depends(get_db)
+    filieres: Optional[tuple] = None,
+    cpge_types: Optional[tuple] = None,
+    min_tb_share: Optional[float] = None,
+    min_felicitations_share: Optional[float] = None,
 ):
+    """Apply the /formations/ filters to a Formation query.
 
-    
-    query = db.query(models.Formation).options(
-        joinedload(models.Formation.school).joinedload(models.School.panier_stats).joinedload(models.PanierSchoolStats.panier),
-        joinedload(models.Formation.location)
-    )
+    `cpge_types` are filiere_bis values resolved through the FormationCpgeType
+    link table. `filieres` are Parcoursup filières, already expanded with
+    get_parcoursup_types, for values the link table doesn't know.
+    Mention share filters go through the FormationMention table.
+    Returns (query, fts) where fts is the FormationSearch subquery (or None).
+    """
+    fts = None
+    use_fts = formation_search_available(db)
+    match = build_formation_match(city, school_name, filieres) if use_fts else None
+
+    if match:
+        fts = formation_search_subquery(match)
+        query = query.join(fts, fts.c.formationId == models.Formation.id)
 
-    if city or department:
+    if department or (city and not use_fts):
         query = query.join(models.SchoolLocation)
-        if city:
+        if city and not use_fts:
             query = query.filter(models.SchoolLocation.city.ilike(f"%{city}%"))
         if department:
             query = query.filter(models.SchoolLocation.departmentCode == department)
 
-    if school_name:
+    if school_name and not use_fts:
          query = query.join(models.School).filter(models.School.name.ilike(f"%{school_name}%"))
 
+    if cpge_types:
+        linked = select(models.FormationCpgeType.formationId)\
+            .where(models.FormationCpgeType.cpgeType.in_(cpge_types))
+        query = query.filter(models.Formation.id.in_(linked))
+
+    mention_filters = []
+    if min_tb_share is not None:
+        mention_filters.append(models.FormationMention.tbPct >= min_tb_share)
+    if min_felicitations_share is not None:
+        mention_filters.append(models.FormationMention.felicitationsPct >= min_felicitations_share)
+    if mention_filters:
+        mentions = select(models.FormationMention.formationId).where(*mention_filters)
+        query = query.filter(models.Formation.id.in_(mentions))
+
     if category:
         query = query.filter(models.Formation.category == category)
     if min_admission_rate is not None:
         query = query.filter(models.Formation.admissionRate >= min_admission_rate)
     
-    if filiere_bis:
-        expanded_types = []
-        for f in filiere_bis:
-            expanded_types.extend(get_parcoursup_types(f, db))
-        
+    if filieres and not use_fts:
         type_filters = []
-        for t in set(expanded_types):
+        for t in set(filieres):
             type_filters.append(models.Formation.filiereFormationDetailleeBis.ilike(f"%{t}%"))
         
         query = query.filter(or_(*type_filters))
 
-    # Calculate total before pagination
+    return query, fts
+
+def _normalize_filters(filters: dict) -> tuple:
+    """Cache key part: drop unset filters, fold case/whitespace of free text."""
+    normalized = []
+    for name, value in sorted(filters.items()):
+        if value is None or value == () or value == "":
+            continue
+        if name in ("city", "school_name"):
+            value = " ".join(value.lower().split())
+        normalized.append((name, value))
+    return tuple(normalized)
+
+def _count_formations(db: Session, filters: dict, mode: str = "exact") -> tuple:
+    """Return (total, estimated) for a filter set, using formation_count_cache."""
+    normalized = _normalize_filters(filters)
+    key = ("formations", get_dataset_version(db), normalized)
+    cached = formation_count_cache.get(key)
+    if cached is not None:
+        return cached, False
+
+    query, _ = _filter_formations(db, db.query(models.Formation.id), **filters)
+    # Single-filter counts are the building blocks of the estimate: always exact
+    if mode == "estimate" and len(normalized) > 1:
+        # Bounded scan: stop counting after the threshold
+        capped = query.limit(COUNT_ESTIMATE_THRESHOLD).count()
+        if capped < COUNT_ESTIMATE_THRESHOLD:
+            formation_count_cache.set(key, capped)
+            return capped, False
+        return _estimate_formation_count(db, filters), True
+
     total = query.count()
+    formation_count_cache.set(key, total)
+    return total, False
+
+def _estimate_formation_count(db: Session, filters: dict) -> int:
+    """Assume filters are independent: N * product(count(filter_i) / N).
+    Single-filter counts are few and end up in the cache."""
+    active = dict(_normalize_filters(filters))
+    total, _ = _count_formations(db, {})
+    if not total:
+        return 0
+    estimate = float(total)
+    for name in active:
+        single, _ = _count_formations(db, {name: filters[name]})
+        estimate *= single / total
+    # The bounded scan already saw at least COUNT_ESTIMATE_THRESHOLD rows
+    return max(int(round(estimate)), COUNT_ESTIMATE_THRESHOLD)
+
+# ============================================
+# Sub-resources and sparse fields (?include= / ?fields=)
+# ============================================
+
+FORMATION_INCLUDES = ("school", "location", "panier_stats")
+DEFAULT_FORMATION_INCLUDE = ("school", "location")
+FORMATION_FIELDS = tuple(
+    name for name in schemas.FormationDetail.model_fields if name not in FORMATION_INCLUDES
+)
+
+def _parse_list_param(value: Optional[str], allowed: tuple, name: str) -> Optional[tuple]:
+    """'a,b' -> ('a', 'b'), None when the parameter is absent. 400 on unknown values."""
+    if value is None:
+        return None
+    items = tuple(dict.fromkeys(v.strip() for v in value.split(",") if v.strip()))
+    unknown = [v for v in items if v not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown {name}: {', '.join(unknown)} (allowed: {', '.join(allowed)})"
+        )
+    return items
+
+def _formation_load_options(fields: Optional[tuple], include: tuple) -> list:
+    """Only load the requested columns and sub-resources. Many-to-one
+    relations are joined; the panier stats collection uses selectinload so
+    it doesn't multiply the formation rows."""
+    options = []
+    if fields is not None:
+        # name is required by the schema; admissionRate and id are the keyset cursor
+        columns = set(fields) | {"id", "name", "admissionRate"}
+        options.append(load_only(*(getattr(models.Formation, c) for c in sorted(columns))))
+
+    if "panier_stats" in include:
+        options.append(
+            joinedload(models.Formation.school)
+            .selectinload(models.School.panier_stats)
+            .joinedload(models.PanierSchoolStats.panier)
+        )
+    elif "school" in include:
+        options.append(joinedload(models.Formation.school))
+    else:
+        options.append(noload(models.Formation.school))
+
+    if "location" in include:
+        options.append(joinedload(models.Formation.location))
+    else:
+        options.append(noload(models.Formation.location))
+    return options
+
+def _formation_dict(f: models.Formation, fields: Optional[tuple], include: tuple) -> dict:
+    """Response body with only the requested keys (endpoints use response_model_exclude_unset)."""
+    data = {"id": f.id, "name": f.name}
+    for name in fields or FORMATION_FIELDS:
+        data[name] = getattr(f, name)
+    if "school" in include:
+        data["school"] = f.school
+    if "location" in include:
+        data["location"] = f.location
+    if "panier_stats" in include:
+        data["panier_stats"] = f.school.panier_stats if f.school else []
+    return data
+
+def _filiere_filters(db: Session, filiere_bis: Optional[List[str]]) -> dict:
+    """filiere_bis values as _filter_formations arguments. Uses the link table
+    when it covers every value, otherwise expands to Parcoursup filières
+    matched on text."""
+    linked_types = []
+    expanded_types = []
+    if filiere_bis:
+        if all(filiere_resolver.is_linked(db, f) for f in filiere_bis):
+            linked_types = filiere_bis
+        else:
+            for f in filiere_bis:
+                expanded_types.extend(get_parcoursup_types(f, db))
+    return {
+        "filieres": tuple(sorted(set(expanded_types))),
+        "cpge_types": tuple(sorted(set(linked_types))),
+    }
+
+# sort= keys on FormationMention columns, highest share first
+MENTION_SORTS = {
+    "tb_share": models.FormationMention.tbPct,
+    "felicitations_share": models.FormationMention.felicitationsPct,
+}
+
+def _search_formations(
+    db: Session,
+    city: Optional[str],
+    department: Optional[str],
+    category: Optional[str],
+    school_name: Optional[str],
+    min_admission_rate: Optional[float],
+    filiere_bis: Optional[List[str]],
+    sort: Optional[str],
+    page: int,
+    limit: int,
+    cursor: Optional[str],
+    count: str,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    min_tb_share: Optional[float] = None,
+    min_felicitations_share: Optional[float] = None,
+):
+    fields = _parse_list_param(fields, FORMATION_FIELDS, "fields")
+    include = _parse_list_param(include, FORMATION_INCLUDES, "include")
+    if include is None:
+        include = DEFAULT_FORMATION_INCLUDE
+
+    if cursor is not None and sort is not None:
+        raise HTTPException(status_code=400, detail=f"sort={sort} can't be combined with cursor pagination")
+    uses_mentions = sort in MENTION_SORTS or min_tb_share is not None or min_felicitations_share is not None
+    if uses_mentions and not table_available(db, "FormationMention"):
+        raise HTTPException(
+            status_code=400,
+            detail="Mention share filters need the FormationMention table (run ingestion/post_ingest.py)"
+        )
+
+    filters = {
+        "city": city,
+        "department": department,
+        "category": category,
+        "school_name": school_name,
+        "min_admission_rate": min_admission_rate,
+        **_filiere_filters(db, filiere_bis),
+        "min_tb_share": min_tb_share,
+        "min_felicitations_share": min_felicitations_share,
+    }
+    query = db.query(models.Formation).options(*_formation_load_options(fields, include))
+    query, fts = _filter_formations(db, query, **filters)
+    if fts is not None and sort == "relevance":
+        query = query.order_by(fts.c.score)
+    elif sort in MENTION_SORTS:
+        share = MENTION_SORTS[sort]
+        query = query.outerjoin(models.FormationMention, models.FormationMention.formationId == models.Formation.id)\
+            .order_by(share.is_(None), share.desc(), models.Formation.id)
+
+    if cursor is not None:
+        # Keyset mode: stable (admissionRate, id) order, NULL rates last, no
+        # OFFSET. The total is only computed for the first page.
+        last = decode_cursor(cursor, 2)
+        total, estimated = _count_formations(db, filters, count) if last is None else (None, False)
+        query = query.order_by(*keyset_order(models.Formation.admissionRate, models.Formation.id))
+        if last is not None:
+            query = query.filter(after_key(models.Formation.admissionRate, models.Formation.id, *last))
+        results = query.limit(limit + 1).all()
+        cursor_value = next_cursor(results, limit, lambda f: (f.admissionRate, f.id))
+        return {
+            "items": [_formation_dict(f, fields, include) for f in results],
+            "next_cursor": cursor_value,
+            "total": total,
+            "total_estimated": estimated,
+            "page": page,
+            "size": limit
+        }
+
+    # Calculate total before pagination (cached per filter set)
+    total, estimated = _count_formations(db, filters, count)
 
     # Apply pagination
     offset = (page - 1) * limit
@@ -263,23 +673,284 @@ def search_formations(
 
     
     return {
-        "items": results,
+        "items": [_formation_dict(f, fields, include) for f in results],
+        "total": total,
+        "total_estimated": estimated,
+        "page": page,
+        "size": limit,
+        "next_cursor": None
+    }
+
+@router.get("/", response_model=schemas.PaginatedFormations, response_model_exclude_unset=True)
+async def search_formations(
+    city: Optional[str] = Query(None, min_length=2),
+    department: Optional[str] = None,
+    category: Optional[str] = None,
+    school_name: Optional[str] = Query(None, min_length=2),
+    min_admission_rate: Optional[float] = None,
+    filiere_bis: Optional[List[str]] = Query(None),
+    min_tb_share: Optional[float] = Query(None, ge=0, le=100, description="Minimum % of admitted students with mention Très bien"),
+    min_felicitations_share: Optional[float] = Query(None, ge=0, le=100, description="Minimum % of admitted students with félicitations du jury"),
+    sort: Optional[str] = Query(None, pattern="^(relevance|tb_share|felicitations_share)$", description="'relevance' orders text matches (city, school_name, filiere_bis) by bm25; 'tb_share' / 'felicitations_share' order by mention share, highest first"),
+    page: int = 1,
+    limit: int = 20,
+    cursor: Optional[str] = Query(None, description="Keyset pagination: pass an empty value for the first page, then the returned next_cursor"),
+    count: str = Query("exact", pattern="^(exact|estimate)$", description="'estimate' may return an approximate total (total_estimated=true) for large result sets"),
+    fields: Optional[str] = Query(None, description="Comma-separated formation fields to return (default: all)"),
+    include: Optional[str] = Query(None, description="Comma-separated sub-resources: school, location, panier_stats (default: school,location)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await db.run_sync(
+        _search_formations, city, department, category, school_name, min_admission_rate, filiere_bis,
+        sort, page, limit, cursor, count, fields, include, min_tb_share, min_felicitations_share
+    )
+
+# ============================================
+# Geospatial search (SchoolLocationGeo R*Tree)
+# ============================================
+
+def _formations_by_distance(
+    db: Session,
+    center: tuple,
+    box: tuple,
+    radius_km: Optional[float],
+    category: Optional[str],
+    min_admission_rate: Optional[float],
+    filiere_bis: Optional[List[str]],
+    page: int,
+    limit: int,
+    fields: Optional[str],
+    include: Optional[str],
+):
+    """Formations located inside `box` (and within `radius_km` of `center`
+    when set), closest to `center` first."""
+    fields = _parse_list_param(fields, FORMATION_FIELDS, "fields")
+    include = _parse_list_param(include, FORMATION_INCLUDES, "include")
+    if include is None:
+        include = DEFAULT_FORMATION_INCLUDE
+
+    # Distances, ordering and the page are computed by SQLite: the R*Tree
+    # narrows the box and haversine_km (registered in database.py) is only
+    # evaluated for the candidate locations
+    location = models.SchoolLocation
+    distance = func.haversine_km(center[0], center[1], location.latitude, location.longitude)
+    query = db.query(models.Formation.id)\
+        .join(location, models.Formation.locationId == location.id)\
+        .filter(*location_box_filter(db, *box))
+    if radius_km is not None:
+        query = query.filter(distance <= radius_km)
+    query, _ = _filter_formations(
+        db, query, category=category, min_admission_rate=min_admission_rate,
+        **_filiere_filters(db, filiere_bis)
+    )
+
+    total = query.count()
+    page_rows = query.add_columns(distance.label("distance"))\
+        .order_by(literal_column("distance"), models.Formation.id)\
+        .offset((page - 1) * limit)\
+        .limit(limit)\
+        .all() if total else []
+    formations = {}
+    if page_rows:
+        formations = {
+            f.id: f for f in db.query(models.Formation)
+            .options(*_formation_load_options(fields, include))
+            .filter(models.Formation.id.in_([r.id for r in page_rows]))
+            .all()
+        }
+    items = [
+        {
+            **_formation_dict(formations[r.id], fields, include),
+            "distance_km": round(r.distance, 2),
+        } for r in page_rows
+    ]
+    return {
+        "items": items,
         "total": total,
+        "total_estimated": False,
         "page": page,
-        "size": limit
+        "size": limit,
+        "next_cursor": None
     }
 
-@router.get("/{formation_id}", response_model=schemas.FormationDetail)
-def get_formation(formation_id: str, db: Session = Depends(get_db)):
-    formation = db.query(models.Formation).options(
-        joinedload(models.Formation.school).joinedload(models.School.panier_stats).joinedload(models.PanierSchoolStats.panier),
-        joinedload(models.Formation.location)
-    ).filter(models.Formation.id == formation_id).first()
+# CPU-bound: plain def on the thread pool (see get_async_db)
+@router.get("/near", response_model=schemas.PaginatedNearbyFormations, response_model_exclude_unset=True)
+def search_formations_near(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(..., gt=0, le=500),
+    category: Optional[str] = None,
+    min_admission_rate: Optional[float] = None,
+    filiere_bis: Optional[List[str]] = Query(None),
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Comma-separated formation fields to return (default: all)"),
+    include: Optional[str] = Query(None, description="Comma-separated sub-resources: school, location, panier_stats (default: school,location)"),
+    db: Session = Depends(get_db)
+):
+    """Formations within `radius_km` of (lat, lon), closest first (distance_km)."""
+    return _formations_by_distance(
+        db, (lat, lon), bounding_box(lat, lon, radius_km), radius_km,
+        category, min_admission_rate, filiere_bis, page, limit, fields, include
+    )
+
+# CPU-bound: plain def on the thread pool (see get_async_db)
+@router.get("/within", response_model=schemas.PaginatedNearbyFormations, response_model_exclude_unset=True)
+def search_formations_within(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    category: Optional[str] = None,
+    min_admission_rate: Optional[float] = None,
+    filiere_bis: Optional[List[str]] = Query(None),
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Comma-separated formation fields to return (default: all)"),
+    include: Optional[str] = Query(None, description="Comma-separated sub-resources: school, location, panier_stats (default: school,location)"),
+    db: Session = Depends(get_db)
+):
+    """Formations inside a bounding box (e.g. the visible map), closest to its center first."""
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=400, detail="min_lat/min_lon must not exceed max_lat/max_lon")
+    center = ((min_lat + max_lat) / 2, (min_lon + max_lon) / 2)
+    return _formations_by_distance(
+        db, center, (min_lat, min_lon, max_lat, max_lon), None,
+        category, min_admission_rate, filiere_bis, page, limit, fields, include
+    )
+
+def _get_formation(db: Session, formation_id: str, fields: Optional[str] = None, include: Optional[str] = None):
+    fields = _parse_list_param(fields, FORMATION_FIELDS, "fields")
+    include = _parse_list_param(include, FORMATION_INCLUDES, "include")
+    if include is None:
+        include = DEFAULT_FORMATION_INCLUDE
+
+    formation = db.query(models.Formation)\
+        .options(*_formation_load_options(fields, include))\
+        .filter(models.Formation.id == formation_id)\
+        .first()
     
     if not formation:
         raise HTTPException(status_code=404, detail="Formation not found")
     
-    return formation
+    return _formation_dict(formation, fields, include)
+
+def _get_formations_batch(db: Session, ids: List[str], fields: Optional[str] = None, include: Optional[str] = None):
+    fields = _parse_list_param(fields, FORMATION_FIELDS, "fields")
+    include = _parse_list_param(include, FORMATION_INCLUDES, "include")
+    if include is None:
+        include = DEFAULT_FORMATION_INCLUDE
+
+    formations = db.query(models.Formation)\
+        .options(*_formation_load_options(fields, include))\
+        .filter(models.Formation.id.in_(set(ids)))\
+        .all() if ids else []
+    return batch_result(ids, {f.id: f for f in formations}, lambda f: _formation_dict(f, fields, include))
+
+@router.post("/batch", response_model=schemas.FormationBatch, response_model_exclude_unset=True)
+async def get_formations_batch(
+    body: schemas.BatchRequest,
+    fields: Optional[str] = Query(None, description="Comma-separated formation fields to return (default: all)"),
+    include: Optional[str] = Query(None, description="Comma-separated sub-resources: school, location, panier_stats (default: school,location)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Formations by id (favorites, comparison lists) in one round trip."""
+    return await db.run_sync(_get_formations_batch, body.ids, fields, include)
+
+@router.get("/{formation_id}", response_model=schemas.FormationDetail, response_model_exclude_unset=True)
+async def get_formation(
+    formation_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated formation fields to return (default: all)"),
+    include: Optional[str] = Query(None, description="Comma-separated sub-resources: school, location, panier_stats (default: school,location)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await db.run_sync(_get_formation, formation_id, fields, include)
+
+def _get_formation_panier_stats(db: Session, formation_id: str, page: int, limit: int):
+    formation = db.query(models.Formation.schoolUai).filter(models.Formation.id == formation_id).first()
+    if not formation:
+        raise HTTPException(status_code=404, detail="Formation not found")
+
+    query = db.query(models.PanierSchoolStats)\
+        .options(joinedload(models.PanierSchoolStats.panier))\
+        .filter(models.PanierSchoolStats.schoolUai == formation.schoolUai)
+    total = query.count()
+    stats = query.order_by(models.PanierSchoolStats.id)\
+        .offset((page - 1) * limit)\
+        .limit(limit)\
+        .all()
+
+    # Admission rate / Parcoursup link resolved at ingest, when available
+    resolved = {}
+    if stats and table_available(db, "PanierLeaderboard"):
+        lb = models.PanierLeaderboard
+        rows = db.query(lb.statsId, lb.admissionRate, lb.parcoursupLink, lb.parcoursupName)\
+            .filter(lb.statsId.in_([s.id for s in stats]))\
+            .all()
+        resolved = {r[0]: r for r in rows}
+
+    items = []
+    for s in stats:
+        item = schemas.PanierSchoolStatsBase.model_validate(s)
+        if s.id in resolved:
+            _, item.admissionRate, item.parcoursupLink, item.parcoursupName = resolved[s.id]
+        items.append(item)
+    return {"items": items, "total": total, "page": page, "size": limit}
+
+@router.get("/{formation_id}/panier-stats", response_model=schemas.PaginatedPanierStats)
+async def get_formation_panier_stats(
+    formation_id: str,
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """L'Etudiant panier statistics of the formation's school, paginated."""
+    return await db.run_sync(_get_formation_panier_stats, formation_id, page, limit)
+
+# Neighbours stored per formation by ingestion/post_ingest.py (SIMILAR_K)
+MAX_SIMILAR = 20
+
+def _get_similar_formations(db: Session, formation_id: str, limit: int, fields: Optional[str], include: Optional[str]):
+    fields = _parse_list_param(fields, FORMATION_FIELDS, "fields")
+    include = _parse_list_param(include, FORMATION_INCLUDES, "include")
+    if include is None:
+        include = DEFAULT_FORMATION_INCLUDE
+    if not table_available(db, "FormationSimilar"):
+        raise HTTPException(status_code=400, detail="Similar formations need the FormationSimilar table (run ingestion/post_ingest.py)")
+
+    neighbours = db.query(models.FormationSimilar.similarId, models.FormationSimilar.distance)\
+        .filter(models.FormationSimilar.formationId == formation_id)\
+        .order_by(models.FormationSimilar.rank)\
+        .limit(limit)\
+        .all()
+    if not neighbours:
+        if db.query(models.Formation.id).filter(models.Formation.id == formation_id).first() is None:
+            raise HTTPException(status_code=404, detail="Formation not found")
+        return {"items": []}
+
+    formations = db.query(models.Formation)\
+        .options(*_formation_load_options(fields, include))\
+        .filter(models.Formation.id.in_([n.similarId for n in neighbours]))\
+        .all()
+    by_id = {f.id: f for f in formations}
+    return {
+        "items": [
+            {**_formation_dict(by_id[n.similarId], fields, include), "similarity": round(1 / (1 + n.distance), 4)}
+            for n in neighbours if n.similarId in by_id
+        ]
+    }
+
+@router.get("/{formation_id}/similar", response_model=schemas.SimilarFormations, response_model_exclude_unset=True)
+async def get_similar_formations(
+    formation_id: str,
+    limit: int = Query(10, ge=1, le=MAX_SIMILAR),
+    fields: Optional[str] = Query(None, description="Comma-separated formation fields to return (default: all)"),
+    include: Optional[str] = Query(None, description="Comma-separated sub-resources: school, location, panier_stats (default: school,location)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Formations closest to this one (category, filières, selectivity, admission
+    rate, capacity, mentions, location), from the index built at ingest."""
+    return await db.run_sync(_get_similar_formations, formation_id, limit, fields, include)
 
 # Separate router for schools if needed, but putting here for now or creating a new file
 school_router = APIRouter(
@@ -287,13 +958,76 @@ school_router = APIRouter(
     tags=["schools"]
 )
 
-@school_router.get("/{uai}", response_model=schemas.SchoolBase)
-def get_school(uai: str, db: Session = Depends(get_db)):
+def _get_school(db: Session, uai: str):
     school = db.query(models.School).filter(models.School.uai == uai).first()
     if not school:
         raise HTTPException(status_code=404, detail="School not found")
     return school
 
+def _get_schools_batch(db: Session, ids: List[str]):
+    schools = db.query(models.School).filter(models.School.uai.in_(set(ids))).all() if ids else []
+    return batch_result(ids, {s.uai: s for s in schools}, lambda s: s)
+
+@school_router.post("/batch", response_model=schemas.SchoolBatch)
+async def get_schools_batch(body: schemas.BatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """Schools by UAI in one round trip."""
+    return await db.run_sync(_get_schools_batch, body.ids)
+
+# Upper bound on grid cells scanned per request (a few screens at any zoom)
+MAX_CLUSTER_CELLS = 16384
+
+def _get_school_clusters(db: Session, west: float, south: float, east: float, north: float, zoom: int):
+    if not table_available(db, "SchoolCluster"):
+        raise HTTPException(status_code=400, detail="Map clusters need the SchoolCluster table (run ingestion/post_ingest.py)")
+
+    zoom = min(max(zoom, CLUSTER_MIN_ZOOM), CLUSTER_MAX_ZOOM)
+    level = zoom + CLUSTER_CELL_OFFSET
+    # Cell y grows southwards
+    x0, y0 = mercator_cell(north, west, level)
+    x1, y1 = mercator_cell(south, east, level)
+    if (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_CLUSTER_CELLS:
+        raise HTTPException(status_code=400, detail="bbox too large for this zoom level")
+
+    # One (zoom, cellX) seek per column, then a cellY range inside it: a
+    # cellX range would make cellY a filter over whole columns of the grid
+    clusters = db.query(models.SchoolCluster)\
+        .filter(models.SchoolCluster.zoom == zoom)\
+        .filter(models.SchoolCluster.cellX.in_(range(x0, x1 + 1)))\
+        .filter(models.SchoolCluster.cellY.between(y0, y1))\
+        .all()
+    return {
+        "zoom": zoom,
+        "clusters": [
+            {
+                "latitude": c.latitude,
+                "longitude": c.longitude,
+                "count": c.locationCount,
+                "formationCount": c.formationCount,
+                "locationId": c.locationId,
+                "stats": c.stats,
+            } for c in clusters
+        ]
+    }
+
+@school_router.get("/clusters")
+async def get_school_clusters(
+    bbox: str = Query(..., description="west,south,east,north in degrees (Leaflet toBBoxString order)"),
+    zoom: int = Query(..., ge=0, le=22),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Precomputed SchoolLocation clusters visible in `bbox` at map `zoom`."""
+    try:
+        west, south, east, north = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be 'west,south,east,north'")
+    if west > east or south > north:
+        raise HTTPException(status_code=400, detail="bbox must be 'west,south,east,north'")
+    return await db.run_sync(_get_school_clusters, west, south, east, north, zoom)
+
+@school_router.get("/{uai}", response_model=schemas.SchoolBase)
+async def get_school(uai: str, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(_get_school, uai)
+
 # ============================================
 # Specialty Admission Data Endpoints
 # ============================================
@@ -303,97 +1037,87 @@ specialty_router = APIRouter(
     tags=["specialties"]
 )
 
-@specialty_router.get("/", response_model=List[dict])
-def get_specialties(db: Session = Depends(get_db)):
-    """Return all available high school specialties"""
+@reference_data("specialties")
+def _get_specialties(db: Session):
     specialties = db.query(models.Specialty).all()
     return [{"id": s.id, "name": s.name, "shortName": s.shortName} for s in specialties]
 
+@specialty_router.get("/", response_model=List[dict])
+async def get_specialties(db: AsyncSession = Depends(get_async_db)):
+    """Return all available high school specialties"""
+    return await db.run_sync(_get_specialties)
+
+def _get_specialty_admission_rate(db: Session, specialty1: str, specialty2: str, cpge_type: str):
+    # Map our cpgeType to CSV category (CpgeCategoryMapping, inferred from the name otherwise)
+    csv_category = specialty_matrix.csv_category(db, cpge_type)
+    if csv_category is None:
+        return {"admissionRatePct": None, "candidats": 0, "message": "Unknown CPGE type"}
+
+    stats = specialty_matrix.lookup(db, specialty1.lower(), specialty2.lower(), csv_category)
+    if not stats:
+        return {"admissionRatePct": None, "candidats": 0, "message": "No data for this combination"}
+
+    return {**stats, "cpgeCategory": csv_category}
+
 @specialty_router.get("/admission-rate")
-def get_specialty_admission_rate(
+async def get_specialty_admission_rate(
     specialty1: str = Query(..., description="First specialty ID (e.g., 'maths')"),
     specialty2: str = Query(..., description="Second specialty ID (e.g., 'ses')"),
     cpge_type: str = Query(..., description="CPGE type (e.g., 'ECG', 'MP')"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get admission rate for a specific specialty combination and CPGE type.
     Returns the percentage of candidates with this specialty combo who received an admission offer.
     """
-    # Map our cpgeType to CSV category using CpgeCategoryMapping
-    mapping = db.query(models.CpgeCategoryMapping)\
-        .filter(models.CpgeCategoryMapping.cpgeType == cpge_type)\
-        .first()
-    
-    if not mapping:
-        # Try to infer category from type name
-        if 'ECG' in cpge_type.upper():
-            csv_category = 'CPGE ECG'
-        elif any(x in cpge_type.upper() for x in ['MP', 'MPI', 'PC', 'PSI', 'BCPST', 'PT']):
-            csv_category = 'CPGE S'
-        elif any(x in cpge_type.upper() for x in ['LETTRES', 'B/L', 'A/L', 'LSH']):
-            csv_category = 'CPGE L'
-        else:
-            return {"admissionRatePct": None, "candidats": 0, "message": "Unknown CPGE type"}
-    else:
-        csv_category = mapping.csvCategory
-    
-    # Sort specialty IDs for consistent lookup
-    spec1, spec2 = sorted([specialty1.lower(), specialty2.lower()])
-    
-    # Query the stats
-    stats = db.query(models.SpecialtyAdmissionStats)\
-        .filter(models.SpecialtyAdmissionStats.specialty1Id == spec1)\
-        .filter(models.SpecialtyAdmissionStats.specialty2Id == spec2)\
-        .filter(models.SpecialtyAdmissionStats.cpgeCategory == csv_category)\
-        .first()
-    
-    if not stats:
-        return {"admissionRatePct": None, "candidats": 0, "message": "No data for this combination"}
-    
-    return {
-        "admissionRatePct": round(stats.admissionRatePct, 1) if stats.admissionRatePct else None,
-        "candidats": stats.candidats,
-        "propositions": int(stats.propositions),
-        "cpgeCategory": csv_category
-    }
+    return await db.run_sync(_get_specialty_admission_rate, specialty1, specialty2, cpge_type)
+
+def _get_admission_rates_by_specialties(db: Session, specialty1: str, specialty2: str):
+    # Build response: cpgeType -> rate
+    result = {}
+    for csv_category, stats in specialty_matrix.pair(db, specialty1.lower(), specialty2.lower()).items():
+        for cpge_type in specialty_matrix.cpge_types(db, csv_category):
+            result[cpge_type] = {
+                "admissionRatePct": stats["admissionRatePct"],
+                "candidats": stats["candidats"],
+                "cpgeCategory": csv_category
+            }
+
+    return result
 
 @specialty_router.get("/admission-rates-by-specialties")
-def get_admission_rates_by_specialties(
+async def get_admission_rates_by_specialties(
     specialty1: str = Query(..., description="First specialty ID"),
     specialty2: str = Query(..., description="Second specialty ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get admission rates for ALL CPGE types given a specialty combination.
     Returns a map of cpgeType -> admissionRatePct for display on type buttons.
     """
-    spec1, spec2 = sorted([specialty1.lower(), specialty2.lower()])
-    
-    # Get all stats for this specialty pair
-    stats_list = db.query(models.SpecialtyAdmissionStats)\
-        .filter(models.SpecialtyAdmissionStats.specialty1Id == spec1)\
-        .filter(models.SpecialtyAdmissionStats.specialty2Id == spec2)\
-        .all()
-    
-    # Get all category mappings
-    mappings = db.query(models.CpgeCategoryMapping).all()
-    category_to_types = {}
-    for m in mappings:
-        if m.csvCategory not in category_to_types:
-            category_to_types[m.csvCategory] = []
-        category_to_types[m.csvCategory].append(m.cpgeType)
-    
-    # Build response: cpgeType -> rate
-    result = {}
-    for stats in stats_list:
-        cpge_types = category_to_types.get(stats.cpgeCategory, [])
-        for cpge_type in cpge_types:
-            result[cpge_type] = {
-                "admissionRatePct": round(stats.admissionRatePct, 1) if stats.admissionRatePct else None,
-                "candidats": stats.candidats,
-                "cpgeCategory": stats.cpgeCategory
-            }
-    
-    return result
+    return await db.run_sync(_get_admission_rates_by_specialties, specialty1, specialty2)
+
+def _get_specialty_matrix(db: Session, category: Optional[str], cpge_type: Optional[str]):
+    if category is None:
+        category = specialty_matrix.csv_category(db, cpge_type)
+        if category is None:
+            raise HTTPException(status_code=404, detail="Unknown CPGE type")
+    return {
+        "cpgeCategory": category,
+        "specialties": specialty_matrix.specialties(db),
+        "pairs": specialty_matrix.category_pairs(db, category),
+    }
 
+@specialty_router.get("/matrix")
+async def get_specialty_matrix(
+    category: Optional[str] = Query(None, description="SpecialtyAdmissionStats category (e.g. 'CPGE ECG', a Licence type)"),
+    cpge_type: Optional[str] = Query(None, description="CPGE type, mapped to its category"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Admission stats of every specialty pair for one category, in one call.
+    Pairs are listed once, with specialty1 <= specialty2.
+    """
+    if (category is None) == (cpge_type is None):
+        raise HTTPException(status_code=400, detail="Pass exactly one of category or cpge_type")
+    return await db.run_sync(_get_specialty_matrix, category, cpge_type)
@@ -0,0 +1,116 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Optional
+from .. import models
+from ..database import get_async_db, table_available
+
+router = APIRouter(
+    prefix="/stats",
+    tags=["stats"]
+)
+
+
+# StatsCube marks rolled-up dimensions with '*' (see ingestion/post_ingest.py)
+CUBE_ALL = "*"
+# Geography nests department -> academy -> region: (group_by name, column)
+GEO_LEVELS = [
+    ("region", models.StatsCube.region),
+    ("academy", models.StatsCube.academy),
+    ("department", models.StatsCube.departmentCode),
+]
+GROUP_BY_DIMENSIONS = {name for name, _ in GEO_LEVELS} | {"category", "selectivity"}
+
+
+def _cube_cell(row: models.StatsCube, geo_depth: int, by_category: bool, by_selectivity: bool):
+    return {
+        "region": row.region if geo_depth >= 1 else None,
+        "academy": row.academy if geo_depth >= 2 else None,
+        "departmentCode": row.departmentCode if geo_depth >= 3 else None,
+        "departmentName": row.departmentName if geo_depth >= 3 else None,
+        "category": row.category if by_category else None,
+        "selectivity": row.selectivity if by_selectivity else None,
+        "formationCount": row.formationCount,
+        "capacity": row.capacitySum,
+        "candidates": row.candidatesSum,
+        "admissionProposals": row.admissionProposalsSum,
+        "genderParityAvg": row.genderParityAvg,
+        "admissionRate": {
+            "avg": row.admissionRateAvg,
+            "min": row.admissionRateMin,
+            "p25": row.admissionRateP25,
+            "median": row.admissionRateMedian,
+            "p75": row.admissionRateP75,
+            "max": row.admissionRateMax,
+        },
+    }
+
+
+def _get_cube(db: Session, group_by: list, filters: dict):
+    if not table_available(db, "StatsCube"):
+        raise HTTPException(status_code=400, detail="Statistics need the StatsCube table (run ingestion/post_ingest.py)")
+
+    # The finest geographic level grouped on or sliced by decides which
+    # cells are read; coarser levels above it act as filters only.
+    geo_depth = 0
+    for depth, (name, _) in enumerate(GEO_LEVELS, start=1):
+        if name in group_by or filters[name] is not None:
+            geo_depth = depth
+
+    query = db.query(models.StatsCube)
+    for depth, (name, column) in enumerate(GEO_LEVELS, start=1):
+        if depth > geo_depth:
+            query = query.filter(column == CUBE_ALL)
+        elif filters[name] is not None:
+            query = query.filter(column == filters[name])
+        else:
+            query = query.filter(column != CUBE_ALL)
+
+    by_dimension = {}
+    for name, column in (("category", models.StatsCube.category), ("selectivity", models.StatsCube.selectivity)):
+        by_dimension[name] = name in group_by or filters[name] is not None
+        if filters[name] is not None:
+            query = query.filter(column == filters[name])
+        elif by_dimension[name]:
+            query = query.filter(column != CUBE_ALL)
+        else:
+            query = query.filter(column == CUBE_ALL)
+
+    rows = query.order_by(models.StatsCube.formationCount.desc()).all()
+    return {
+        "groupBy": group_by,
+        "cells": [
+            _cube_cell(r, geo_depth, by_dimension["category"], by_dimension["selectivity"])
+            for r in rows
+        ]
+    }
+
+
+@router.get("/cube")
+async def get_cube(
+    group_by: Optional[str] = Query(None, description="Comma-separated: region|academy|department, category, selectivity"),
+    region: Optional[str] = None,
+    academy: Optional[str] = None,
+    department: Optional[str] = Query(None, description="Department code"),
+    category: Optional[str] = None,
+    selectivity: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Formation counts, capacity, candidates and admission rate quantiles,
+    grouped by the `group_by` dimensions and sliced by the filters. Dimensions
+    neither grouped on nor filtered are rolled up (returned as null)."""
+    dimensions = [d.strip() for d in (group_by or "").split(",") if d.strip()]
+    unknown = [d for d in dimensions if d not in GROUP_BY_DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by dimension(s): {', '.join(unknown)}")
+    if len(dimensions) != len(set(dimensions)):
+        raise HTTPException(status_code=400, detail="group_by lists a dimension twice")
+
+    filters = {
+        "region": region,
+        "academy": academy,
+        "department": department,
+        "category": category,
+        "selectivity": selectivity,
+    }
+    return await db.run_sync(_get_cube, dimensions, filters)
@@ -1,10 +1,12 @@
 import uuid
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
 from .. import models
-from ..database import get_db
+from ..database import get_async_write_db, get_write_db
+from ..scoring import scoring_engine
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -40,6 +42,24 @@ class FavoriteFormationResponse(BaseModel):
     parcoursupLink: str | None = None
 
 
+class RecommendationResponse(BaseModel):
+    id: str
+    name: str
+    category: str
+    admissionRate: float | None = None
+    schoolName: str | None = None
+    city: str | None = None
+    departmentCode: str | None = None
+    parcoursupLink: str | None = None
+    chance: float
+    distanceKm: float | None = None
+
+
+class RecommendationListResponse(BaseModel):
+    items: list[RecommendationResponse]
+    total: int
+
+
 def _profile_to_response(profile: models.UserProfile) -> dict:
     """Convert a UserProfile ORM object to response dict including favoriteIds."""
     return {
@@ -53,9 +73,7 @@ def _profile_to_response(profile: models.UserProfile) -> dict:
     }
 
 
-@router.post("/", response_model=UserProfileResponse)
-def create_user(data: UserProfileCreate, db: Session = Depends(get_db)):
-    """Create a new user profile with an auto-generated ID."""
+def _create_user(db: Session, data: UserProfileCreate):
     profile = models.UserProfile(
         id=str(uuid.uuid4())[:8],
         name=data.name,
@@ -70,10 +88,13 @@ def create_user(data: UserProfileCreate, db: Session = Depends(get_db)):
     return _profile_to_response(profile)
 
 
-# IMPORTANT: /by-name must be defined BEFORE /{user_id} to avoid route shadowing
-@router.get("/by-name/{name}", response_model=UserProfileResponse)
-def get_user_by_name(name: str, db: Session = Depends(get_db)):
-    """Retrieve a user profile by name (case-insensitive)."""
+@router.post("/", response_model=UserProfileResponse)
+async def create_user(data: UserProfileCreate, db: AsyncSession = Depends(get_async_write_db)):
+    """Create a new user profile with an auto-generated ID."""
+    return await db.run_sync(_create_user, data)
+
+
+def _get_user_by_name(db: Session, name: str):
     profile = db.query(models.UserProfile).filter(
         func.lower(models.UserProfile.name) == name.lower()
     ).first()
@@ -82,18 +103,27 @@ def get_user_by_name(name: str, db: Session = Depends(get_db)):
     return _profile_to_response(profile)
 
 
-@router.get("/{user_id}", response_model=UserProfileResponse)
-def get_user(user_id: str, db: Session = Depends(get_db)):
-    """Retrieve a user profile by ID."""
+# IMPORTANT: /by-name must be defined BEFORE /{user_id} to avoid route shadowing
+@router.get("/by-name/{name}", response_model=UserProfileResponse)
+async def get_user_by_name(name: str, db: AsyncSession = Depends(get_async_write_db)):
+    """Retrieve a user profile by name (case-insensitive)."""
+    return await db.run_sync(_get_user_by_name, name)
+
+
+def _get_user(db: Session, user_id: str):
     profile = db.query(models.UserProfile).filter(models.UserProfile.id == user_id).first()
     if not profile:
         raise HTTPException(status_code=404, detail="Profil introuvable")
     return _profile_to_response(profile)
 
 
-@router.put("/{user_id}", response_model=UserProfileResponse)
-def update_user(user_id: str, data: UserProfileCreate, db: Session = Depends(get_db)):
-    """Update an existing user profile."""
+@router.get("/{user_id}", response_model=UserProfileResponse)
+async def get_user(user_id: str, db: AsyncSession = Depends(get_async_write_db)):
+    """Retrieve a user profile by ID."""
+    return await db.run_sync(_get_user, user_id)
+
+
+def _update_user(db: Session, user_id: str, data: UserProfileCreate):
     profile = db.query(models.UserProfile).filter(models.UserProfile.id == user_id).first()
     if not profile:
         raise HTTPException(status_code=404, detail="Profil introuvable")
@@ -114,13 +144,17 @@ def update_user(user_id: str, data: UserProfileCreate, db: Session = Depends(get
     return _profile_to_response(profile)
 
 
+@router.put("/{user_id}", response_model=UserProfileResponse)
+async def update_user(user_id: str, data: UserProfileCreate, db: AsyncSession = Depends(get_async_write_db)):
+    """Update an existing user profile."""
+    return await db.run_sync(_update_user, user_id, data)
+
+
 # ============================================
 # Favorites
 # ============================================
 
-@router.post("/{user_id}/favorites/{formation_id}")
-def add_favorite(user_id: str, formation_id: str, db: Session = Depends(get_db)):
-    """Add a formation to user's favorites."""
+def _add_favorite(db: Session, user_id: str, formation_id: str):
     profile = db.query(models.UserProfile).filter(models.UserProfile.id == user_id).first()
     if not profile:
         raise HTTPException(status_code=404, detail="Profil introuvable")
@@ -138,9 +172,13 @@ def add_favorite(user_id: str, formation_id: str, db: Session = Depends(get_db))
     return {"status": "added"}
 
 
-@router.delete("/{user_id}/favorites/{formation_id}")
-def remove_favorite(user_id: str, formation_id: str, db: Session = Depends(get_db)):
-    """Remove a formation from user's favorites."""
+@router.post("/{user_id}/favorites/{formation_id}")
+async def add_favorite(user_id: str, formation_id: str, db: AsyncSession = Depends(get_async_write_db)):
+    """Add a formation to user's favorites."""
+    return await db.run_sync(_add_favorite, user_id, formation_id)
+
+
+def _remove_favorite(db: Session, user_id: str, formation_id: str):
     fav = db.query(models.UserFavorite).filter(
         models.UserFavorite.userId == user_id,
         models.UserFavorite.formationId == formation_id,
@@ -153,9 +191,13 @@ def remove_favorite(user_id: str, formation_id: str, db: Session = Depends(get_d
     return {"status": "removed"}
 
 
-@router.get("/{user_id}/favorites", response_model=list[FavoriteFormationResponse])
-def get_favorites(user_id: str, db: Session = Depends(get_db)):
-    """List all favorited formations for a user (supports both Formation and CPGE PanierSchoolStats)."""
+@router.delete("/{user_id}/favorites/{formation_id}")
+async def remove_favorite(user_id: str, formation_id: str, db: AsyncSession = Depends(get_async_write_db)):
+    """Remove a formation from user's favorites."""
+    return await db.run_sync(_remove_favorite, user_id, formation_id)
+
+
+def _get_favorites(db: Session, user_id: str):
     profile = db.query(models.UserProfile).filter(models.UserProfile.id == user_id).first()
     if not profile:
         raise HTTPException(status_code=404, detail="Profil introuvable")
@@ -216,3 +258,74 @@ def get_favorites(user_id: str, db: Session = Depends(get_db)):
             })
 
     return results
+
+
+@router.get("/{user_id}/favorites", response_model=list[FavoriteFormationResponse])
+async def get_favorites(user_id: str, db: AsyncSession = Depends(get_async_write_db)):
+    """List all favorited formations for a user (supports both Formation and CPGE PanierSchoolStats)."""
+    return await db.run_sync(_get_favorites, user_id)
+
+
+# ============================================
+# Recommendations
+# ============================================
+
+def _get_recommendations(
+    db: Session,
+    user_id: str,
+    limit: int,
+    category: str | None,
+    max_distance_km: float | None,
+    min_chance: float | None,
+):
+    profile = db.query(models.UserProfile).filter(models.UserProfile.id == user_id).first()
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profil introuvable")
+    if max_distance_km is not None and not (profile.department and scoring_engine.has_department(db, profile.department)):
+        raise HTTPException(status_code=400, detail="max_distance_km nécessite un département connu dans le profil")
+
+    scored, total = scoring_engine.recommend(db, profile, limit, category, max_distance_km, min_chance)
+    if not scored:
+        return {"items": [], "total": total}
+
+    formations = db.query(models.Formation)\
+        .options(joinedload(models.Formation.school), joinedload(models.Formation.location))\
+        .filter(models.Formation.id.in_([formation_id for formation_id, _, _ in scored]))\
+        .all()
+    formation_map = {f.id: f for f in formations}
+
+    items = []
+    for formation_id, chance, distance in scored:
+        f = formation_map[formation_id]
+        items.append({
+            "id": f.id,
+            "name": f.name,
+            "category": f.category,
+            "admissionRate": f.admissionRate,
+            "schoolName": f.school.name if f.school else None,
+            "city": f.location.city if f.location else None,
+            "departmentCode": f.location.departmentCode if f.location else None,
+            "parcoursupLink": f.parcoursupLink,
+            "chance": round(chance, 3),
+            "distanceKm": round(distance, 1) if distance is not None else None,
+        })
+
+    return {"items": items, "total": total}
+
+
+# CPU-bound: plain def on the thread pool (see get_async_db)
+@router.get("/{user_id}/recommendations", response_model=RecommendationListResponse)
+def get_recommendations(
+    user_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    category: str | None = Query(None, description="Formation category (e.g. 'CPGE', 'Licence')"),
+    max_distance_km: float | None = Query(None, gt=0, description="Maximum distance from the profile's department"),
+    min_chance: float | None = Query(None, ge=0, le=1),
+    db: Session = Depends(get_write_db),
+):
+    """
+    Formations ranked by estimated admission chance for the profile (admission
+    rate adjusted for its specialty pair and grade), best first.
+    `total` counts all formations passing the filters.
+    """
+    return _get_recommendations(db, user_id, limit, category, max_distance_km, min_chance)
@@ -1,4 +1,5 @@
-from pydantic import BaseModel, field_validator
+import orjson
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, Dict, Any
 
 
@@ -114,13 +115,13 @@ class FormationDetail(FormationBase):
     def parse_mention_distribution(cls, v: Any) -> Optional[Dict[str, float]]:
         if v is None:
             return None
+        # Normally already parsed by models.JSONText
         if isinstance(v, dict):
             return v
         if isinstance(v, str):
-            import json
             try:
-                return json.loads(v)
-            except json.JSONDecodeError:
+                return orjson.loads(v)
+            except orjson.JSONDecodeError:
                 return None
         return None
 
@@ -130,6 +131,114 @@ class FormationDetail(FormationBase):
 
 class PaginatedFormations(BaseModel):
     items: list[FormationDetail]
+    total: Optional[int] = None  # None on cursor pages after the first
+    total_estimated: bool = False  # True when count=estimate returned an approximation
+    page: int
+    size: int
+    next_cursor: Optional[str] = None
+
+
+class FormationNearby(FormationDetail):
+    distance_km: Optional[float] = None
+
+
+class PaginatedNearbyFormations(PaginatedFormations):
+    items: list[FormationNearby]
+
+
+class FormationSimilar(FormationDetail):
+    similarity: float  # 1 / (1 + feature distance)
+
+
+class SimilarFormations(BaseModel):
+    items: list[FormationSimilar]
+
+
+class PaginatedPanierStats(BaseModel):
+    items: list[PanierSchoolStatsBase]
     total: int
     page: int
     size: int
+
+
+class PanierTypeSchoolStats(PanierSchoolStatsDetail):
+    rankMultiAns: Optional[int] = None  # Only with the PanierLeaderboard table
+    rankMultiAnsTotal: Optional[int] = None
+
+
+class PanierByType(PanierBase):
+    master_formations: list[MasterFormationBase] = []
+    school_stats: list[PanierTypeSchoolStats] = []
+
+
+class PaginatedPaniers(BaseModel):
+    items: list[PanierByType]
+    total: int
+    page: int
+    size: int  # Number of paniers when `limit` is not set
+
+
+class LicenceSchool(BaseModel):
+    uai: Optional[str] = None
+    name: Optional[str] = None
+    city: Optional[str] = None
+    departmentCode: Optional[str] = None
+
+
+class LicenceFormation(BaseModel):
+    id: str
+    name: str
+    filiereDetaillee: Optional[str] = None
+    admissionRate: Optional[float] = None
+    capacity: Optional[int] = None
+    selectivity: Optional[str] = None
+    parcoursupLink: Optional[str] = None
+    mentionDistribution: Optional[Dict[str, float]] = None
+    school: Optional[LicenceSchool] = None
+
+
+class PaginatedLicenceFormations(BaseModel):
+    items: list[LicenceFormation]
+    total: Optional[int] = None  # None on cursor pages
+    page: Optional[int] = None
+    size: int
+    next_cursor: Optional[str] = None
+
+
+class MasterFormationSummary(BaseModel):
+    id: str
+    mention: Optional[str] = None
+    parcours: Optional[str] = None
+    etablissement: Optional[str] = None
+    etablissementId: Optional[str] = None
+    ville: Optional[str] = None
+    region: Optional[str] = None
+    admissionRate: Optional[float] = None
+    capacite: Optional[int] = None
+    candidats: Optional[int] = None
+    alternance: Optional[bool] = None
+    secteurDisciplinaire: Optional[str] = None
+
+
+class MasterFormationPage(BaseModel):
+    items: list[MasterFormationSummary]
+    next_cursor: Optional[str] = None
+
+
+# Batch lookups: ids are fetched with one IN query (SQLite caps bound
+# parameters at 999 on older builds)
+MAX_BATCH_IDS = 500
+
+
+class BatchRequest(BaseModel):
+    ids: list[str] = Field(..., max_length=MAX_BATCH_IDS)
+
+
+class FormationBatch(BaseModel):
+    items: list[Optional[FormationDetail]]  # Request order, None for unknown ids
+    missing: list[str]
+
+
+class SchoolBatch(BaseModel):
+    items: list[Optional[SchoolBase]]
+    missing: list[str]
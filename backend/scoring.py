@@ -0,0 +1,223 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+from .cache import get_dataset_version
+from .geo import EARTH_RADIUS_KM
+from .specialties import specialty_matrix
+
+
+# ============================================
+# Personalized admission-chance scoring
+# ============================================
+# Formation features are kept as NumPy arrays (one row per formation) and
+# reloaded on a new dataset version, so scoring a profile is one vectorized
+# pass instead of a loop over ORM objects.
+#
+# chance = odds⁻¹(odds(base rate) x specialty factor x grade factor):
+# - base rate: admissionRate, or lastCalledRank / totalCandidates without it
+# - specialty factor: admission rate of the profile's specialty pair in the
+#   formation's SpecialtyAdmissionStats category / the category mean rate
+# - grade factor: exp(GRADE_WEIGHT x (q - 0.5)), q = share of admitted
+#   students (mentionDistribution) with a grade below the profile's
+
+# mentionDistribution keys and their grade ranges out of 20
+MENTION_BINS = [
+    ("SansMention", 10.0, 12.0),
+    ("AB", 12.0, 14.0),
+    ("B", 14.0, 16.0),
+    ("TB", 16.0, 18.0),
+    ("Felicitations", 18.0, 20.0),
+]
+GRADE_WEIGHT = 3.0
+# Keep single extreme factors from saturating the score
+BASE_RATE_BOUNDS = (0.01, 0.99)
+SPECIALTY_FACTOR_BOUNDS = (0.25, 4.0)
+
+
+def grade_fractions(grade: float) -> np.ndarray:
+    """Share of each mention bin lying below `grade` (bins are taken as uniform)."""
+    return np.array([
+        min(max((grade - low) / (high - low), 0.0), 1.0) for _, low, high in MENTION_BINS
+    ])
+
+
+class _Features:
+    """Formation features of one dataset version; replaced as a whole on reload."""
+
+    def __init__(self, size: int):
+        self.ids: List[str] = []
+        self.categories: List[str] = []
+        self.category_codes = np.zeros(size, dtype=np.int32)
+        self.base_rate = np.full(size, np.nan)
+        # Normalized mention shares, NaN rows without a distribution
+        self.mentions = np.full((size, len(MENTION_BINS)), np.nan)
+        # Index into specialty_categories, -1 without specialty data
+        self.specialty_categories: List[str] = []
+        self.specialty_codes = np.full(size, -1, dtype=np.int32)
+        self.lat = np.full(size, np.nan)
+        self.lon = np.full(size, np.nan)
+        # departmentCode -> (lat, lon) in radians, mean of its SchoolLocations
+        self.department_centroids: Dict[str, Tuple[float, float]] = {}
+
+
+def _specialty_category(db: Session, category: Optional[str], filiere: Optional[str], filiere_bis: Optional[str]) -> Optional[str]:
+    """SpecialtyAdmissionStats category of a formation, if any."""
+    if category == "CPGE" and (filiere_bis or filiere):
+        return specialty_matrix.csv_category(db, filiere_bis or filiere)
+    if category == "Licence" and filiere and specialty_matrix.has_category(db, filiere):
+        return filiere
+    return None
+
+
+class ScoringEngine:
+    def __init__(self):
+        self.version: Optional[str] = None
+        self._features = _Features(0)
+        self._lock = threading.Lock()
+
+    def load(self, db: Session) -> None:
+        version = get_dataset_version(db)
+        rows = db.query(
+            models.Formation.id,
+            models.Formation.category,
+            models.Formation.filiereFormationDetaillee,
+            models.Formation.filiereFormationDetailleeBis,
+            models.Formation.admissionRate,
+            models.Formation.lastCalledRank,
+            models.Formation.totalCandidates,
+            models.Formation.mentionDistribution,
+            models.SchoolLocation.latitude,
+            models.SchoolLocation.longitude,
+        ).outerjoin(models.SchoolLocation, models.SchoolLocation.id == models.Formation.locationId)\
+            .order_by(models.Formation.id)\
+            .all()
+
+        features = _Features(len(rows))
+        category_index: Dict[str, int] = {}
+        specialty_index: Dict[str, int] = {}
+        for n, (formation_id, category, filiere, filiere_bis, rate, last_rank, candidates, mentions, lat, lon) in enumerate(rows):
+            features.ids.append(formation_id)
+            features.category_codes[n] = category_index.setdefault(category, len(category_index))
+
+            if rate is not None:
+                features.base_rate[n] = rate / 100
+            elif last_rank and candidates:
+                features.base_rate[n] = min(last_rank / candidates, 1.0)
+
+            if isinstance(mentions, dict):
+                shares = np.array([float(mentions.get(key) or 0) for key, _, _ in MENTION_BINS])
+                if shares.sum() > 0:
+                    features.mentions[n] = shares / shares.sum()
+
+            specialty_category = _specialty_category(db, category, filiere, filiere_bis)
+            if specialty_category is not None:
+                features.specialty_codes[n] = specialty_index.setdefault(specialty_category, len(specialty_index))
+
+            if lat is not None and lon is not None:
+                features.lat[n] = np.radians(lat)
+                features.lon[n] = np.radians(lon)
+
+        features.categories = list(category_index)
+        features.specialty_categories = list(specialty_index)
+
+        centroids = db.query(
+            models.SchoolLocation.departmentCode,
+            func.avg(models.SchoolLocation.latitude),
+            func.avg(models.SchoolLocation.longitude),
+        ).filter(models.SchoolLocation.departmentCode != None)\
+            .filter(models.SchoolLocation.latitude != None)\
+            .filter(models.SchoolLocation.longitude != None)\
+            .group_by(models.SchoolLocation.departmentCode)\
+            .all()
+        features.department_centroids = {
+            code: (float(np.radians(lat)), float(np.radians(lon))) for code, lat, lon in centroids
+        }
+
+        with self._lock:
+            self._features = features
+            self.version = version
+
+    def _loaded(self, db: Session) -> _Features:
+        if self.version != get_dataset_version(db):
+            self.load(db)
+        return self._features
+
+    def has_department(self, db: Session, department: str) -> bool:
+        return department in self._loaded(db).department_centroids
+
+    def score(self, db: Session, profile: models.UserProfile) -> Tuple[_Features, np.ndarray, Optional[np.ndarray]]:
+        """(features, chance per formation, distance in km from the profile's
+        department or None). Formations without a base rate score NaN."""
+        f = self._loaded(db)
+
+        p = np.clip(f.base_rate, *BASE_RATE_BOUNDS)
+        log_odds = np.log(p / (1 - p))
+
+        if profile.specialty1Id and profile.specialty2Id:
+            factors = specialty_matrix.pair_factors(db, profile.specialty1Id.lower(), profile.specialty2Id.lower())
+            # Last slot is the neutral factor for specialty_codes == -1
+            by_code = np.ones(len(f.specialty_categories) + 1)
+            for code, name in enumerate(f.specialty_categories):
+                by_code[code] = factors.get(name, 1.0)
+            log_odds += np.log(np.clip(by_code[f.specialty_codes], *SPECIALTY_FACTOR_BOUNDS))
+
+        if profile.grade is not None:
+            below = f.mentions @ grade_fractions(profile.grade)
+            # Neutral (q = 0.5) without a mention distribution
+            log_odds += GRADE_WEIGHT * (np.nan_to_num(below, nan=0.5) - 0.5)
+
+        chance = 1 / (1 + np.exp(-log_odds))
+
+        distance = None
+        centroid = f.department_centroids.get(profile.department) if profile.department else None
+        if centroid is not None:
+            lat0, lon0 = centroid
+            a = np.sin((f.lat - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(f.lat) * np.sin((f.lon - lon0) / 2) ** 2
+            distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+        return f, chance, distance
+
+    def recommend(
+        self,
+        db: Session,
+        profile: models.UserProfile,
+        k: int,
+        category: Optional[str] = None,
+        max_distance_km: Optional[float] = None,
+        min_chance: Optional[float] = None,
+    ) -> Tuple[List[Tuple[str, float, Optional[float]]], int]:
+        """Top `k` (formation id, chance, distance_km) by chance, and the
+        number of formations passing the filters."""
+        f, chance, distance = self.score(db, profile)
+
+        mask = ~np.isnan(chance)
+        if category is not None:
+            code = f.categories.index(category) if category in f.categories else -1
+            mask &= f.category_codes == code
+        if max_distance_km is not None and distance is not None:
+            mask &= distance <= max_distance_km
+        if min_chance is not None:
+            mask &= chance >= min_chance
+
+        candidates = np.flatnonzero(mask)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-chance[candidates], k - 1)[:k]]
+        # Best chance first, then closest, then id order
+        tiebreak = distance[candidates] if distance is not None else np.zeros(len(candidates))
+        ordered = candidates[np.lexsort((candidates, np.nan_to_num(tiebreak, nan=np.inf), -chance[candidates]))]
+
+        return [
+            (
+                f.ids[n],
+                float(chance[n]),
+                None if distance is None or np.isnan(distance[n]) else float(distance[n]),
+            ) for n in ordered
+        ], int(mask.sum())
+
+
+scoring_engine = ScoringEngine()
@@ -0,0 +1,177 @@
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import models
+from .cache import get_dataset_version
+
+
+# ============================================
+# Specialty-pair admission matrix
+# ============================================
+# SpecialtyAdmissionStats is small (specialties² x categories) and only
+# changes on re-ingestion. Keep it as dense arrays indexed by
+# (specialty1, specialty2, category), filled symmetrically, and reload on a
+# new dataset version.
+
+def infer_csv_category(cpge_type: str) -> Optional[str]:
+    """CSV category of a CPGE type without a CpgeCategoryMapping entry."""
+    t = cpge_type.upper()
+    if 'ECG' in t:
+        return 'CPGE ECG'
+    if any(x in t for x in ['MP', 'MPI', 'PC', 'PSI', 'BCPST', 'PT']):
+        return 'CPGE S'
+    if any(x in t for x in ['LETTRES', 'B/L', 'A/L', 'LSH']):
+        return 'CPGE L'
+    return None
+
+
+class _Arrays:
+    """One loaded dataset version; replaced as a whole on reload."""
+
+    def __init__(self, specialties: List[str], categories: List[str]):
+        self.specialties = specialties
+        self.categories = categories
+        self.specialty_index = {s: i for i, s in enumerate(specialties)}
+        self.category_index = {c: k for k, c in enumerate(categories)}
+        shape = (len(specialties), len(specialties), len(categories))
+        # [specialty1, specialty2, category]; `present` marks pairs with a row
+        self.present = np.zeros(shape, dtype=bool)
+        self.rate = np.full(shape, np.nan)
+        self.candidats = np.zeros(shape, dtype=np.int64)
+        self.propositions = np.zeros(shape)
+        # Candidate-weighted mean admission rate of each category
+        self.category_mean = np.full(len(categories), np.nan)
+        self.category_types: Dict[str, List[str]] = {}
+        self.type_category: Dict[str, str] = {}
+
+    def cell(self, i: int, j: int, k: int) -> dict:
+        rate = self.rate[i, j, k]
+        return {
+            # 0 % was reported as missing by the row-by-row lookups; keep it that way
+            "admissionRatePct": round(float(rate), 1) if rate and not np.isnan(rate) else None,
+            "candidats": int(self.candidats[i, j, k]),
+            "propositions": int(self.propositions[i, j, k]),
+        }
+
+
+class SpecialtyMatrix:
+    """SpecialtyAdmissionStats as NumPy arrays plus the CpgeCategoryMapping fan-out."""
+
+    def __init__(self):
+        self.version: Optional[str] = None
+        self._arrays = _Arrays([], [])
+        self._lock = threading.Lock()
+
+    def load(self, db: Session) -> None:
+        version = get_dataset_version(db)
+        rows = db.query(
+            models.SpecialtyAdmissionStats.specialty1Id,
+            models.SpecialtyAdmissionStats.specialty2Id,
+            models.SpecialtyAdmissionStats.cpgeCategory,
+            models.SpecialtyAdmissionStats.admissionRatePct,
+            models.SpecialtyAdmissionStats.candidats,
+            models.SpecialtyAdmissionStats.propositions,
+        ).all()
+
+        arrays = _Arrays(
+            sorted({r[0] for r in rows} | {r[1] for r in rows}),
+            list(dict.fromkeys(r[2] for r in rows)),
+        )
+        for s1, s2, category, rate_pct, n_candidats, n_propositions in rows:
+            i, j = arrays.specialty_index[s1], arrays.specialty_index[s2]
+            k = arrays.category_index[category]
+            # Keep the first row of a duplicated pair, like the former .first() lookups
+            if arrays.present[i, j, k]:
+                continue
+            for a, b in ((i, j), (j, i)):
+                arrays.present[a, b, k] = True
+                arrays.rate[a, b, k] = np.nan if rate_pct is None else rate_pct
+                arrays.candidats[a, b, k] = n_candidats or 0
+                arrays.propositions[a, b, k] = n_propositions or 0
+
+        # Each pair once (upper triangle), weighted by its candidates
+        n = len(arrays.specialties)
+        valid = arrays.present & ~np.isnan(arrays.rate) & np.triu(np.ones((n, n), dtype=bool))[:, :, None]
+        weights = np.where(valid, arrays.candidats, 0)
+        total = weights.sum(axis=(0, 1))
+        weighted = (np.nan_to_num(arrays.rate) * weights).sum(axis=(0, 1))
+        np.divide(weighted, total, out=arrays.category_mean, where=total > 0)
+
+        category_types = defaultdict(list)
+        mappings = db.query(models.CpgeCategoryMapping.cpgeType, models.CpgeCategoryMapping.csvCategory)\
+            .order_by(models.CpgeCategoryMapping.id)\
+            .all()
+        for cpge_type, csv_category in mappings:
+            category_types[csv_category].append(cpge_type)
+            arrays.type_category.setdefault(cpge_type, csv_category)
+        arrays.category_types = dict(category_types)
+
+        with self._lock:
+            self._arrays = arrays
+            self.version = version
+
+    def _loaded(self, db: Session) -> _Arrays:
+        if self.version != get_dataset_version(db):
+            self.load(db)
+        return self._arrays
+
+    def csv_category(self, db: Session, cpge_type: str) -> Optional[str]:
+        """CpgeCategoryMapping category of a CPGE type, inferred from its name otherwise."""
+        return self._loaded(db).type_category.get(cpge_type) or infer_csv_category(cpge_type)
+
+    def cpge_types(self, db: Session, csv_category: str) -> List[str]:
+        return list(self._loaded(db).category_types.get(csv_category, []))
+
+    def specialties(self, db: Session) -> List[str]:
+        return list(self._loaded(db).specialties)
+
+    def lookup(self, db: Session, specialty1: str, specialty2: str, category: str) -> Optional[dict]:
+        """Stats of one pair in one category, None without data."""
+        m = self._loaded(db)
+        i = m.specialty_index.get(specialty1)
+        j = m.specialty_index.get(specialty2)
+        k = m.category_index.get(category)
+        if i is None or j is None or k is None or not m.present[i, j, k]:
+            return None
+        return m.cell(i, j, k)
+
+    def pair(self, db: Session, specialty1: str, specialty2: str) -> Dict[str, dict]:
+        """{category: stats} for every category with data for the pair."""
+        m = self._loaded(db)
+        i = m.specialty_index.get(specialty1)
+        j = m.specialty_index.get(specialty2)
+        if i is None or j is None:
+            return {}
+        return {m.categories[k]: m.cell(i, j, k) for k in np.flatnonzero(m.present[i, j])}
+
+    def pair_factors(self, db: Session, specialty1: str, specialty2: str) -> Dict[str, float]:
+        """{category: pair admission rate / category mean rate} where both are known."""
+        m = self._loaded(db)
+        i = m.specialty_index.get(specialty1)
+        j = m.specialty_index.get(specialty2)
+        if i is None or j is None:
+            return {}
+        rates = m.rate[i, j]
+        known = m.present[i, j] & ~np.isnan(rates) & (np.nan_to_num(m.category_mean) > 0)
+        return {m.categories[k]: float(rates[k] / m.category_mean[k]) for k in np.flatnonzero(known)}
+
+    def has_category(self, db: Session, category: str) -> bool:
+        return category in self._loaded(db).category_index
+
+    def category_pairs(self, db: Session, category: str) -> List[dict]:
+        """Stats of every specialty pair (specialty1 <= specialty2) in a category."""
+        m = self._loaded(db)
+        k = m.category_index.get(category)
+        if k is None:
+            return []
+        return [
+            {"specialty1": m.specialties[i], "specialty2": m.specialties[j], **m.cell(i, j, k)}
+            for i, j in zip(*np.nonzero(np.triu(m.present[:, :, k])))
+        ]
+
+
+specialty_matrix = SpecialtyMatrix()
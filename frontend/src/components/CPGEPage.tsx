@@ -102,7 +102,7 @@ export function CPGEPage() {
             fetch(`${API_URL}/formations/paniers/by-type?cpge_type=${encodeURIComponent(selectedType)}`)
                 .then(res => res.json())
                 .then(data => {
-                    if (Array.isArray(data)) setPaniers(data);
+                    if (Array.isArray(data?.items)) setPaniers(data.items);
                 })
                 .catch(err => {
                     console.error("Failed to fetch data", err);
@@ -124,7 +124,7 @@ interface LicenceFormation {
     capacity: number | null;
     selectivity: string | null;
     parcoursupLink: string | null;
-    mentionDistribution: string | null; // JSON: {Felicitations, TB, B, AB, SansMention}
+    mentionDistribution: MentionData | null; // {Felicitations, TB, B, AB, SansMention}
     school: {
         uai: string;
         name: string;
@@ -242,7 +242,7 @@ export function LicencesPage() {
 
             fetch(`${API_URL}/licences/formations?${params}`)
                 .then(res => res.json())
-                .then(data => setFormations(data))
+                .then(data => setFormations(data.items ?? []))
                 .catch(err => console.error("Failed to fetch formations", err));
 
             fetch(`${API_URL}/licences/${encodeURIComponent(selectedType)}/top-masters`)
@@ -268,17 +268,12 @@ export function LicencesPage() {
 
     // Calculate estimated average grade from mention distribution
     // Midpoints: SansMention=11, AB=13, B=15, TB=17, Felicitations=19
-    const getEstimatedGrade = (mentionJson: string | null): number | null => {
-        if (!mentionJson) return null;
-        try {
-            const m: MentionData = JSON.parse(mentionJson);
-            const total = m.SansMention + m.AB + m.B + m.TB + m.Felicitations;
-            if (total === 0) return null;
-            // Weighted average using midpoints of each range
-            return (m.SansMention * 11 + m.AB * 13 + m.B * 15 + m.TB * 17 + m.Felicitations * 19) / total;
-        } catch {
-            return null;
-        }
+    const getEstimatedGrade = (m: MentionData | null): number | null => {
+        if (!m) return null;
+        const total = m.SansMention + m.AB + m.B + m.TB + m.Felicitations;
+        if (!total) return null;
+        // Weighted average using midpoints of each range
+        return (m.SansMention * 11 + m.AB * 13 + m.B * 15 + m.TB * 17 + m.Felicitations * 19) / total;
     };
 
     // Calculate combined score
@@ -0,0 +1,32 @@
+"""
+Geographic constants shared by post_ingest.py (SchoolCluster,
+FormationSimilar) and the backend (backend/geo.py imports this module), so
+the map grid and distances computed at ingest match the ones queried.
+"""
+
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+# Map clusters (SchoolCluster): one grid per zoom level, cells are Web
+# Mercator tiles of level zoom + CLUSTER_CELL_OFFSET (4x4 cells per map tile).
+CLUSTER_MIN_ZOOM = 3
+CLUSTER_MAX_ZOOM = 16
+CLUSTER_CELL_OFFSET = 2
+
+
+def mercator_cell(lat, lon, level):
+    """Web Mercator tile (x, y) containing the point at `level`."""
+    n = 2 ** level
+    lat = max(min(lat, 85.05112878), -85.05112878)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
@@ -2,6 +2,8 @@ import os
 import json
 import sqlite3
 
+from post_ingest import finalize
+
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, "prisma", "dev.db")
@@ -35,6 +37,7 @@ def ingest_mappings():
     
     cursor.executemany(query, data_to_insert)
     conn.commit()
+    finalize(conn)
     conn.close()
     
     print("--- Ingestion Completed ---")
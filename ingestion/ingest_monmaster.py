@@ -2,17 +2,20 @@
 Ingest MonMaster open data CSV into database.
 
 This script:
-1. Creates the MonMasterFormation, MasterSecteur, MasterSecteurFormation tables
+1. Creates the MonMasterFormation table
 2. Parses the CSV and inserts all master formation rows
 3. Computes admission rate per formation
-4. Groups by secteur disciplinaire and ranks by selectivity
-5. Creates Top 3, Top 5, Top 10 tiers per secteur
+4. Runs post_ingest.finalize, which ranks eligible formations by
+   selectivity within their secteur disciplinaire
+   (MonMasterFormation.secteurRank), so any top-N is a prefix of that
+   ranking
 """
 
 import os
 import csv
 import sqlite3
-from collections import defaultdict
+
+from post_ingest import finalize
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -67,30 +70,11 @@ def create_tables(cursor):
             rangDernierAppelePP INTEGER,
             pctFemmes REAL,
             pctMemeEtablissement REAL,
-            pctMemeAcademie REAL
-        )
-    """)
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS MasterSecteur (
-            id TEXT PRIMARY KEY,
-            secteurDisciplinaire TEXT NOT NULL,
-            secteurId TEXT NOT NULL,
-            tier TEXT NOT NULL,
-            UNIQUE(secteurId, tier)
+            pctMemeAcademie REAL,
+            secteurRank INTEGER
         )
     """)
 
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS MasterSecteurFormation (
-            masterSecteurId TEXT NOT NULL,
-            monMasterFormationId TEXT NOT NULL,
-            rank INTEGER NOT NULL,
-            PRIMARY KEY (masterSecteurId, monMasterFormationId),
-            FOREIGN KEY (masterSecteurId) REFERENCES MasterSecteur(id),
-            FOREIGN KEY (monMasterFormationId) REFERENCES MonMasterFormation(id)
-        )
-    """)
     print("   Tables created/verified.")
 
 
@@ -129,8 +113,6 @@ def ingest():
 
     # Step 1: Clear existing data
     print("\n1. Clearing existing MonMaster data...")
-    cursor.execute("DELETE FROM MasterSecteurFormation")
-    cursor.execute("DELETE FROM MasterSecteur")
     cursor.execute("DELETE FROM MonMasterFormation")
     conn.commit()
 
@@ -235,64 +217,13 @@ def ingest():
     """, formations_to_insert)
     print(f"   Inserted {len(formations_to_insert)} formations (skipped {skipped})")
 
-    # Step 3: Group by secteur and rank by selectivity
-    print("\n3. Building secteur rankings...")
+    conn.commit()
 
-    # Fetch formations eligible for ranking:
-    # - Must have a valid admission rate (rangDernierAppelePP / capacite)
-    # - At least 20 seats offered
-    # - More than 50 candidates
-    cursor.execute("""
-        SELECT id, secteurId, secteurDisciplinaire, admissionRate, candidats
-        FROM MonMasterFormation
-        WHERE admissionRate IS NOT NULL AND admissionRate > 0
-          AND capacite IS NOT NULL AND capacite >= 20
-          AND candidats IS NOT NULL AND candidats > 50
-        ORDER BY secteurId, admissionRate ASC
-    """)
+    # Step 3: Schema migrations (secteurRank on older databases), secteur
+    # rankings and the other derived tables
+    finalize(conn)
 
-    # Group by secteur
-    secteur_groups = defaultdict(list)
-    secteur_labels = {}
-    for row in cursor.fetchall():
-        fid, sid, sname, rate, cands = row
-        secteur_groups[sid].append((fid, rate))
-        secteur_labels[sid] = sname
-
-    print(f"   Found {len(secteur_groups)} distinct secteurs with valid data")
-
-    # Step 4: Create MasterSecteur and MasterSecteurFormation entries
-    print("\n4. Creating tier rankings (Top 3, Top 5, Top 10)...")
-
-    tiers = [("top3", 3), ("top5", 5), ("top10", 10)]
-    secteur_count = 0
-    formation_count = 0
-
-    for sid, formations in sorted(secteur_groups.items()):
-        sname = secteur_labels[sid]
-        # formations are already sorted by admissionRate ASC (most selective first)
-
-        for tier_name, tier_size in tiers:
-            secteur_id = f"{sid}-{tier_name}"
-            cursor.execute(
-                "INSERT OR REPLACE INTO MasterSecteur (id, secteurDisciplinaire, secteurId, tier) VALUES (?, ?, ?, ?)",
-                (secteur_id, sname, sid, tier_name)
-            )
-            secteur_count += 1
-
-            # Take top N formations for this tier
-            top_n = formations[:tier_size]
-            for rank, (fid, _rate) in enumerate(top_n, start=1):
-                cursor.execute(
-                    "INSERT OR REPLACE INTO MasterSecteurFormation (masterSecteurId, monMasterFormationId, rank) VALUES (?, ?, ?)",
-                    (secteur_id, fid, rank)
-                )
-                formation_count += 1
-
-    print(f"   Created {secteur_count} MasterSecteur entries")
-    print(f"   Created {formation_count} MasterSecteurFormation entries")
-
-    # Step 5: Print summary
+    # Step 4: Print summary
     print("\n" + "=" * 60)
     print("SUMMARY")
     print("=" * 60)
@@ -300,32 +231,26 @@ def ingest():
     cursor.execute("SELECT COUNT(*) FROM MonMasterFormation")
     total_formations = cursor.fetchone()[0]
 
-    cursor.execute("SELECT COUNT(*) FROM MasterSecteur")
-    total_secteurs = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(*) FROM MasterSecteurFormation")
-    total_rankings = cursor.fetchone()[0]
+    cursor.execute("SELECT COUNT(DISTINCT secteurId), COUNT(secteurRank) FROM MonMasterFormation")
+    total_secteurs, total_rankings = cursor.fetchone()
 
     print(f"   MonMasterFormation rows:      {total_formations}")
-    print(f"   MasterSecteur entries:         {total_secteurs}")
-    print(f"   MasterSecteurFormation entries: {total_rankings}")
+    print(f"   Secteurs:                     {total_secteurs}")
+    print(f"   Ranked formations:            {total_rankings}")
 
     # Show top 3 most selective per a sample secteur
     print("\n--- Sample: Top 3 most selective in first secteur ---")
     cursor.execute("""
-        SELECT ms.secteurDisciplinaire, ms.tier, msf.rank, 
-               m.mention, m.parcours, m.etablissementNom, 
-               m.admissionRate, m.candidats
-        FROM MasterSecteurFormation msf
-        JOIN MonMasterFormation m ON msf.monMasterFormationId = m.id
-        JOIN MasterSecteur ms ON msf.masterSecteurId = ms.id
-        WHERE ms.tier = 'top3'
-        ORDER BY ms.secteurDisciplinaire, msf.rank
+        SELECT secteurDisciplinaire, secteurRank, mention, parcours,
+               etablissementNom, admissionRate, candidats
+        FROM MonMasterFormation
+        WHERE secteurRank <= 3
+        ORDER BY secteurDisciplinaire, secteurRank
         LIMIT 15
     """)
     current_secteur = None
     for row in cursor.fetchall():
-        sname, tier, rank, mention, parcours, etab, rate, cands = row
+        sname, rank, mention, parcours, etab, rate, cands = row
         if sname != current_secteur:
             current_secteur = sname
             print(f"\n  [{sname}]")
@@ -333,7 +258,6 @@ def ingest():
         print(f"    #{rank}: {mention}{parcours_str} @ {etab} "
               f"(admission: {rate:.1f}%, {cands} candidats)")
 
-    conn.commit()
     conn.close()
 
     print("\n" + "=" * 60)
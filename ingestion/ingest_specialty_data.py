@@ -13,6 +13,8 @@ import sqlite3
 import unicodedata
 import re
 
+from post_ingest import finalize
+
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CSV_PATH = os.path.join(BASE_DIR, "data", "parcoursup", "2025", 
@@ -208,6 +210,7 @@ def ingest():
     print(f"   Inserted {len(stats_to_insert)} admission stats (skipped {skipped})")
     
     conn.commit()
+    finalize(conn)
     conn.close()
     
     print("\n" + "="*60)
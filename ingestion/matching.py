@@ -0,0 +1,85 @@
+"""
+Name matching rules shared by post_ingest.py, which resolves them into link
+tables, and the backend, which applies them at query time for values the
+link tables don't cover.
+"""
+
+# ============================================
+# Licence type -> Licence formations (FormationLicenceType)
+# ============================================
+
+# Licence types whose names don't match the filiereFormationDetaillee naming
+# convention
+LICENCE_KEYWORD_OVERRIDES = {
+    "Licence Langues et littératures françaises": ["Lettres"],
+    "Licence Sciences économiques": ["Economie", "économique"],
+    "Licence Pluri Lettres - Langues - Sciences humaines": ["Lettres"],
+    "Licence Pluri Sciences": ["Sciences"],
+    "Licence Pluri Sciences humaines et sociales": ["Sciences", "sociales"],
+    "Licence Pluri Sciences de la vie, de la santé, de la terre et de l univers": ["Sciences", "vie"],
+    "Licence Sciences de l éducation": ["éducation"],
+    "Licence Archéologie, Ethno, Préhistoire, Anthropologie": ["Archéologie"],
+    "Licence Electronique, Génie électrique, EEA": ["Electronique"],
+    "Licence Mécanique, Génie mécanique, Ingénierie mécanique": ["Mécanique"],
+    "Licence Sciences de l univers, de la terre, de l espace": ["Terre"],
+}
+LICENCE_STOP_WORDS = {"et", "de", "la", "le", "les", "du", "des", "l", "d", "en"}
+
+
+def licence_keywords(licence_type):
+    """Keywords matched (any of them) against filiereFormationDetaillee."""
+    if licence_type in LICENCE_KEYWORD_OVERRIDES:
+        return LICENCE_KEYWORD_OVERRIDES[licence_type]
+    # "Licence Mathématiques" -> "Mathématiques"; the first keyword is broad enough
+    subject = licence_type.replace("Licence ", "", 1).strip()
+    keywords = [w for w in subject.split() if w.lower() not in LICENCE_STOP_WORDS and len(w) > 1]
+    return keywords[:1]
+
+
+# ============================================
+# Licence type -> master secteurs disciplinaires (LicenceSecteur)
+# ============================================
+
+# Licence types whose names don't derive well into secteurDisciplinaire
+# keywords
+MASTER_SECTEUR_OVERRIDES = {
+    "Licence Sciences économiques": ["économie", "économétrie"],
+    "Licence Droit": ["juridiques", "droit européen"],
+    "Licence Histoire de l'art et archéologie": ["histoire de l'art", "archéologie"],
+    "Licence Langues, littératures et civilisations étrangères et régionales": ["langues, littératures et civilisations"],
+    "Licence STAPS": ["activités physiques et sportives"],
+    "Licence Sciences de la vie, de la santé, de la terre et de l univers": ["sciences de la vie", "sciences de la terre"],
+    "Licence Administration économique et sociale": ["administration économique et sociale", "management", "gestion"],
+    "Licence Mathématiques et informatique appliquées aux sciences humaines et sociales": ["mathématiques", "informatique", "sciences humaines"],
+    "Licence Physique, chimie": ["physique", "chimie"],
+    "Licence Sciences pour l'ingénieur": ["ingénieur", "mécanique", "électronique"],
+    "Licence Sciences sanitaires et sociales": ["santé", "sciences sociales"],
+    "Licence Sciences sociales": ["sociologie", "sciences sociales"],
+    "Licence Sciences de la vie": ["sciences de la vie", "biologie"],
+    "Licence Sciences de la Terre": ["sciences de la terre", "géosciences"],
+}
+MASTER_STOP_WORDS = {"et", "de", "la", "le", "les", "du", "des", "l", "d", "en", "aux", "pour", "ou"}
+
+
+def master_secteur_keywords(licence_type):
+    """Keywords matched (any of them) against MonMasterFormation.secteurDisciplinaire."""
+    if licence_type in MASTER_SECTEUR_OVERRIDES:
+        return MASTER_SECTEUR_OVERRIDES[licence_type]
+    subject = licence_type.replace("Licence ", "", 1).replace("Double ", "", 1).strip()
+    return [w for w in subject.split() if w.lower() not in MASTER_STOP_WORDS and len(w) > 3]
+
+
+# ============================================
+# Scraper CPGE type -> Parcoursup filières (after CpgeMapping)
+# ============================================
+
+def fallback_parcoursup_types(cpge_type):
+    """Hardcoded rules for CPGE types without a CpgeMapping entry."""
+    t = cpge_type.upper()
+    if "LETTRES" in t or "B/L" in t or "A/L" in t or "LSH" in t:
+        return ["Lettres", "B/L", "A/L"]
+    if "ECG" in t:
+        return ["ECG"]
+    if "BCPST" in t:
+        return ["BCPST"]
+    return [cpge_type]
@@ -0,0 +1,303 @@
+"""
+Versioned schema migrations for the SQLite database.
+
+The tables themselves are created by Prisma (`npm run db:push`) and by the
+Python ingestion scripts. This module adds what sits on top of them
+(indexes, derived tables) and records progress in `PRAGMA user_version`.
+Derived tables are filled by post_ingest.py, which applies these migrations
+first.
+
+The backend compares `current_version()` with `LATEST_VERSION` at startup
+and warns when the database is behind.
+"""
+
+import os
+import sqlite3
+
+# Paths
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.environ.get("ORIENTATION_DB_PATH", os.path.join(BASE_DIR, "prisma", "dev.db"))
+
+def add_column(table, column, declaration):
+    """Migration step adding a column unless the table already has it
+    (tables created by Prisma or an up-to-date ingestion script do)."""
+    def step(conn):
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if not columns:
+            raise sqlite3.OperationalError(f"no such table: {table}")
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+    return step
+
+
+# (version, description, statements)
+# Statements are SQL strings or callables taking the connection, and must be
+# idempotent: a migration whose tables don't exist yet (e.g. MonMaster
+# tables before ingest_monmaster.py has run) is retried on the next
+# ingestion run.
+MIGRATIONS = [
+    (1, "Indexes for router filters and joins", [
+        # /formations/ filters on category and sorts/filters on admissionRate
+        "CREATE INDEX IF NOT EXISTS idx_formation_category_rate ON Formation (category, admissionRate)",
+        "CREATE INDEX IF NOT EXISTS idx_formation_rate ON Formation (admissionRate)",
+        # paniers/by-type and licence department joins go through schoolUai
+        "CREATE INDEX IF NOT EXISTS idx_formation_school_category ON Formation (schoolUai, category)",
+        "CREATE INDEX IF NOT EXISTS idx_formation_location ON Formation (locationId)",
+        "CREATE INDEX IF NOT EXISTS idx_schoollocation_department ON SchoolLocation (departmentCode, schoolUai)",
+        "CREATE INDEX IF NOT EXISTS idx_schoollocation_school ON SchoolLocation (schoolUai)",
+        # Covering: get_parcoursup_types only reads parcoursupFiliere
+        "CREATE INDEX IF NOT EXISTS idx_cpgemapping_type_school ON CpgeMapping (etudiantType, schoolUai, parcoursupFiliere)",
+        "CREATE INDEX IF NOT EXISTS idx_cpgecategorymapping_type ON CpgeCategoryMapping (cpgeType, csvCategory)",
+        "CREATE INDEX IF NOT EXISTS idx_specialtystats_pair_category ON SpecialtyAdmissionStats (specialty1Id, specialty2Id, cpgeCategory)",
+        "CREATE INDEX IF NOT EXISTS idx_panier_cpgetype ON Panier (cpgeType)",
+        "CREATE INDEX IF NOT EXISTS idx_panierschoolstats_panier ON PanierSchoolStats (panierId)",
+        "CREATE INDEX IF NOT EXISTS idx_panierschoolstats_school ON PanierSchoolStats (schoolUai)",
+        "CREATE INDEX IF NOT EXISTS idx_monmaster_secteur_rate ON MonMasterFormation (secteurId, admissionRate)",
+        "CREATE INDEX IF NOT EXISTS idx_monmaster_rate ON MonMasterFormation (admissionRate)",
+        "CREATE INDEX IF NOT EXISTS idx_mastersecteurformation_rank ON MasterSecteurFormation (masterSecteurId, rank)",
+    ]),
+    (2, "FTS5 index over formation, school and city names", [
+        # remove_diacritics folds accents ("Béziers" matches "beziers");
+        # prefix indexes keep "par"* style queries off the full token scan.
+        """CREATE VIRTUAL TABLE IF NOT EXISTS FormationSearch USING fts5(
+            formationId UNINDEXED,
+            name,
+            filiere,
+            filiereBis,
+            school,
+            city,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )""",
+    ]),
+    (3, "Keyset pagination indexes on (admissionRate, id)", [
+        # Supersede the rate-only indexes from migration 1: with id appended the
+        # (admissionRate, id) cursor order is an index range scan, not a sort.
+        "CREATE INDEX IF NOT EXISTS idx_formation_rate_id ON Formation (admissionRate, id)",
+        "CREATE INDEX IF NOT EXISTS idx_formation_category_rate_id ON Formation (category, admissionRate, id)",
+        "DROP INDEX IF EXISTS idx_formation_rate",
+        "DROP INDEX IF EXISTS idx_formation_category_rate",
+        "CREATE INDEX IF NOT EXISTS idx_monmaster_rate_id ON MonMasterFormation (admissionRate, id)",
+        "DROP INDEX IF EXISTS idx_monmaster_rate",
+    ]),
+    (4, "DatasetMeta table holding the dataset version", [
+        # The backend keys its caches on the 'version' row, bumped by post_ingest.py
+        "CREATE TABLE IF NOT EXISTS DatasetMeta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    ]),
+    (5, "PanierLeaderboard materialized table", [
+        # One row per PanierSchoolStats with the Parcoursup formation resolved
+        # at ingest; `position` keeps the original panier/school order.
+        """CREATE TABLE IF NOT EXISTS PanierLeaderboard (
+            statsId TEXT PRIMARY KEY,
+            panierId TEXT NOT NULL,
+            cpgeType TEXT NOT NULL,
+            schoolUai TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            tauxIntegrationPct REAL,
+            moyenneBac REAL,
+            moyenneMultiAnsPct REAL,
+            rangMultiAns TEXT,
+            rankMultiAns INTEGER,
+            rankMultiAnsTotal INTEGER,
+            parcoursup BOOLEAN,
+            admissionRate REAL,
+            parcoursupLink TEXT,
+            parcoursupName TEXT,
+            excluded BOOLEAN NOT NULL DEFAULT 0
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_panierleaderboard_type ON PanierLeaderboard (cpgeType, excluded, panierId, position)",
+    ]),
+    (6, "FormationCpgeType link table for filiere_bis filters", [
+        # Formations matching each scraper CPGE type / filière, overrides applied
+        """CREATE TABLE IF NOT EXISTS FormationCpgeType (
+            cpgeType TEXT NOT NULL,
+            formationId TEXT NOT NULL,
+            PRIMARY KEY (cpgeType, formationId)
+        ) WITHOUT ROWID""",
+    ]),
+    (7, "FormationMention typed mention shares", [
+        # Formation.mentionDistribution (JSON) split into numeric columns;
+        # the JSON column stays for API compatibility.
+        """CREATE TABLE IF NOT EXISTS FormationMention (
+            formationId TEXT PRIMARY KEY,
+            felicitationsPct REAL,
+            tbPct REAL,
+            bPct REAL,
+            abPct REAL,
+            sansMentionPct REAL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_formationmention_tb ON FormationMention (tbPct)",
+        "CREATE INDEX IF NOT EXISTS idx_formationmention_felicitations ON FormationMention (felicitationsPct)",
+    ]),
+    (8, "SchoolLocationGeo R*Tree over location coordinates", [
+        # id = SchoolLocation.rowid; points are stored as zero-size boxes
+        """CREATE VIRTUAL TABLE IF NOT EXISTS SchoolLocationGeo USING rtree(
+            id,
+            minLat, maxLat,
+            minLon, maxLon
+        )""",
+    ]),
+    (9, "SchoolCluster map grid clusters per zoom level", [
+        # Web Mercator cells at tile level zoom + 2 (4x4 cells per map tile)
+        """CREATE TABLE IF NOT EXISTS SchoolCluster (
+            zoom INTEGER NOT NULL,
+            cellX INTEGER NOT NULL,
+            cellY INTEGER NOT NULL,
+            locationCount INTEGER NOT NULL,
+            formationCount INTEGER NOT NULL,
+            latitude REAL NOT NULL,
+            longitude REAL NOT NULL,
+            locationId TEXT,
+            stats TEXT,
+            PRIMARY KEY (zoom, cellX, cellY)
+        ) WITHOUT ROWID""",
+    ]),
+    (10, "StatsCube aggregates by geography, category and selectivity", [
+        # '*' in a dimension column means "all values" (rolled up)
+        """CREATE TABLE IF NOT EXISTS StatsCube (
+            region TEXT NOT NULL,
+            academy TEXT NOT NULL,
+            departmentCode TEXT NOT NULL,
+            departmentName TEXT,
+            category TEXT NOT NULL,
+            selectivity TEXT NOT NULL,
+            formationCount INTEGER NOT NULL,
+            capacitySum INTEGER,
+            candidatesSum INTEGER,
+            admissionProposalsSum INTEGER,
+            genderParityAvg REAL,
+            admissionRateAvg REAL,
+            admissionRateMin REAL,
+            admissionRateP25 REAL,
+            admissionRateMedian REAL,
+            admissionRateP75 REAL,
+            admissionRateMax REAL,
+            PRIMARY KEY (category, selectivity, region, academy, departmentCode)
+        ) WITHOUT ROWID""",
+    ]),
+    (11, "FormationSimilar nearest-neighbour index", [
+        # Top-K closest formations in the feature space of post_ingest.py
+        """CREATE TABLE IF NOT EXISTS FormationSimilar (
+            formationId TEXT NOT NULL,
+            rank INTEGER NOT NULL,
+            similarId TEXT NOT NULL,
+            distance REAL NOT NULL,
+            PRIMARY KEY (formationId, rank)
+        ) WITHOUT ROWID""",
+    ]),
+    (12, "FormationLicenceType link table for /licences/formations", [
+        # Licence formations matching each SpecialtyAdmissionStats licence type
+        """CREATE TABLE IF NOT EXISTS FormationLicenceType (
+            licenceType TEXT NOT NULL,
+            formationId TEXT NOT NULL,
+            PRIMARY KEY (licenceType, formationId)
+        ) WITHOUT ROWID""",
+    ]),
+    (13, "Licence to master pathways (LicenceSecteur, LicenceMasterPathway)", [
+        # Secteurs disciplinaires matching each licence type
+        """CREATE TABLE IF NOT EXISTS LicenceSecteur (
+            licenceType TEXT NOT NULL,
+            secteurDisciplinaire TEXT NOT NULL,
+            secteurId TEXT,
+            PRIMARY KEY (licenceType, secteurDisciplinaire)
+        ) WITHOUT ROWID""",
+        # Eligible masters of those secteurs, rank 1 = lowest admission rate
+        """CREATE TABLE IF NOT EXISTS LicenceMasterPathway (
+            licenceType TEXT NOT NULL,
+            rank INTEGER NOT NULL,
+            monMasterFormationId TEXT NOT NULL,
+            region TEXT,
+            alternance BOOLEAN,
+            PRIMARY KEY (licenceType, rank)
+        ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS idx_licencemasterpathway_region ON LicenceMasterPathway (licenceType, region, rank)",
+        "CREATE INDEX IF NOT EXISTS idx_licencemasterpathway_alternance ON LicenceMasterPathway (licenceType, alternance, rank)",
+    ]),
+    (14, "MonMasterFormation.secteurRank replaces the MasterSecteur tier tables", [
+        # secteurRank is filled by post_ingest.py: top-N of a secteur is
+        # secteurRank <= N, so the top3/top5/top10 copies are dropped.
+        add_column("MonMasterFormation", "secteurRank", "INTEGER"),
+        "CREATE INDEX IF NOT EXISTS idx_monmaster_secteur_rank ON MonMasterFormation (secteurId, secteurRank)",
+        "CREATE INDEX IF NOT EXISTS idx_monmaster_secteur_region_rank ON MonMasterFormation (secteurId, region, secteurRank)",
+        "CREATE INDEX IF NOT EXISTS idx_monmaster_secteur_alternance_rank ON MonMasterFormation (secteurId, alternance, secteurRank)",
+        # Migration 1 indexed MasterSecteurFormation (masterSecteurId, rank);
+        # the index goes with the table
+        "DROP INDEX IF EXISTS idx_mastersecteurformation_rank",
+        "DROP TABLE IF EXISTS MasterSecteurFormation",
+        "DROP TABLE IF EXISTS MasterSecteur",
+    ]),
+    (15, "GlobalSearch FTS5 index over formations, schools and masters", [
+        # One row per Formation, School and MonMasterFormation (entityType
+        # 'formation', 'school', 'master'), rowids grouped by type and
+        # popularity. name/detail/place are returned as-is, keywords only
+        # feed the matching.
+        """CREATE VIRTUAL TABLE IF NOT EXISTS GlobalSearch USING fts5(
+            entityType UNINDEXED,
+            entityId UNINDEXED,
+            label UNINDEXED,
+            popularity UNINDEXED,
+            name,
+            detail,
+            place,
+            keywords,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )""",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Tables dropped by migration 14. Released migrations stay as they shipped;
+# their statements on these tables are skipped on databases that never had
+# them, instead of postponing every later migration.
+DROPPED_TABLES = {"MasterSecteur", "MasterSecteurFormation"}
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _dropped_table_missing(error):
+    """True when `error` is about a table that a later migration drops."""
+    message = str(error)
+    if not message.startswith("no such table:"):
+        return False
+    return message.split(":", 1)[1].strip().rsplit(".", 1)[-1] in DROPPED_TABLES
+
+
+def apply_migrations(conn):
+    """Apply pending migrations in order. Stops at the first migration that
+    can't complete yet (missing table) so it is retried next time."""
+    version = current_version(conn)
+    for number, description, statements in MIGRATIONS:
+        if number <= version:
+            continue
+        try:
+            for statement in statements:
+                try:
+                    if callable(statement):
+                        statement(conn)
+                    else:
+                        conn.execute(statement)
+                except sqlite3.OperationalError as e:
+                    if not _dropped_table_missing(e):
+                        raise
+        except sqlite3.OperationalError as e:
+            conn.rollback()
+            print(f"   Migration {number} ({description}) postponed: {e}")
+            break
+        # PRAGMA doesn't accept bound parameters
+        conn.execute(f"PRAGMA user_version = {int(number)}")
+        conn.commit()
+        version = number
+        print(f"   Applied migration {number}: {description}")
+    return version
+
+
+if __name__ == "__main__":
+    conn = sqlite3.connect(DB_PATH)
+    print("--- Applying migrations ---")
+    apply_migrations(conn)
+    print(f"--- Schema at version {current_version(conn)} (latest {LATEST_VERSION}) ---")
+    conn.close()
@@ -0,0 +1,733 @@
+"""
+Post-ingestion step shared by every ingestion script.
+
+1. Applies pending schema migrations (migrations.py)
+2. Rebuilds derived tables from the freshly ingested data
+3. Refreshes query planner statistics (ANALYZE)
+4. Bumps the dataset version, which invalidates the backend caches
+
+Run it by hand after the TypeScript ingestion (`npm run ingest` does it
+through its `postingest` hook):
+    python post_ingest.py
+"""
+
+import json
+import math
+import re
+import sqlite3
+import statistics
+from collections import defaultdict
+from datetime import datetime, timezone
+
+try:
+    import numpy as np
+except ImportError:  # only needed for FormationSimilar
+    np = None
+
+from geo import CLUSTER_CELL_OFFSET, CLUSTER_MAX_ZOOM, CLUSTER_MIN_ZOOM, EARTH_RADIUS_KM, mercator_cell
+from matching import MASTER_SECTEUR_OVERRIDES, fallback_parcoursup_types, licence_keywords, master_secteur_keywords
+from migrations import DB_PATH, apply_migrations, current_version, LATEST_VERSION
+from search_layout import SEARCH_ENTITY_BLOCKS, SEARCH_ROWID_BLOCK
+
+
+def table_exists(conn, name):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = ? AND type IN ('table', 'view')", (name,)
+    ).fetchone()
+    return row is not None
+
+
+def build_formation_search(conn):
+    """Fill the FormationSearch FTS5 table (name, filières, school, city)."""
+    if not table_exists(conn, "FormationSearch") or not table_exists(conn, "Formation"):
+        return
+    conn.execute("DELETE FROM FormationSearch")
+    conn.execute("""
+        INSERT INTO FormationSearch (formationId, name, filiere, filiereBis, school, city)
+        SELECT f.id,
+               f.name,
+               TRIM(COALESCE(f.filiereFormationDetaillee, '') || ' ' || COALESCE(f.filiereTresDetaillee, '')),
+               f.filiereFormationDetailleeBis,
+               s.name,
+               l.city
+        FROM Formation f
+        LEFT JOIN School s ON s.uai = f.schoolUai
+        LEFT JOIN SchoolLocation l ON l.id = f.locationId
+    """)
+    conn.execute("INSERT INTO FormationSearch (FormationSearch) VALUES ('optimize')")
+    count = conn.execute("SELECT COUNT(*) FROM FormationSearch").fetchone()[0]
+    print(f"   FormationSearch: indexed {count} formations")
+
+
+def build_global_search(conn):
+    """Fill the GlobalSearch FTS5 table behind /search.
+
+    popularity (candidates for formations and masters, formation count for
+    schools) orders the rowids, so the backend can cut a broad match down to
+    its most popular rows with a rowid range.
+    """
+    if not table_exists(conn, "GlobalSearch"):
+        return
+    conn.execute("DELETE FROM GlobalSearch")
+    sources = {
+        "formation": ("Formation", """
+            SELECT f.id AS entityId, f.category AS label, f.totalCandidates AS popularity,
+                   f.name AS name,
+                   s.name AS detail,
+                   l.city AS place,
+                   TRIM(COALESCE(f.filiereFormationDetaillee, '') || ' ' || COALESCE(f.filiereTresDetaillee, '')
+                        || ' ' || COALESCE(f.filiereFormationDetailleeBis, '')) AS keywords
+            FROM Formation f
+            LEFT JOIN School s ON s.uai = f.schoolUai
+            LEFT JOIN SchoolLocation l ON l.id = f.locationId
+        """),
+        "school": ("School", """
+            SELECT s.uai AS entityId, s.status AS label,
+                   (SELECT COUNT(*) FROM Formation f WHERE f.schoolUai = s.uai) AS popularity,
+                   s.name AS name,
+                   NULL AS detail,
+                   (SELECT GROUP_CONCAT(city, ', ') FROM (
+                       SELECT DISTINCT l.city FROM SchoolLocation l
+                       WHERE l.schoolUai = s.uai AND l.city IS NOT NULL ORDER BY l.city
+                   )) AS place,
+                   NULL AS keywords
+            FROM School s
+        """),
+        "master": ("MonMasterFormation", """
+            SELECT id AS entityId, secteurDisciplinaire AS label, candidats AS popularity,
+                   mention AS name,
+                   COALESCE(parcours || ' — ', '') || etablissementNom AS detail,
+                   ville AS place,
+                   TRIM(COALESCE(discipline, '') || ' ' || COALESCE(secteurDisciplinaire, '')) AS keywords
+            FROM MonMasterFormation
+        """),
+    }
+    for entity_type, (table, select) in sources.items():
+        if not table_exists(conn, table):
+            continue
+        conn.execute(f"""
+            INSERT INTO GlobalSearch (rowid, entityType, entityId, label, popularity, name, detail, place, keywords)
+            SELECT ? + ROW_NUMBER() OVER (ORDER BY popularity DESC NULLS LAST, entityId),
+                   ?, entityId, label, popularity, name, detail, place, keywords
+            FROM ({select})
+        """, (SEARCH_ENTITY_BLOCKS[entity_type] * SEARCH_ROWID_BLOCK, entity_type))
+    conn.execute("INSERT INTO GlobalSearch (GlobalSearch) VALUES ('optimize')")
+    counts = conn.execute("SELECT entityType, COUNT(*) FROM GlobalSearch GROUP BY entityType ORDER BY entityType").fetchall()
+    print("   GlobalSearch: " + ", ".join(f"{n} {t}s" for t, n in counts))
+
+
+def build_formation_mentions(conn):
+    """Copy the mentionDistribution JSON of each formation into FormationMention."""
+    if not table_exists(conn, "FormationMention") or not table_exists(conn, "Formation"):
+        return
+    conn.execute("DELETE FROM FormationMention")
+    conn.execute("""
+        INSERT INTO FormationMention (formationId, felicitationsPct, tbPct, bPct, abPct, sansMentionPct)
+        SELECT id,
+               json_extract(mentionDistribution, '$.Felicitations'),
+               json_extract(mentionDistribution, '$.TB'),
+               json_extract(mentionDistribution, '$.B'),
+               json_extract(mentionDistribution, '$.AB'),
+               json_extract(mentionDistribution, '$.SansMention')
+        FROM Formation
+        WHERE mentionDistribution IS NOT NULL AND json_valid(mentionDistribution)
+    """)
+    count = conn.execute("SELECT COUNT(*) FROM FormationMention").fetchone()[0]
+    print(f"   FormationMention: {count} formations")
+
+
+def build_school_location_geo(conn):
+    """Index SchoolLocation coordinates in the SchoolLocationGeo R*Tree."""
+    if not table_exists(conn, "SchoolLocationGeo") or not table_exists(conn, "SchoolLocation"):
+        return
+    conn.execute("DELETE FROM SchoolLocationGeo")
+    conn.execute("""
+        INSERT INTO SchoolLocationGeo (id, minLat, maxLat, minLon, maxLon)
+        SELECT rowid, latitude, latitude, longitude, longitude
+        FROM SchoolLocation
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+    """)
+    count = conn.execute("SELECT COUNT(*) FROM SchoolLocationGeo").fetchone()[0]
+    print(f"   SchoolLocationGeo: {count} locations")
+
+
+def build_school_clusters(conn):
+    """Group SchoolLocations into grid cells for every map zoom level, with
+    formation counts and min/median admission rate per category."""
+    required = ["SchoolCluster", "SchoolLocation", "Formation"]
+    if not all(table_exists(conn, t) for t in required):
+        return
+    conn.execute("DELETE FROM SchoolCluster")
+
+    locations = conn.execute("""
+        SELECT id, latitude, longitude FROM SchoolLocation
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+    """).fetchall()
+    formations_by_location = defaultdict(list)
+    for location_id, category, rate in conn.execute(
+        "SELECT locationId, category, admissionRate FROM Formation WHERE locationId IS NOT NULL"
+    ):
+        formations_by_location[location_id].append((category, rate))
+
+    rows = []
+    for zoom in range(CLUSTER_MIN_ZOOM, CLUSTER_MAX_ZOOM + 1):
+        cells = defaultdict(list)
+        for location in locations:
+            cells[mercator_cell(location[1], location[2], zoom + CLUSTER_CELL_OFFSET)].append(location)
+
+        for (x, y), cell_locations in cells.items():
+            rates_by_category = defaultdict(list)
+            formation_count = 0
+            for location_id, _, _ in cell_locations:
+                for category, rate in formations_by_location[location_id]:
+                    formation_count += 1
+                    rates_by_category[category or "Autre"].append(rate)
+
+            stats = {}
+            for category, rates in sorted(rates_by_category.items()):
+                known = [r for r in rates if r is not None]
+                stats[category] = {
+                    "count": len(rates),
+                    "minAdmissionRate": min(known) if known else None,
+                    "medianAdmissionRate": statistics.median(known) if known else None,
+                }
+            rows.append((
+                zoom, x, y, len(cell_locations), formation_count,
+                statistics.fmean(l[1] for l in cell_locations),
+                statistics.fmean(l[2] for l in cell_locations),
+                cell_locations[0][0] if len(cell_locations) == 1 else None,
+                json.dumps(stats, ensure_ascii=False),
+            ))
+
+    conn.executemany("""
+        INSERT INTO SchoolCluster
+        (zoom, cellX, cellY, locationCount, formationCount, latitude, longitude, locationId, stats)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    print(f"   SchoolCluster: {len(rows)} cells over zoom {CLUSTER_MIN_ZOOM}-{CLUSTER_MAX_ZOOM}")
+
+
+# Geographic roll-up levels of the stats cube, coarsest first
+CUBE_GEO_LEVELS = ["region", "academy", "departmentCode"]
+CUBE_ALL = "*"
+
+
+def _cube_measures(rows):
+    rates = sorted(r["admissionRate"] for r in rows if r["admissionRate"] is not None)
+    parities = [r["genderParity"] for r in rows if r["genderParity"] is not None]
+    quartiles = [None, None, None]
+    if len(rates) >= 2:
+        quartiles = statistics.quantiles(rates, n=4, method="inclusive")
+    elif rates:
+        quartiles = [rates[0]] * 3
+    return (
+        len(rows),
+        sum(r["capacity"] or 0 for r in rows),
+        sum(r["totalCandidates"] or 0 for r in rows),
+        sum(r["totalCandidatesWithAdmissionProposal"] or 0 for r in rows),
+        statistics.fmean(parities) if parities else None,
+        statistics.fmean(rates) if rates else None,
+        rates[0] if rates else None,
+        quartiles[0],
+        quartiles[1],
+        quartiles[2],
+        rates[-1] if rates else None,
+    )
+
+
+def build_stats_cube(conn):
+    """Aggregate formations over every roll-up of (geography, category,
+    selectivity). Geography rolls up department -> academy -> region -> all."""
+    required = ["StatsCube", "Formation", "SchoolLocation"]
+    if not all(table_exists(conn, t) for t in required):
+        return
+    conn.execute("DELETE FROM StatsCube")
+
+    conn.row_factory = sqlite3.Row
+    try:
+        formations = conn.execute("""
+            SELECT f.category, f.selectivity, f.capacity, f.totalCandidates,
+                   f.totalCandidatesWithAdmissionProposal, f.genderParity, f.admissionRate,
+                   l.region, l.academy, l.departmentCode, l.departmentName
+            FROM Formation f
+            LEFT JOIN SchoolLocation l ON l.id = f.locationId
+        """).fetchall()
+    finally:
+        conn.row_factory = None
+
+    department_names = {}
+    rows = []
+    # depth 0 = national, 1 = region, 2 = academy, 3 = department
+    for depth in range(len(CUBE_GEO_LEVELS) + 1):
+        geo_columns = CUBE_GEO_LEVELS[:depth]
+        for by_category in (False, True):
+            for by_selectivity in (False, True):
+                cells = defaultdict(list)
+                for f in formations:
+                    geo = tuple(f[c] for c in geo_columns)
+                    # Formations without a location only count in national cells
+                    if any(v is None for v in geo):
+                        continue
+                    if depth == len(CUBE_GEO_LEVELS):
+                        department_names[f["departmentCode"]] = f["departmentName"]
+                    key = (
+                        geo,
+                        (f["category"] or "") if by_category else CUBE_ALL,
+                        (f["selectivity"] or "") if by_selectivity else CUBE_ALL,
+                    )
+                    cells[key].append(f)
+
+                for (geo, category, selectivity), cell in cells.items():
+                    region, academy, department = (list(geo) + [CUBE_ALL] * 3)[:3]
+                    rows.append((
+                        region, academy, department, department_names.get(department),
+                        category, selectivity, *_cube_measures(cell),
+                    ))
+
+    conn.executemany("""
+        INSERT OR REPLACE INTO StatsCube
+        (region, academy, departmentCode, departmentName, category, selectivity,
+         formationCount, capacitySum, candidatesSum, admissionProposalsSum, genderParityAvg,
+         admissionRateAvg, admissionRateMin, admissionRateP25, admissionRateMedian,
+         admissionRateP75, admissionRateMax)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    print(f"   StatsCube: {len(rows)} cells")
+
+
+# Neighbours kept per formation, and the weight of each feature block
+# (numeric features are standardized, one-hot blocks are 0/1)
+SIMILAR_K = 20
+SIMILAR_WEIGHTS = {
+    "category": 3.0,
+    "filiere": 2.0,
+    "filiereBis": 1.5,
+    "selectivity": 0.5,
+    "admissionRate": 1.0,
+    "capacity": 0.5,
+    "mentions": 1.0,
+    "location": 1.0,
+}
+# Location is a point on the unit sphere scaled so that 1.0 is ~500 km
+SIMILAR_LOCATION_SCALE_KM = 500.0
+# Rows of the distance matrix computed at once
+SIMILAR_BLOCK = 1024
+MENTION_KEYS = ["Felicitations", "TB", "B", "AB", "SansMention"]
+
+
+def _one_hot(values):
+    index = {v: n for n, v in enumerate(sorted({v for v in values if v}))}
+    block = np.zeros((len(values), len(index)), dtype=np.float32)
+    for row, value in enumerate(values):
+        if value:
+            block[row, index[value]] = 1.0
+    return block
+
+
+def _standardized(values):
+    """Column of z-scores, missing values at the mean (0)."""
+    column = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    known = ~np.isnan(column)
+    if known.any():
+        column -= column[known].mean()
+        std = column[known].std()
+        if std > 0:
+            column /= std
+    column[~known] = 0.0
+    return column.astype(np.float32)[:, None]
+
+
+def build_formation_similar(conn):
+    """Brute-force top SIMILAR_K nearest formations over feature vectors built
+    from category, filières, selectivity, admission rate, capacity, mention
+    distribution and location."""
+    if not table_exists(conn, "FormationSimilar") or not table_exists(conn, "Formation"):
+        return
+    if np is None:
+        print("   FormationSimilar: skipped (numpy is not installed)")
+        return
+    conn.execute("DELETE FROM FormationSimilar")
+
+    rows = conn.execute("""
+        SELECT f.id, f.category, f.filiereFormationDetaillee, f.filiereFormationDetailleeBis,
+               f.selectivity, f.admissionRate, f.capacity, f.mentionDistribution,
+               l.latitude, l.longitude
+        FROM Formation f
+        LEFT JOIN SchoolLocation l ON l.id = f.locationId
+        ORDER BY f.id
+    """).fetchall()
+    if len(rows) < 2:
+        return
+    ids = [r[0] for r in rows]
+
+    mentions = np.zeros((len(rows), len(MENTION_KEYS)), dtype=np.float32)
+    for n, r in enumerate(rows):
+        try:
+            distribution = json.loads(r[7]) if r[7] else None
+        except ValueError:
+            distribution = None
+        if isinstance(distribution, dict):
+            shares = np.array([float(distribution.get(k) or 0) for k in MENTION_KEYS], dtype=np.float32)
+            if shares.sum() > 0:
+                mentions[n] = shares / shares.sum()
+
+    location = np.full((len(rows), 3), np.nan)
+    for n, r in enumerate(rows):
+        if r[8] is not None and r[9] is not None:
+            lat, lon = math.radians(r[8]), math.radians(r[9])
+            location[n] = (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+    known = ~np.isnan(location[:, 0])
+    # Formations without a location sit at the centroid of the others
+    location[~known] = location[known].mean(axis=0) if known.any() else 0.0
+    location *= EARTH_RADIUS_KM / SIMILAR_LOCATION_SCALE_KM
+
+    blocks = {
+        "category": _one_hot([r[1] for r in rows]),
+        "filiere": _one_hot([r[2] for r in rows]),
+        "filiereBis": _one_hot([r[3] for r in rows]),
+        "selectivity": _one_hot([r[4] for r in rows]),
+        "admissionRate": _standardized([r[5] for r in rows]),
+        "capacity": _standardized([math.log1p(r[6]) if r[6] else None for r in rows]),
+        "mentions": mentions,
+        "location": location.astype(np.float32),
+    }
+    features = np.hstack([blocks[name] * weight for name, weight in SIMILAR_WEIGHTS.items()])
+    squared_norms = (features ** 2).sum(axis=1)
+
+    k = min(SIMILAR_K, len(rows) - 1)
+    neighbours = []
+    for start in range(0, len(rows), SIMILAR_BLOCK):
+        stop = min(start + SIMILAR_BLOCK, len(rows))
+        # |a - b|² = |a|² + |b|² - 2 a.b
+        distances = squared_norms[start:stop, None] + squared_norms[None, :] - 2 * features[start:stop] @ features.T
+        distances[np.arange(stop - start), np.arange(start, stop)] = np.inf
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        for offset, candidates in enumerate(nearest):
+            block_distances = distances[offset, candidates]
+            for rank, n in enumerate(candidates[np.lexsort((candidates, block_distances))], start=1):
+                neighbours.append((
+                    ids[start + offset], rank, ids[n],
+                    float(np.sqrt(max(distances[offset, n], 0.0))),
+                ))
+
+    conn.executemany(
+        "INSERT INTO FormationSimilar (formationId, rank, similarId, distance) VALUES (?, ?, ?, ?)",
+        neighbours,
+    )
+    print(f"   FormationSimilar: {k} neighbours for {len(rows)} formations")
+
+
+def bump_dataset_version(conn):
+    if not table_exists(conn, "DatasetMeta"):
+        return
+    version = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S%f")
+    conn.execute("INSERT OR REPLACE INTO DatasetMeta (key, value) VALUES ('version', ?)", (version,))
+    print(f"   Dataset version: {version}")
+
+
+def resolve_parcoursup_types(conn, cpge_type, school_uai=None):
+    """Map a scraper CPGE type to Parcoursup filière names (CpgeMapping table).
+    Same rules as FiliereResolver in backend/filieres.py."""
+    # 1. School-specific overrides
+    if school_uai:
+        rows = conn.execute(
+            "SELECT parcoursupFiliere FROM CpgeMapping WHERE etudiantType = ? AND schoolUai = ?",
+            (cpge_type, school_uai),
+        ).fetchall()
+        if rows:
+            return [r[0] for r in rows]
+
+    # 2. Global mappings
+    rows = conn.execute(
+        "SELECT parcoursupFiliere FROM CpgeMapping WHERE etudiantType = ? AND schoolUai IS NULL",
+        (cpge_type,),
+    ).fetchall()
+    if rows:
+        return [r[0] for r in rows]
+
+    # 3. Hardcoded fallback
+    return fallback_parcoursup_types(cpge_type)
+
+
+def parse_rang(rang):
+    """'2e/51' -> (2, 51). (None, None) when missing or unparseable."""
+    if not rang:
+        return None, None
+    m = re.search(r"(\d+)\D*/\s*(\d+)", str(rang))
+    if not m:
+        return None, None
+    return int(m.group(1)), int(m.group(2))
+
+
+def build_panier_leaderboard(conn):
+    """Resolve, once per ingestion, what /formations/paniers/by-type used to
+    compute per request: the Parcoursup formation (admission rate, link) of
+    each school in each panier, and whether an override excludes the school."""
+    required = ["PanierLeaderboard", "Panier", "PanierSchoolStats", "Formation", "CpgeMapping"]
+    if not all(table_exists(conn, t) for t in required):
+        return
+    conn.execute("DELETE FROM PanierLeaderboard")
+
+    # CPGE formations per school, in table order (first match wins, as before)
+    formations_by_school = defaultdict(list)
+    for row in conn.execute("""
+        SELECT schoolUai, name, filiereFormationDetaillee, filiereFormationDetailleeBis,
+               admissionRate, parcoursupLink
+        FROM Formation
+        WHERE category LIKE '%CPGE%'
+        ORDER BY rowid
+    """):
+        formations_by_school[row[0]].append(row[1:])
+
+    cpge_types = [r[0] for r in conn.execute("SELECT DISTINCT cpgeType FROM Panier WHERE cpgeType IS NOT NULL")]
+    rows_to_insert = []
+    for cpge_type in cpge_types:
+        global_filieres = resolve_parcoursup_types(conn, cpge_type)
+
+        school_overrides = defaultdict(list)
+        schools_to_exclude = set()
+        for uai, filiere in conn.execute(
+            "SELECT schoolUai, parcoursupFiliere FROM CpgeMapping WHERE etudiantType = ? AND schoolUai IS NOT NULL",
+            (cpge_type,),
+        ):
+            school_overrides[uai].append(filiere)
+            # An override to a different filière means l'Etudiant put this
+            # school under the wrong type
+            if filiere not in global_filieres:
+                schools_to_exclude.add(uai)
+
+        rates_map = {}
+        stats = conn.execute("""
+            SELECT s.id, s.panierId, s.schoolUai, s.tauxIntegrationPct, s.moyenneBac,
+                   s.moyenneMultiAnsPct, s.rangMultiAns, s.parcoursup
+            FROM PanierSchoolStats s
+            JOIN Panier p ON p.id = s.panierId
+            WHERE p.cpgeType = ?
+            ORDER BY p.rowid, s.rowid
+        """, (cpge_type,)).fetchall()
+
+        for stat in stats:
+            uai = stat[2]
+            if uai not in rates_map:
+                rates_map[uai] = None
+                targets = [t.lower() for t in school_overrides.get(uai, global_filieres)]
+                for name, filiere, filiere_bis, rate, link in formations_by_school.get(uai, []):
+                    if rate is None:
+                        continue
+                    fields = [(filiere_bis or "").lower(), (filiere or "").lower(), (name or "").lower()]
+                    if any(target in field for target in targets for field in fields):
+                        rates_map[uai] = (rate, link, filiere_bis or name)
+                        break
+
+            resolved = rates_map[uai] or (None, None, None)
+            rank, rank_total = parse_rang(stat[6])
+            rows_to_insert.append((
+                stat[0], stat[1], cpge_type, uai, len(rows_to_insert),
+                stat[3], stat[4], stat[5], stat[6], rank, rank_total, stat[7],
+                resolved[0], resolved[1], resolved[2], uai in schools_to_exclude,
+            ))
+
+    conn.executemany("""
+        INSERT INTO PanierLeaderboard
+        (statsId, panierId, cpgeType, schoolUai, position, tauxIntegrationPct, moyenneBac,
+         moyenneMultiAnsPct, rangMultiAns, rankMultiAns, rankMultiAnsTotal, parcoursup,
+         admissionRate, parcoursupLink, parcoursupName, excluded)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows_to_insert)
+    print(f"   PanierLeaderboard: {len(rows_to_insert)} rows for {len(cpge_types)} CPGE types")
+
+
+def build_formation_cpge_types(conn):
+    """Link formations to the CPGE types /formations/?filiere_bis= accepts
+    (scraper types, panier types and Parcoursup filières), so the backend
+    filters with a join instead of resolving mappings and LIKE scans.
+
+    A formation matches a type when one of the type's Parcoursup filières is
+    a substring of its filiereFormationDetailleeBis; school-specific
+    CpgeMapping overrides replace the global filières for that school."""
+    required = ["FormationCpgeType", "Formation", "CpgeMapping"]
+    if not all(table_exists(conn, t) for t in required):
+        return
+    conn.execute("DELETE FROM FormationCpgeType")
+
+    cpge_types = {r[0] for r in conn.execute("SELECT DISTINCT etudiantType FROM CpgeMapping")}
+    if table_exists(conn, "Panier"):
+        cpge_types.update(r[0] for r in conn.execute("SELECT DISTINCT cpgeType FROM Panier"))
+    cpge_types.update(r[0] for r in conn.execute("""
+        SELECT DISTINCT filiereFormationDetailleeBis FROM Formation
+        WHERE category LIKE '%CPGE%' AND filiereFormationDetailleeBis IS NOT NULL
+    """))
+    cpge_types.discard(None)
+
+    formations = conn.execute("""
+        SELECT id, schoolUai, LOWER(filiereFormationDetailleeBis) FROM Formation
+        WHERE filiereFormationDetailleeBis IS NOT NULL
+    """).fetchall()
+
+    count = 0
+    for cpge_type in sorted(cpge_types):
+        global_targets = [t.lower() for t in resolve_parcoursup_types(conn, cpge_type)]
+        school_targets = defaultdict(list)
+        for uai, filiere in conn.execute(
+            "SELECT schoolUai, parcoursupFiliere FROM CpgeMapping WHERE etudiantType = ? AND schoolUai IS NOT NULL",
+            (cpge_type,),
+        ):
+            school_targets[uai].append(filiere.lower())
+
+        links = [
+            (cpge_type, formation_id)
+            for formation_id, uai, filiere_bis in formations
+            if any(t in filiere_bis for t in school_targets.get(uai, global_targets))
+        ]
+        conn.executemany("INSERT INTO FormationCpgeType (cpgeType, formationId) VALUES (?, ?)", links)
+        count += len(links)
+    print(f"   FormationCpgeType: {count} links for {len(cpge_types)} CPGE types")
+
+
+def build_formation_licence_types(conn):
+    """Link Licence formations to the licence types of SpecialtyAdmissionStats,
+    with the keyword rules /licences/formations used to apply per request."""
+    required = ["FormationLicenceType", "Formation", "SpecialtyAdmissionStats"]
+    if not all(table_exists(conn, t) for t in required):
+        return
+    conn.execute("DELETE FROM FormationLicenceType")
+
+    licence_types = [r[0] for r in conn.execute("""
+        SELECT DISTINCT cpgeCategory FROM SpecialtyAdmissionStats
+        WHERE cpgeCategory LIKE 'Licence%'
+    """) if r[0]]
+
+    count = 0
+    for licence_type in sorted(licence_types):
+        keywords = licence_keywords(licence_type)
+        if not keywords:
+            continue
+        # LIKE folds ASCII case like the former ilike() filters
+        matches = " OR ".join("filiereFormationDetaillee LIKE ?" for _ in keywords)
+        cursor = conn.execute(f"""
+            INSERT INTO FormationLicenceType (licenceType, formationId)
+            SELECT ?, id FROM Formation
+            WHERE category = 'Licence' AND ({matches})
+        """, [licence_type, *(f"%{kw}%" for kw in keywords)])
+        count += cursor.rowcount
+    print(f"   FormationLicenceType: {count} links for {len(licence_types)} licence types")
+
+
+# Masters ranked in secteur rankings and licence pathways
+MASTER_MIN_CAPACITY = 20
+MASTER_MIN_CANDIDATES = 50
+
+
+def build_master_secteur_ranks(conn):
+    """Rank eligible masters by admission rate within their secteur
+    (MonMasterFormation.secteurRank, 1 = most selective; ties by id)."""
+    if not table_exists(conn, "MonMasterFormation"):
+        return
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(MonMasterFormation)")}
+    if "secteurRank" not in columns:
+        return
+    conn.execute("UPDATE MonMasterFormation SET secteurRank = NULL")
+    # One UPDATE ... FROM (SQLite 3.33+) instead of a statement per master
+    ranked = conn.execute("""
+        UPDATE MonMasterFormation SET secteurRank = r.rn
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY secteurId ORDER BY admissionRate, id) AS rn
+            FROM MonMasterFormation
+            WHERE admissionRate > 0 AND capacite >= ? AND candidats > ?
+        ) r
+        WHERE MonMasterFormation.id = r.id
+    """, (MASTER_MIN_CAPACITY, MASTER_MIN_CANDIDATES)).rowcount
+    secteurs = conn.execute(
+        "SELECT COUNT(DISTINCT secteurId) FROM MonMasterFormation WHERE secteurRank IS NOT NULL"
+    ).fetchone()[0]
+    print(f"   MonMasterFormation.secteurRank: {ranked} masters ranked in {secteurs} secteurs")
+
+
+def build_licence_master_pathways(conn):
+    """Resolve each licence type to its secteurs disciplinaires and rank the
+    eligible masters of those secteurs by admission rate, for
+    /licences/{licence_type}/top-masters. Licence types matching no secteur
+    get one LicenceSecteur row with an empty secteurDisciplinaire."""
+    required = ["LicenceSecteur", "LicenceMasterPathway", "MonMasterFormation", "SpecialtyAdmissionStats"]
+    if not all(table_exists(conn, t) for t in required):
+        return
+    conn.execute("DELETE FROM LicenceSecteur")
+    conn.execute("DELETE FROM LicenceMasterPathway")
+
+    licence_types = {r[0] for r in conn.execute("""
+        SELECT DISTINCT cpgeCategory FROM SpecialtyAdmissionStats
+        WHERE cpgeCategory LIKE 'Licence%'
+    """) if r[0]}
+    licence_types.update(MASTER_SECTEUR_OVERRIDES)
+
+    linked = 0
+    pathways = 0
+    for licence_type in sorted(licence_types):
+        keywords = master_secteur_keywords(licence_type)
+        cursor = None
+        if keywords:
+            # LIKE folds ASCII case like the former ilike() filters
+            matches = " OR ".join("secteurDisciplinaire LIKE ?" for _ in keywords)
+            patterns = [f"%{kw}%" for kw in keywords]
+            cursor = conn.execute(f"""
+                INSERT OR IGNORE INTO LicenceSecteur (licenceType, secteurDisciplinaire, secteurId)
+                SELECT DISTINCT ?, secteurDisciplinaire, secteurId FROM MonMasterFormation
+                WHERE secteurDisciplinaire IS NOT NULL AND ({matches})
+            """, [licence_type, *patterns])
+        if cursor is None or cursor.rowcount <= 0:
+            # Resolved to no secteur: the empty marker row keeps the backend
+            # from retrying the keyword match at query time
+            conn.execute(
+                "INSERT INTO LicenceSecteur (licenceType, secteurDisciplinaire, secteurId) VALUES (?, '', NULL)",
+                (licence_type,),
+            )
+            continue
+        linked += 1
+        cursor = conn.execute(f"""
+            INSERT INTO LicenceMasterPathway (licenceType, rank, monMasterFormationId, region, alternance)
+            SELECT ?, ROW_NUMBER() OVER (ORDER BY admissionRate, id), id, region, alternance
+            FROM MonMasterFormation
+            WHERE ({matches})
+              AND capacite >= ? AND candidats > ? AND admissionRate IS NOT NULL
+        """, [licence_type, *patterns, MASTER_MIN_CAPACITY, MASTER_MIN_CANDIDATES])
+        pathways += cursor.rowcount
+    print(f"   LicenceMasterPathway: {pathways} masters for {linked} licence types "
+          f"({len(licence_types) - linked} without secteur)")
+
+
+# Builders run in order; each one skips itself when its source tables
+# haven't been ingested yet.
+BUILDERS = [
+    build_formation_search,
+    build_global_search,
+    build_panier_leaderboard,
+    build_formation_cpge_types,
+    build_formation_mentions,
+    build_school_location_geo,
+    build_school_clusters,
+    build_stats_cube,
+    build_formation_similar,
+    build_formation_licence_types,
+    build_master_secteur_ranks,
+    build_licence_master_pathways,
+]
+
+
+def finalize(conn):
+    """Run after every ingestion: bring the schema up to date, rebuild the
+    derived tables and refresh the query planner statistics."""
+    print("\n--- Post-ingestion ---")
+    apply_migrations(conn)
+    for build in BUILDERS:
+        build(conn)
+    conn.commit()
+    conn.execute("ANALYZE")
+    bump_dataset_version(conn)
+    conn.commit()
+
+
+if __name__ == "__main__":
+    conn = sqlite3.connect(DB_PATH)
+    finalize(conn)
+    print(f"--- Schema at version {current_version(conn)} (latest {LATEST_VERSION}) ---")
+    conn.close()
@@ -0,0 +1,10 @@
+"""
+GlobalSearch rowid layout shared by post_ingest.py, which numbers the rows,
+and backend/routers/global_search.py, which searches one entity type at a
+time with a rowid range.
+"""
+
+# Block k * SEARCH_ROWID_BLOCK of each entity type, rowids numbered by
+# descending popularity inside the block
+SEARCH_ROWID_BLOCK = 10_000_000
+SEARCH_ENTITY_BLOCKS = {"formation": 1, "school": 2, "master": 3}
@@ -3,12 +3,16 @@ import pandas as pd
 import sqlite3
 import re
 import unicodedata
+import sys
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = os.path.join(BASE_DIR, "output_csv")
 DB_PATH = os.path.join(BASE_DIR, "..", "ingestion", "prisma", "dev.db")
 
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "ingestion"))
+from post_ingest import finalize
+
 def slugify(text):
     if not text: return ""
     text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode('utf-8')
@@ -184,6 +188,7 @@ def ingest():
     print(f"Inserted {cursor.rowcount} PanierSchoolStats. Skipped {skipped_unmatched} unmatched schools.")
 
     conn.commit()
+    finalize(conn)
     conn.close()
     print("--- Ingestion Completed ---")
 
@@ -0,0 +1,128 @@
+"""
+Compare API latency between the sync and async database modes.
+
+Starts the backend once per ORIENTATION_DB_MODE ("sync", then "async"),
+drives it with N concurrent clients and prints p50/p95/p99 latency per mode.
+
+Usage (from the project root, needs `pip install httpx`):
+    python scripts/bench/db_modes.py
+    python scripts/bench/db_modes.py --clients 200 --requests 20 --profile production
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+# Mix of cheap reference lookups and the slow endpoints that used to
+# starve the thread pool.
+ENDPOINTS = [
+    "/formations/categories",
+    "/formations/?limit=20",
+    "/formations/?filiere_bis=MP&limit=20",
+    "/formations/paniers/types",
+    "/formations/paniers/by-type?cpge_type=MP",
+    "/formations/paniers/by-type?cpge_type=ECG",
+    "/licences/formations?licence_type=Licence%20Droit",
+    "/masters/search?limit=100",
+    "/specialties/",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def wait_until_up(base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base_url}/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+
+async def run_load(base_url, clients, requests_per_client):
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker(worker_id):
+            nonlocal errors
+            for i in range(requests_per_client):
+                path = ENDPOINTS[(worker_id + i) % len(ENDPOINTS)]
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(w) for w in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    return latencies, errors, elapsed
+
+
+def bench_mode(mode, args):
+    env = {**os.environ, "ORIENTATION_DB_MODE": mode, "ORIENTATION_DB_PROFILE": args.profile}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        asyncio.run(wait_until_up(base_url))
+        # Warm-up pass so both modes start with a hot page cache
+        asyncio.run(run_load(base_url, 10, len(ENDPOINTS)))
+        latencies, errors, elapsed = asyncio.run(run_load(base_url, args.clients, args.requests))
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        "mode": mode,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=10, help="Requests per client")
+    parser.add_argument("--profile", default="dev", choices=["dev", "production"])
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"--- {args.clients} concurrent clients x {args.requests} requests, profile={args.profile} ---")
+    results = [bench_mode(mode, args) for mode in ("sync", "async")]
+
+    print(f"{'mode':<6} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for r in results:
+        print(f"{r['mode']:<6} {r['requests']:>8} {r['errors']:>6} {r['rps']:>8.1f} "
+              f"{r['p50']:>8.1f} {r['p95']:>8.1f} {r['p99']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
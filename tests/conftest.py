@@ -0,0 +1,188 @@
+"""
+Shared fixtures: a small hand-written dataset in a temporary SQLite file,
+taken through ingestion/post_ingest.py like a real ingestion, and a
+TestClient on the API.
+
+The database path is read when backend.database is imported, so it is set
+here before any backend import.
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+
+import pytest
+
+DB_DIR = tempfile.mkdtemp(prefix="orientation-tests-")
+DB_PATH = os.path.join(DB_DIR, "test.db")
+os.environ["ORIENTATION_DB_PATH"] = DB_PATH
+os.environ["ORIENTATION_DB_PROFILE"] = "dev"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from backend import models  # noqa: E402
+from backend.database import Base, SessionLocal, engine  # noqa: E402
+import post_ingest  # noqa: E402  (ingestion/, see pytest.ini)
+
+# Tables owned by the Prisma schema (and the backend's user tables); the
+# derived ones are created by the migrations in finalize()
+SOURCE_TABLES = [
+    "School", "SchoolLocation", "Formation", "MasterFormation", "Panier",
+    "PanierMasterFormation", "PanierSchoolStats", "CpgeMapping", "MonMasterFormation",
+    "Specialty", "CpgeCategoryMapping", "SpecialtyAdmissionStats", "UserProfile", "UserFavorite",
+]
+
+# uai: (name, location id, city, department code, department, region, academy, lat, lon)
+SCHOOLS = {
+    "0750001A": ("Lycée Henri-IV", "L1", "Paris", "75", "Paris", "Île-de-France", "Paris", 48.846, 2.346),
+    "0750002B": ("Lycée Louis-le-Grand", "L2", "Paris", "75", "Paris", "Île-de-France", "Paris", 48.848, 2.344),
+    "0690001C": ("Lycée du Parc", "L3", "Lyon", "69", "Rhône", "Auvergne-Rhône-Alpes", "Lyon", 45.770, 4.850),
+    "0420001D": ("Lycée Claude-Fauriel", "L4", "Saint-Étienne", "42", "Loire", "Auvergne-Rhône-Alpes", "Lyon", 45.434, 4.390),
+    "0130001E": ("Lycée Thiers", "L5", "Marseille", "13", "Bouches-du-Rhône", "Provence-Alpes-Côte d'Azur", "Aix-Marseille", 43.300, 5.380),
+}
+
+MENTIONS_STRONG = {"Felicitations": 40.0, "TB": 50.0, "B": 10.0, "AB": 0.0, "SansMention": 0.0}
+
+# id: (uai, located, name, category, filiere, filiere bis, admission rate, extra columns)
+FORMATIONS = {
+    "F01": ("0750001A", True, "CPGE MPSI", "CPGE", "Classe préparatoire scientifique", "MPSI", 10.0, {"mentionDistribution": MENTIONS_STRONG}),
+    "F02": ("0750002B", True, "CPGE MPSI", "CPGE", "Classe préparatoire scientifique", "MPSI", 8.0, {}),
+    "F03": ("0690001C", True, "CPGE MPSI", "CPGE", "Classe préparatoire scientifique", "MPSI", 20.0, {}),
+    "F04": ("0420001D", True, "CPGE MPSI", "CPGE", "Classe préparatoire scientifique", "MPSI", 35.0, {}),
+    "F05": ("0690001C", True, "CPGE ECG", "CPGE", "Classe préparatoire économique", "ECG - Mathématiques appliquées + ESH", 25.0, {}),
+    "F06": ("0130001E", True, "CPGE ECG", "CPGE", "Classe préparatoire économique", "ECG - Mathématiques appliquées + ESH", 40.0, {}),
+    "F07": ("0750001A", True, "Licence Droit", "Licence", "Licence - Droit", None, 60.0, {}),
+    "F08": ("0420001D", True, "Licence Droit", "Licence", "Licence - Droit", None, None, {}),
+    "F09": ("0130001E", True, "Licence Droit", "Licence", "Licence - Droit", None, 80.0, {}),
+    "F10": ("0690001C", True, "Licence Mathématiques", "Licence", "Licence - Mathématiques", None, None,
+            {"lastCalledRank": 50, "totalCandidates": 200}),
+    # No location: only counted in the national StatsCube cells
+    "F11": ("0130001E", False, "BUT Informatique", "BUT", "BUT - Informatique", None, 50.0, {}),
+}
+
+# id: (cpge type, name, [(uai, tauxIntegrationPct, rangMultiAns)])
+PANIERS = {
+    "P1": ("MP", "MP - Top écoles", [
+        ("0750001A", 80.0, "1/40"),
+        ("0750002B", 85.0, "2/40"),
+        ("0690001C", 40.0, None),
+        ("0420001D", None, "10/40"),
+        # No MPSI formation: no admission rate, hidden
+        ("0130001E", 90.0, "3/40"),
+    ]),
+    "P2": ("MP", "MP - Écoles d'ingénieurs", [
+        ("0690001C", 60.0, None),
+        ("0750001A", 70.0, None),
+    ]),
+    "P3": ("ECG", "ECG - Écoles de commerce", [
+        ("0690001C", 50.0, None),
+        ("0130001E", 30.0, None),
+    ]),
+}
+
+# id: (mention, secteur id, region, admission rate)
+MASTERS = {
+    "MM1": ("ÉCONOMIE", "01", "Île-de-France", 10.0),
+    "MM2": ("ÉCONOMIE", "01", "Auvergne-Rhône-Alpes", 10.0),
+    "MM3": ("MATHÉMATIQUES", "02", "Île-de-France", 20.0),
+    "MM4": ("MATHÉMATIQUES", "02", "Occitanie", None),
+    "MM5": ("DROIT PUBLIC", "03", "Île-de-France", None),
+    "MM6": ("DROIT PUBLIC", "03", "Auvergne-Rhône-Alpes", 5.0),
+}
+
+# (specialty1, specialty2, category, admission rate %, candidates)
+SPECIALTY_STATS = [
+    ("maths", "physique-chimie", "CPGE S", 30.0, 100),
+    ("maths", "ses", "CPGE S", 10.0, 100),
+    ("maths", "ses", "Licence Droit", 50.0, 100),
+]
+
+
+def _populate(db):
+    for uai, (name, location_id, city, code, department, region, academy, lat, lon) in SCHOOLS.items():
+        db.add(models.School(uai=uai, name=name, status="Public"))
+        db.add(models.SchoolLocation(
+            id=location_id, schoolUai=uai, city=city, departmentCode=code, departmentName=department,
+            region=region, academy=academy, latitude=lat, longitude=lon,
+        ))
+
+    for formation_id, (uai, located, name, category, filiere, filiere_bis, rate, extra) in FORMATIONS.items():
+        db.add(models.Formation(
+            id=formation_id,
+            locationId=SCHOOLS[uai][1] if located else None,
+            schoolUai=uai,
+            name=name,
+            category=category,
+            selectivity="Formation sélective" if category == "CPGE" else "Formation non sélective",
+            filiereFormationDetaillee=filiere,
+            filiereFormationDetailleeBis=filiere_bis,
+            parcoursupLink=f"https://dossierappel.parcoursup.fr/{formation_id}",
+            capacity=40,
+            totalCandidates=extra.get("totalCandidates", 1000),
+            totalCandidatesWithAdmissionProposal=200,
+            admissionRate=rate,
+            lastCalledRank=extra.get("lastCalledRank"),
+            genderParity=50.0,
+            mentionDistribution=extra.get("mentionDistribution"),
+        ))
+
+    db.add(models.CpgeMapping(etudiantType="MP", parcoursupFiliere="MPSI", schoolUai=None))
+    db.add(models.CpgeMapping(etudiantType="ECG", parcoursupFiliere="ECG", schoolUai=None))
+
+    polytechnique = models.MasterFormation(id="MF1", name="École polytechnique")
+    for panier_id, (cpge_type, name, stats) in PANIERS.items():
+        panier = models.Panier(id=panier_id, name=name, cpgeType=cpge_type)
+        if panier_id == "P1":
+            panier.master_formations = [polytechnique]
+        db.add(panier)
+        for uai, integration, rang in stats:
+            db.add(models.PanierSchoolStats(
+                id=f"{panier_id}-{uai}", panierId=panier_id, schoolUai=uai,
+                tauxIntegrationPct=integration, moyenneBac=16.0, rangMultiAns=rang, parcoursup=True,
+            ))
+
+    for master_id, (mention, secteur_id, region, rate) in MASTERS.items():
+        db.add(models.MonMasterFormation(
+            id=master_id, etablissementId="E1", etablissementNom="Université Test", mention=mention,
+            parcours=f"Parcours {master_id}", secteurDisciplinaire=f"Secteur {secteur_id}", secteurId=secteur_id,
+            discipline="Discipline", alternance=False, ville="Paris", region=region,
+            capacite=30, candidats=300, admissionRate=rate,
+        ))
+
+    for specialty_id in ("maths", "physique-chimie", "ses"):
+        db.add(models.Specialty(id=specialty_id, name=specialty_id.title()))
+    db.add(models.CpgeCategoryMapping(csvCategory="CPGE S", cpgeType="MP"))
+    db.add(models.CpgeCategoryMapping(csvCategory="CPGE ECG", cpgeType="ECG"))
+    for specialty1, specialty2, category, rate, candidates in SPECIALTY_STATS:
+        db.add(models.SpecialtyAdmissionStats(
+            id=f"{specialty1}-{specialty2}-{category}", specialty1Id=specialty1, specialty2Id=specialty2,
+            cpgeCategory=category, candidats=candidates, propositions=candidates * rate / 100,
+            acceptes=0, admissionRatePct=rate,
+        ))
+
+
+@pytest.fixture(scope="session")
+def dataset():
+    try:
+        Base.metadata.create_all(engine, tables=[Base.metadata.tables[name] for name in SOURCE_TABLES])
+        with SessionLocal() as db:
+            _populate(db)
+            db.commit()
+
+        conn = sqlite3.connect(DB_PATH)
+        post_ingest.finalize(conn)
+        conn.close()
+
+        yield DB_PATH
+    finally:
+        engine.dispose()
+        shutil.rmtree(DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def client(dataset):
+    from backend.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,55 @@
+import pytest
+
+from backend.autocomplete import PRECOMPUTED_RANGE, _PrefixIndex, fold
+
+
+def complete(client, field, prefix, **params):
+    response = client.get("/autocomplete", params={"field": field, "prefix": prefix, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_fold():
+    assert fold("  Saint-Étienne ") == "saint etienne"
+    assert fold("Lycée Henri-IV") == "lycee henri iv"
+
+
+@pytest.mark.parametrize("prefix", ["sai", "ETI", "saint-é", "Saint Etienne"])
+def test_city_matches_any_word(client, prefix):
+    assert complete(client, "city", prefix) == [{"value": "Saint-Étienne", "count": 2}]
+
+
+def test_most_formations_first(client):
+    assert complete(client, "school", "lyc") == [
+        {"value": "Lycée Thiers", "count": 3},
+        {"value": "Lycée du Parc", "count": 3},
+        {"value": "Lycée Claude-Fauriel", "count": 2},
+        {"value": "Lycée Henri-IV", "count": 2},
+        {"value": "Lycée Louis-le-Grand", "count": 1},
+    ]
+    assert len(complete(client, "school", "lyc", limit=2)) == 2
+
+
+def test_fields(client):
+    assert complete(client, "city", "pa") == [{"value": "Paris", "count": 3}]
+    assert complete(client, "formation", "mpsi") == [{"value": "CPGE MPSI", "count": 4}]
+    assert [v["value"] for v in complete(client, "mention", "dro")] == ["DROIT PUBLIC"]
+    assert complete(client, "city", "zzz") == []
+    assert complete(client, "city", "-") == []
+
+
+def test_precomputed_prefixes_match_a_scan():
+    counts = {f"Ville {n:03d}": n for n in range(1, 200)}
+    index = _PrefixIndex(counts)
+
+    def expected(prefix):
+        matches = [value for value in counts if any(
+            " ".join(fold(value).split()[start:]).startswith(prefix) for start in range(2)
+        )]
+        return sorted(matches, key=lambda value: (-counts[value], value))[:10]
+
+    prefixes = ["v", "vi", "ville", "ville 1", "0", "01", "1", "19", "199", "x"]
+    # Broad prefixes are answered from the precomputed table
+    assert len(index.keys) > PRECOMPUTED_RANGE and {"v", "ville"} <= set(index.top)
+    for prefix in prefixes:
+        assert [v["value"] for v in index.complete(prefix, 10)] == expected(prefix), prefix
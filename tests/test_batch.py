@@ -0,0 +1,31 @@
+from backend.schemas import MAX_BATCH_IDS
+
+
+def test_formation_batch_keeps_request_order(client):
+    response = client.post("/formations/batch", json={"ids": ["F03", "nope", "F01", "F03", "nope"]})
+    assert response.status_code == 200
+    batch = response.json()
+    assert [item and item["id"] for item in batch["items"]] == ["F03", None, "F01", "F03", None]
+    assert batch["missing"] == ["nope"]
+
+
+def test_school_batch(client):
+    batch = client.post("/schools/batch", json={"ids": ["x", "0690001C", "y", "x"]}).json()
+    assert [item and item["uai"] for item in batch["items"]] == [None, "0690001C", None, None]
+    assert batch["missing"] == ["x", "y"]
+
+
+def test_master_batch(client):
+    batch = client.post("/masters/formations/batch", json={"ids": ["MM5", "MM1", "MM0"]}).json()
+    assert [item and item["id"] for item in batch["items"]] == ["MM5", "MM1", None]
+    assert batch["missing"] == ["MM0"]
+
+
+def test_empty_batch(client):
+    assert client.post("/formations/batch", json={"ids": []}).json() == {"items": [], "missing": []}
+
+
+def test_batch_size_limit(client):
+    ids = [f"F{n}" for n in range(MAX_BATCH_IDS + 1)]
+    assert client.post("/formations/batch", json={"ids": ids}).status_code == 422
+    assert client.post("/formations/batch", json={"ids": ids[:MAX_BATCH_IDS]}).status_code == 200
@@ -0,0 +1,68 @@
+def test_etag_and_304(client):
+    response = client.get("/formations/categories")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "public, max-age=86400"
+    assert "Accept-Encoding" in response.headers["vary"]
+
+    revalidated = client.get("/formations/categories", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+    assert "Accept-Encoding" in revalidated.headers["vary"]
+
+    weak = client.get("/formations/categories", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert weak.status_code == 304
+
+
+def test_etag_depends_on_url_and_encoding(client):
+    def etag(path, encoding):
+        return client.get(path, headers={"Accept-Encoding": encoding}).headers["etag"]
+
+    assert etag("/formations/?limit=1", "identity") != etag("/formations/?limit=2", "identity")
+    assert etag("/formations/?limit=1", "identity") != etag("/formations/?limit=1", "gzip")
+    # An ETag of one encoding does not revalidate another
+    gzip_etag = etag("/formations/?limit=1", "gzip")
+    response = client.get("/formations/?limit=1", headers={"Accept-Encoding": "br", "If-None-Match": gzip_etag})
+    assert response.status_code == 200
+
+
+def test_private_routes_have_no_etag(client):
+    response = client.post("/users/", json={"name": "cache"})
+    user_id = response.json()["id"]
+    response = client.get(f"/users/{user_id}")
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+    assert response.headers["cache-control"] == "private, no-store"
+
+
+def test_errors_are_not_cached(client):
+    response = client.get("/formations/unknown-id")
+    assert response.status_code == 404
+    assert "etag" not in response.headers
+    assert response.headers["cache-control"] == "no-store"
+
+
+def test_compression(client):
+    # Well above compression.MINIMUM_SIZE
+    path = "/formations/paniers/by-type?cpge_type=MP"
+    identity = client.get(path, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert "Accept-Encoding" in identity.headers["vary"]
+
+    for encoding in ("br", "gzip"):
+        response = client.get(path, headers={"Accept-Encoding": encoding})
+        assert response.headers["content-encoding"] == encoding
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.json() == identity.json()
+
+    # Replayed from the response cache with the same headers
+    again = client.get(path, headers={"Accept-Encoding": "br"})
+    assert again.headers["content-encoding"] == "br"
+    assert again.json() == identity.json()
+
+
+def test_small_bodies_are_not_compressed(client):
+    response = client.get("/formations/categories", headers={"Accept-Encoding": "br"})
+    assert "content-encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["vary"]
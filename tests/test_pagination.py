@@ -0,0 +1,80 @@
+import pytest
+
+from backend.pagination import decode_cursor, encode_cursor
+
+# (admissionRate, id) with NULL rates last, as in tests/conftest.py
+MASTER_ORDER = ["MM6", "MM1", "MM2", "MM3", "MM4", "MM5"]
+FORMATION_ORDER = ["F02", "F01", "F03", "F05", "F04", "F06", "F11", "F07", "F09", "F08", "F10"]
+LICENCE_ORDER = ["F07", "F09", "F08", "F10"]
+
+
+def walk(client, path, limit, **params):
+    """Ids of every cursor page, checking that only the last one has no next_cursor."""
+    ids, cursor = [], ""
+    while True:
+        response = client.get(path, params={**params, "limit": limit, "cursor": cursor})
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) <= limit
+        ids += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+        assert len(page["items"]) == limit
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(None, "MM4"), 2) == [None, "MM4"]
+    assert decode_cursor("", 2) is None
+
+
+@pytest.mark.parametrize("limit", [1, 2, 4, 10])
+def test_master_cursor_reaches_null_rates(client, limit):
+    assert walk(client, "/masters/search", limit) == MASTER_ORDER
+
+
+@pytest.mark.parametrize("limit", [1, 3, 20])
+def test_formation_cursor_reaches_null_rates(client, limit):
+    assert walk(client, "/formations/", limit) == FORMATION_ORDER
+
+
+@pytest.mark.parametrize("limit", [1, 3])
+def test_licence_cursor_reaches_null_rates(client, limit):
+    assert walk(client, "/licences/formations", limit) == LICENCE_ORDER
+
+
+def test_cursor_inside_null_rates(client):
+    # Resuming after a NULL-rate row only returns NULL-rate rows with a larger id
+    page = client.get("/masters/search", params={"cursor": encode_cursor(None, "MM4")}).json()
+    assert [item["id"] for item in page["items"]] == ["MM5"]
+    assert page["next_cursor"] is None
+
+
+@pytest.mark.parametrize("path", ["/masters/search", "/formations/", "/licences/formations"])
+def test_invalid_cursor(client, path):
+    assert client.get(path, params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get(path, params={"cursor": encode_cursor("MM1")}).status_code == 400
+
+
+def test_master_search_legacy_is_first_page(client):
+    response = client.get("/masters/search/legacy", params={"limit": 3})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == MASTER_ORDER[:3]
+
+
+def test_licence_pages(client):
+    page = client.get("/licences/formations", params={"licence_type": "Licence Droit", "limit": 2}).json()
+    assert page["total"] == 3
+    assert (page["page"], page["size"]) == (1, 2)
+    assert [item["id"] for item in page["items"]] == ["F07", "F09"]
+
+    page = client.get("/licences/formations", params={"licence_type": "Licence Droit", "limit": 2, "page": 2}).json()
+    assert [item["id"] for item in page["items"]] == ["F08"]
+
+    page = client.get("/licences/formations", params={"licence_type": "Licence Droit", "sort": "-admission_rate"}).json()
+    assert [item["id"] for item in page["items"]] == ["F09", "F07", "F08"]
+
+
+def test_licence_page_and_cursor_conflict(client):
+    response = client.get("/licences/formations", params={"cursor": "", "page": 1})
+    assert response.status_code == 400
@@ -0,0 +1,61 @@
+import pytest
+
+PATH = "/formations/paniers/by-type"
+
+
+def school_order(panier):
+    return [stats["schoolUai"] for stats in panier["school_stats"]]
+
+
+def test_default_order_hides_schools_without_rate(client):
+    page = client.get(PATH, params={"cpge_type": "MP"}).json()
+    assert (page["total"], page["page"], page["size"]) == (2, 1, 2)
+    p1, p2 = page["items"]
+    assert p1["id"] == "P1"
+    assert [mf["id"] for mf in p1["master_formations"]] == ["MF1"]
+    # 0130001E has no MPSI formation
+    assert school_order(p1) == ["0750001A", "0750002B", "0690001C", "0420001D"]
+    assert [s["admissionRate"] for s in p1["school_stats"]] == [10.0, 8.0, 20.0, 35.0]
+    assert school_order(p2) == ["0690001C", "0750001A"]
+
+
+@pytest.mark.parametrize("sort, expected", [
+    ("integration", ["0750002B", "0750001A", "0690001C", "0420001D"]),
+    ("multi_year_rank", ["0750001A", "0750002B", "0420001D", "0690001C"]),
+    ("admission_rate", ["0750002B", "0750001A", "0690001C", "0420001D"]),
+])
+def test_sort_puts_nulls_last(client, sort, expected):
+    p1 = client.get(PATH, params={"cpge_type": "MP", "sort": sort}).json()["items"][0]
+    assert school_order(p1) == expected
+
+
+def test_top_per_panier(client):
+    p1, p2 = client.get(PATH, params={"cpge_type": "MP", "sort": "integration", "top": 1}).json()["items"]
+    assert school_order(p1) == ["0750002B"]
+    assert school_order(p2) == ["0750001A"]
+
+
+def test_rank_is_parsed(client):
+    p1 = client.get(PATH, params={"cpge_type": "MP"}).json()["items"][0]
+    first = p1["school_stats"][0]
+    assert (first["rangMultiAns"], first["rankMultiAns"], first["rankMultiAnsTotal"]) == ("1/40", 1, 40)
+
+
+def test_limit_pages_paniers(client):
+    page = client.get(PATH, params={"cpge_type": "MP", "limit": 1, "page": 2}).json()
+    assert (page["total"], page["page"], page["size"]) == (2, 2, 1)
+    assert [p["id"] for p in page["items"]] == ["P2"]
+
+
+def test_unknown_type_is_empty(client):
+    assert client.get(PATH, params={"cpge_type": "PSI"}).json() == {"items": [], "total": 0, "page": 1, "size": 0}
+
+
+def test_legacy_list(client):
+    params = {"cpge_type": "MP", "sort": "integration", "top": 2}
+    legacy = client.get(f"{PATH}/legacy", params=params).json()
+    assert legacy == client.get(PATH, params=params).json()["items"]
+
+
+def test_panier_types(client):
+    assert client.get("/formations/paniers/types").json() == ["ECG", "MP"]
@@ -0,0 +1,84 @@
+import math
+
+import numpy as np
+import pytest
+
+from backend.scoring import GRADE_WEIGHT, grade_fractions
+
+
+def logit(p):
+    return math.log(p / (1 - p))
+
+
+def sigmoid(x):
+    return 1 / (1 + math.exp(-x))
+
+
+def recommendations(client, **profile):
+    user_id = client.post("/users/", json=profile).json()["id"]
+    response = client.get(f"/users/{user_id}/recommendations", params={"limit": 100})
+    assert response.status_code == 200
+    return response.json()
+
+
+def chances(result):
+    return {item["id"]: item["chance"] for item in result["items"]}
+
+
+def test_grade_fractions():
+    # SansMention 10-12, AB 12-14, B 14-16, TB 16-18, Felicitations 18-20
+    assert grade_fractions(17).tolist() == [1.0, 1.0, 1.0, 0.5, 0.0]
+    assert grade_fractions(9).tolist() == [0.0] * 5
+    assert grade_fractions(20).tolist() == [1.0] * 5
+
+
+def test_neutral_profile_scores_the_base_rate(client):
+    result = recommendations(client, name="neutral")
+    # F08 has neither an admission rate nor a last called rank
+    assert result["total"] == 10
+    scored = chances(result)
+    assert "F08" not in scored
+    assert scored["F09"] == pytest.approx(0.80, abs=1e-3)
+    assert scored["F02"] == pytest.approx(0.08, abs=1e-3)
+    # lastCalledRank / totalCandidates without an admission rate
+    assert scored["F10"] == pytest.approx(50 / 200, abs=1e-3)
+    assert [item["chance"] for item in result["items"]] == sorted(scored.values(), reverse=True)
+
+
+def test_specialty_and_grade_add_in_log_odds(client):
+    result = recommendations(client, specialty1Id="maths", specialty2Id="physique-chimie", grade=17, department="75")
+    scored = chances(result)
+
+    # CPGE S: the pair's rate (30 %) over the category mean (20 %)
+    specialty = math.log(30 / 20)
+    # F01 admitted: 40 % félicitations, 50 % TB, 10 % B; a 17 is above all
+    # of B, half of TB and none of félicitations
+    below = float(np.dot([0.0, 0.0, 0.1, 0.5, 0.4], grade_fractions(17)))
+    assert below == pytest.approx(0.35)
+    assert scored["F01"] == pytest.approx(sigmoid(logit(0.10) + specialty + GRADE_WEIGHT * (below - 0.5)), abs=1e-3)
+    # No mention distribution: neutral grade factor
+    assert scored["F02"] == pytest.approx(sigmoid(logit(0.08) + specialty), abs=1e-3)
+    # ECG and Licence formations have no stats for this pair
+    assert scored["F05"] == pytest.approx(0.25, abs=1e-3)
+    assert scored["F07"] == pytest.approx(0.60, abs=1e-3)
+
+
+def test_weaker_pair_lowers_the_chance(client):
+    scored = chances(recommendations(client, specialty1Id="maths", specialty2Id="ses"))
+    assert scored["F03"] == pytest.approx(sigmoid(logit(0.20) + math.log(10 / 20)), abs=1e-3)
+
+
+def test_filters_and_distance(client):
+    result = recommendations(client, department="75")
+    distances = {item["id"]: item["distanceKm"] for item in result["items"]}
+    assert distances["F01"] < 1
+    assert distances["F09"] > 600
+
+    user_id = client.post("/users/", json={"department": "75"}).json()["id"]
+    nearby = client.get(f"/users/{user_id}/recommendations", params={"max_distance_km": 50, "category": "CPGE"}).json()
+    assert {item["id"] for item in nearby["items"]} == {"F01", "F02"}
+    assert nearby["total"] == 2
+
+    user_id = client.post("/users/", json={}).json()["id"]
+    response = client.get(f"/users/{user_id}/recommendations", params={"max_distance_km": 50})
+    assert response.status_code == 400
@@ -0,0 +1,57 @@
+import pytest
+
+from backend.routers.search import build_formation_match, fts_prefix_query
+
+
+def test_fts_prefix_query():
+    assert fts_prefix_query("Saint-Ét") == '"Saint"* AND "Ét"*'
+    assert fts_prefix_query(" - ") is None
+    # Quotes can't break out of the phrase
+    assert fts_prefix_query('a"b') == '"a"* AND "b"*'
+
+
+def test_build_formation_match():
+    assert build_formation_match() is None
+    assert build_formation_match(city="Lyon") == 'city : ("Lyon"*)'
+
+
+def formation_ids(client, **params):
+    page = client.get("/formations/", params={**params, "limit": 50}).json()
+    assert page["total"] == len(page["items"])
+    return sorted(item["id"] for item in page["items"])
+
+
+@pytest.mark.parametrize("city", ["saint", "Saint-Ét", "etien", "SAINT ETIENNE"])
+def test_city_prefix_ignores_case_and_accents(client, city):
+    assert formation_ids(client, city=city) == ["F04", "F08"]
+
+
+def test_school_prefix(client):
+    assert formation_ids(client, school_name="henri") == ["F01", "F07"]
+    assert formation_ids(client, school_name="louis le gr") == ["F02"]
+    assert formation_ids(client, school_name="henrietta") == []
+
+
+def test_text_filters_combine(client):
+    assert formation_ids(client, city="par", school_name="louis") == ["F02"]
+
+
+def test_global_search_prefix(client):
+    result = client.get("/search", params={"q": "droi"}).json()
+    assert result["formations"]["total"] == 3
+    assert {item["id"] for item in result["formations"]["items"]} == {"F07", "F08", "F09"}
+    assert {item["id"] for item in result["masters"]["items"]} == {"MM5", "MM6"}
+    assert result["schools"] == {"total": 0, "items": []}
+
+
+def test_global_search_every_word_must_match(client):
+    result = client.get("/search", params={"q": "lycee hen", "types": "school"}).json()
+    assert [item["id"] for item in result["schools"]["items"]] == ["0750001A"]
+    assert set(result) == {"query", "schools"}
+
+
+def test_global_search_limit_and_types(client):
+    result = client.get("/search", params={"q": "cpge", "types": "formation", "limit": 2}).json()
+    assert result["formations"]["total"] == 6
+    assert len(result["formations"]["items"]) == 2
+    assert client.get("/search", params={"q": "cpge", "types": "formation,other"}).status_code == 400
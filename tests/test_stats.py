@@ -0,0 +1,63 @@
+import pytest
+
+
+def cube(client, **params):
+    response = client.get("/stats/cube", params=params)
+    assert response.status_code == 200
+    return response.json()["cells"]
+
+
+def counts(cells, key):
+    return {cell[key]: cell["formationCount"] for cell in cells}
+
+
+def test_national_rollup(client):
+    (cell,) = cube(client)
+    # F11 has no location but still counts nationally
+    assert cell["formationCount"] == 11
+    assert (cell["region"], cell["category"], cell["selectivity"]) == (None, None, None)
+    assert cell["admissionRate"]["min"] == 8.0
+    assert cell["admissionRate"]["max"] == 80.0
+
+
+def test_group_by_region(client):
+    cells = cube(client, group_by="region")
+    assert counts(cells, "region") == {
+        "Auvergne-Rhône-Alpes": 5,
+        "Île-de-France": 3,
+        "Provence-Alpes-Côte d'Azur": 2,
+    }
+    # Ordered by formation count; academy and category are rolled up
+    assert [cell["formationCount"] for cell in cells] == [5, 3, 2]
+    assert all(cell["academy"] is None and cell["category"] is None for cell in cells)
+
+
+def test_slice_and_group(client):
+    cells = cube(client, region="Auvergne-Rhône-Alpes", group_by="department")
+    assert counts(cells, "departmentCode") == {"69": 3, "42": 2}
+    assert {cell["departmentName"] for cell in cells} == {"Rhône", "Loire"}
+    assert {cell["academy"] for cell in cells} == {"Lyon"}
+
+
+def test_group_by_category_and_selectivity(client):
+    cells = cube(client, group_by="category,selectivity")
+    assert {(c["category"], c["selectivity"]): c["formationCount"] for c in cells} == {
+        ("CPGE", "Formation sélective"): 6,
+        ("Licence", "Formation non sélective"): 4,
+        ("BUT", "Formation non sélective"): 1,
+    }
+    assert all(cell["region"] is None for cell in cells)
+
+
+def test_category_quantiles(client):
+    (cell,) = cube(client, category="CPGE")
+    assert cell["formationCount"] == 6
+    rates = cell["admissionRate"]
+    # CPGE rates: 8, 10, 20, 25, 35, 40
+    assert (rates["min"], rates["median"], rates["max"]) == (8.0, 22.5, 40.0)
+    assert rates["avg"] == pytest.approx(23.0)
+
+
+@pytest.mark.parametrize("group_by", ["city", "region,region"])
+def test_invalid_group_by(client, group_by):
+    assert client.get("/stats/cube", params={"group_by": group_by}).status_code == 400